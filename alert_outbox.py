@@ -0,0 +1,118 @@
+"""
+알림 발송함 (SQLite)
+- 보낼 알림을 넣을 때 바로 기록하고, 전송에 성공하거나 버릴 때 지움
+- 프로그램이 꺼지거나 네트워크가 끊겨도 남은 알림은 다음 실행/재연결 때 순서대로 전송
+- 사진은 인코딩된 바이트로 저장
+- 한 스레드에서만 사용 (NotificationService의 발송함 스레드)
+"""
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+ChatKey = Tuple[str, str]  # (token, chat_id)
+
+DEFAULT_OUTBOX_PATH = "alert_outbox.db"
+
+
+@dataclass
+class OutboxItem:
+    """발송함에 기록된 알림 한 개"""
+
+    id: int
+    token: str
+    chat_id: str
+    text: str
+    photo: Optional[bytes] = None  # 인코딩된 사진
+    photo_name: Optional[str] = None  # 파일 이름 (확장자로 형식 표시)
+    state_key: Optional[str] = None
+    state: Optional[str] = None
+    created: float = 0.0  # time.time() 기준 (재시작 후에도 유지)
+    attempts: int = 0
+
+    @property
+    def key(self) -> ChatKey:
+        return (self.token, self.chat_id)
+
+
+_COLUMNS = "id, token, chat_id, text, photo, photo_name, state_key, state, created, attempts"
+
+
+class AlertOutbox:
+    """SQLite 파일에 보관하는 알림 발송함"""
+
+    def __init__(self, path: str = DEFAULT_OUTBOX_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " token TEXT NOT NULL,"
+            " chat_id TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " photo BLOB,"
+            " photo_name TEXT,"
+            " state_key TEXT,"
+            " state TEXT,"
+            " created REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS alerts_chat ON alerts (token, chat_id, id)")
+        self._db.commit()
+
+    def add(
+        self,
+        token: str,
+        chat_id: str,
+        text: str,
+        photo: Optional[bytes] = None,
+        photo_name: Optional[str] = None,
+        state_key: Optional[str] = None,
+        state: Optional[str] = None,
+        created: Optional[float] = None,
+    ) -> OutboxItem:
+        """알림을 기록하고 id가 붙은 항목을 반환합니다. (created는 알림을 넣은 시각, 없으면 지금)"""
+        created = time.time() if created is None else created
+        cursor = self._db.execute(
+            "INSERT INTO alerts (token, chat_id, text, photo, photo_name, state_key, state, created)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (token, chat_id, text, photo, photo_name, state_key, state, created),
+        )
+        self._db.commit()
+        return OutboxItem(cursor.lastrowid, token, chat_id, text, photo, photo_name, state_key, state, created)
+
+    def load(self, key: ChatKey, after_id: int, limit: int) -> List[OutboxItem]:
+        """채팅방의 after_id 다음 항목들 (오래된 순, 최대 limit개)"""
+        rows = self._db.execute(
+            f"SELECT {_COLUMNS} FROM alerts WHERE token = ? AND chat_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (key[0], key[1], after_id, limit),
+        ).fetchall()
+        return [OutboxItem(*row) for row in rows]
+
+    def chats(self) -> List[ChatKey]:
+        """남은 알림이 있는 채팅방 목록"""
+        return [tuple(row) for row in self._db.execute("SELECT DISTINCT token, chat_id FROM alerts")]
+
+    def delete(self, ids: Iterable[int]):
+        """전송했거나 버린 알림을 지웁니다."""
+        ids = [(i,) for i in ids]
+        if ids:
+            self._db.executemany("DELETE FROM alerts WHERE id = ?", ids)
+            self._db.commit()
+
+    def record_attempt(self, ids: Iterable[int]):
+        """전송 시도 횟수를 늘립니다."""
+        ids = [(i,) for i in ids]
+        if ids:
+            self._db.executemany("UPDATE alerts SET attempts = attempts + 1 WHERE id = ?", ids)
+            self._db.commit()
+
+    def count(self) -> int:
+        """남은 알림 수"""
+        return self._db.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    def close(self):
+        self._db.close()
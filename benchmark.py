@@ -0,0 +1,187 @@
+"""
+매칭 처리량 벤치마크 (윈도우 없이 실행 가능)
+- ReplayBackend로 저장된 전체 화면 프레임을 재생
+- 각 감지기의 캡처 + 매칭 경로를 정해진 시간 동안 반복 호출하여 처리량/지연 측정
+
+사용법:
+    python benchmark.py --frames captures/ --seconds 10
+    python benchmark.py --frames captures/ --targets detector clicker
+    python benchmark.py --frames captures/ --targets engines   # 매칭 엔진별 템플릿 수 교차점
+    python benchmark.py --targets notifier   # 알림 파이프라인 처리량/지연 (프레임 불필요, notifier_load.py 참고)
+"""
+import argparse
+import os
+import time
+from typing import Callable, Dict, List
+
+from capture_backends import ReplayBackend
+from template_bank import shared_template_bank
+
+# main_window.apply_config와 같은 고정 구역
+GT_REGION = (30, 52, 1305, 595)
+MINIMAP_REGION = (34, 144, 261, 228)
+REACH_REGION = (665, 420, 1236, 753)
+SURAK_TEMPLATES = ["img/surak/surak.png", "img/surak/surak2.png", "img/surak/surak3.png"]
+
+
+def run(name: str, fn: Callable[[], object], seconds: float):
+    """fn을 seconds 동안 반복 호출하고 결과를 출력합니다."""
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    count = len(latencies)
+    mean = sum(latencies) / count
+    p95 = latencies[min(count - 1, int(count * 0.95))]
+    print(
+        f"{name:<10} {count / elapsed:8.1f} 회/초  "
+        f"평균 {mean * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms  ({count}회)"
+    )
+    return mean
+
+
+def bench_user(frames: str, fps: float, seconds: float):
+    from user_detector import UserDetector
+
+    detector = UserDetector(capture_backend=ReplayBackend(frames, fps=fps))
+    detector.set_config(MINIMAP_REGION, "", "", "유저")
+    # max_age 0: 매 호출마다 실제 캡처
+    detector.capture_service.subscribe(detector.capture_name, detector.region, detector.check_interval, max_age_ms=0)
+
+    def tick():
+        frame = detector.capture_service.get_frame(detector.capture_name).image
+        return detector._count_regions(frame)
+
+    run("user", tick, seconds)
+
+
+def bench_detector(frames: str, fps: float, seconds: float):
+    from image_detector import ImageDetector
+
+    detector = ImageDetector(capture_backend=ReplayBackend(frames, fps=fps))
+    detector.detection_region = GT_REGION
+    detector.template_paths = shared_template_bank().discover("gt")
+    detector.confidence_threshold = 0.7
+    detector.capture_service.subscribe(detector.capture_name, GT_REGION, detector.check_interval, max_age_ms=0)
+
+    # 순차 검색, 병렬 검색(코어 수, 최대 8), 클러스터 대표 먼저, 이전 위치 + 변화 게이트까지 사용 비교
+    detector.set_template_clustering(False)
+    detector.set_location_prior(False)
+    detector.set_change_gate(False)
+    for workers in (0, min(8, os.cpu_count() or 1)):
+        detector.set_parallel_workers(workers)
+        run(f"detector/{workers}" if workers else "detector", detector._find_single_capture, seconds)
+    detector.set_parallel_workers(0)
+    detector.set_template_clustering(True)
+    run("detector/c", detector._find_single_capture, seconds)
+    detector.set_location_prior(True)
+    detector.set_change_gate(True)
+    detector.hit_stats.reset()
+    run("detector/g", detector._find_single_capture, seconds)
+
+    diagnostics = detector.get_diagnostics()
+    if diagnostics["positive_ticks"]:
+        print(
+            f"{'':<10} 양성 틱당 검사 템플릿 {diagnostics['evaluated_per_positive_tick']:.1f}개 "
+            f"(고정 순서 {diagnostics['fixed_order_per_positive_tick']:.1f}개)"
+        )
+    if diagnostics["evaluated_per_negative_tick"] is not None:
+        print(f"{'':<10} 음성 틱당 검사 템플릿 {diagnostics['evaluated_per_negative_tick']:.1f}개")
+    gate = diagnostics["change_gate"]
+    print(f"{'':<10} 변화 게이트 건너뜀 {gate['skip_ratio']:.0%}, 매칭 면적 {gate['area_ratio']:.0%}")
+
+
+def bench_clicker(frames: str, fps: float, seconds: float):
+    from image_clicker_worker import ImageClickerWorker
+
+    worker = ImageClickerWorker(capture_backend=ReplayBackend(frames, fps=fps))
+    worker.set_config_multi(REACH_REGION, SURAK_TEMPLATES, worker.confidence)
+    worker.capture_service.subscribe(worker.search_capture_name, REACH_REGION, worker.click_interval, max_age_ms=0)
+    worker.capture_service.subscribe(worker.window_capture_name, worker.sequence_region, worker.action_interval, max_age_ms=0)
+    step = worker.sequence[1]  # Phase 2: hunt 보일 때까지 malon 더블클릭
+
+    def tick():
+        # 시퀀스 한 틱과 같은 조회 (프레임 한 번, hunt 없으면 같은 프레임에서 malon)
+        frame = worker.capture_service.get_frame(worker.window_capture_name)
+        return worker._evaluate_step(step, frame)
+
+    run("clicker", tick, seconds)
+
+
+def bench_engines(frames: str, fps: float, seconds: float):
+    """
+    gt 템플릿 수를 늘려가며 매칭 엔진별 한 틱 시간을 비교하고,
+    fft가 spatial보다 빨라지는 템플릿 수(교차점)를 출력합니다.
+    confidence를 1보다 크게 두어 매 틱 모든 템플릿을 끝까지 검사합니다.
+    """
+    from template_matcher import MATCHING_ENGINES, create_matcher
+
+    backend = ReplayBackend(frames, fps=fps)
+    template_paths = shared_template_bank().discover("gt")
+    counts = sorted({n for n in (1, 2, 4, 8, 16, 32) if n < len(template_paths)} | {len(template_paths)})
+
+    means: Dict[str, List[float]] = {}
+    for engine in MATCHING_ENGINES:
+        matcher = create_matcher(engine)
+        means[engine] = []
+        for count in counts:
+            paths = template_paths[:count]
+
+            def tick():
+                return matcher.find_first(backend.grab(GT_REGION), GT_REGION, paths, 1.01)
+
+            means[engine].append(run(f"{engine}/{count}", tick, seconds))
+
+    print("템플릿 수  " + "  ".join(f"{engine:>9}" for engine in means))
+    for i, count in enumerate(counts):
+        print(f"{count:>8}  " + "  ".join(f"{means[engine][i] * 1000:7.2f}ms" for engine in means))
+
+    # 그 수부터 더 많은 템플릿 수에서도 모두 fft가 빨라야 교차점 (한 번 앞선 뒤 다시 느려지면 교차점 아님)
+    faster = [fft < spatial for fft, spatial in zip(means["fft"], means["spatial"])]
+    crossover = next((count for i, count in enumerate(counts) if all(faster[i:])), None)
+    if crossover is None:
+        print("교차점: fft가 spatial보다 빠른 템플릿 수 없음")
+    else:
+        print(f"교차점: 템플릿 {crossover}개 이상에서 fft가 spatial보다 빠름")
+
+
+def bench_notifier(frames: str, fps: float, seconds: float):
+    """로컬 Bot API 대역 서버로 알림 2000개를 보내 처리량과 지연 백분위를 출력합니다."""
+    from notifier_load import run_load
+
+    run_load(alerts=2000)
+
+
+BENCHES = {
+    "user": bench_user,
+    "detector": bench_detector,
+    "clicker": bench_clicker,
+    "engines": bench_engines,
+    "notifier": bench_notifier,
+}
+FRAMELESS = {"notifier"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감지기 매칭 처리량 벤치마크")
+    parser.add_argument("--frames", help="재생할 전체 화면 프레임(PNG/NPY) 폴더")
+    parser.add_argument("--fps", type=float, default=0.0, help="재생 FPS (0이면 호출마다 다음 프레임)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="대상별 측정 시간(초)")
+    parser.add_argument("--targets", nargs="+", choices=sorted(BENCHES), default=sorted(BENCHES))
+    args = parser.parse_args()
+    if not args.frames and set(args.targets) - FRAMELESS:
+        parser.error("--frames가 필요합니다")
+
+    if set(args.targets) - FRAMELESS:
+        shared_template_bank().preload()
+    for target in args.targets:
+        BENCHES[target](args.frames, args.fps, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+화면 캡처 백엔드
+- ImageGrabBackend: 기존 PIL.ImageGrab 캡처
+- MssBackend: mss를 사용한 빠른 캡처 (mss 설치 시)
+- ReplayBackend: 폴더의 PNG/NPY 프레임을 지정한 FPS로 재생 (윈도우 없이 벤치마크/테스트용)
+모든 백엔드는 grab(region)으로 (H, W, 3) uint8 RGB 배열을 반환합니다.
+grab_into(region, out)은 미리 할당한 배열에 직접 캡처합니다. (in_place인 백엔드만 캡처 서비스의 버퍼 재사용)
+"""
+import importlib.util
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import ImageGrab
+
+Region = Tuple[int, int, int, int]  # (x1, y1, x2, y2)
+
+_MSS_SPEC = importlib.util.find_spec("mss")
+
+if _MSS_SPEC is not None:
+    import mss  # type: ignore
+else:  # pragma: no cover - 선택 의존성
+    mss = None  # type: ignore[assignment]
+
+
+class CaptureBackend:
+    """캡처 백엔드 인터페이스"""
+
+    name = "base"
+    in_place = False  # True면 grab_into가 out에 직접 캡처 (아니면 캡처 서비스가 grab 결과를 그대로 사용)
+
+    def grab(self, region: Region) -> np.ndarray:
+        """구역을 캡처하여 RGB 배열로 반환합니다."""
+        raise NotImplementedError
+
+    def grab_into(self, region: Region, out: np.ndarray) -> np.ndarray:
+        """구역을 캡처하여 out((H, W, 3) uint8)에 씁니다. 기본 구현은 grab 결과를 복사합니다."""
+        np.copyto(out, self.grab(region))
+        return out
+
+    def close(self):
+        """백엔드 자원을 정리합니다."""
+
+
+class ImageGrabBackend(CaptureBackend):
+    """PIL.ImageGrab 캡처 (기존 방식)"""
+
+    name = "imagegrab"
+
+    def grab(self, region: Region) -> np.ndarray:
+        # PIL 이미지를 배열로 바꿀 때 한 번 복사되므로 버퍼에 다시 복사하지 않음 (in_place = False)
+        x1, y1, x2, y2 = region
+        screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
+        if screenshot.mode != "RGB":
+            screenshot = screenshot.convert("RGB")
+        return np.asarray(screenshot)
+
+
+class MssBackend(CaptureBackend):
+    """mss 캡처 (BitBlt 직접 호출, PIL 변환 없음)"""
+
+    name = "mss"
+    in_place = True
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("mss 패키지가 설치되어 있지 않습니다. (pip install mss)")
+        # mss 인스턴스는 스레드 간 공유할 수 없으므로 스레드마다 따로 생성 (close에서 모두 닫도록 목록 유지)
+        self._local = threading.local()
+        self._instances_lock = threading.Lock()
+        self._instances: list = []
+        self._generation = 0  # close마다 증가, 이전 세대의 스레드별 인스턴스는 다시 만듦
+
+    def _get_sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None or getattr(self._local, "generation", None) != self._generation:
+            sct = mss.mss()
+            with self._instances_lock:
+                self._instances.append(sct)
+                self._local.generation = self._generation
+            self._local.sct = sct
+        return sct
+
+    def _grab_bgra(self, region: Region) -> np.ndarray:
+        x1, y1, x2, y2 = region
+        shot = self._get_sct().grab({"left": x1, "top": y1, "width": x2 - x1, "height": y2 - y1})
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def grab(self, region: Region) -> np.ndarray:
+        return cv2.cvtColor(self._grab_bgra(region), cv2.COLOR_BGRA2RGB)
+
+    def grab_into(self, region: Region, out: np.ndarray) -> np.ndarray:
+        # 색 변환 결과를 out에 바로 씀 (중간 RGB 배열 없음)
+        cv2.cvtColor(self._grab_bgra(region), cv2.COLOR_BGRA2RGB, dst=out)
+        return out
+
+    def close(self):
+        # 모든 스레드에서 만든 인스턴스를 닫음 (호출한 스레드 것만 닫으면 나머지가 남음)
+        with self._instances_lock:
+            instances, self._instances = self._instances, []
+            self._generation += 1
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception as e:
+                print(f"mss 종료 오류: {e}")
+        self._local.sct = None
+
+
+class ReplayBackend(CaptureBackend):
+    """
+    폴더에 저장된 전체 화면 프레임(PNG/NPY)을 재생하는 백엔드
+    - fps 기준으로 시간에 맞춰 프레임이 넘어감 (fps=0이면 grab 호출마다 다음 프레임)
+    - origin은 프레임 좌상단의 화면 좌표
+    - 프레임 밖 영역은 검은색으로 채움
+    """
+
+    name = "replay"
+    in_place = True
+
+    def __init__(self, directory: str, fps: float = 10.0, loop: bool = True, origin: Tuple[int, int] = (0, 0)):
+        self.directory = directory
+        self.fps = fps
+        self.loop = loop
+        self.origin = origin
+
+        self.frame_paths: List[str] = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.lower().endswith((".png", ".npy"))
+        )
+        if not self.frame_paths:
+            raise ValueError(f"재생할 프레임이 없습니다: {directory}")
+
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+        self._step = 0
+        self._cached_index: Optional[int] = None
+        self._cached_frame: Optional[np.ndarray] = None
+
+    def _current_index(self) -> int:
+        if self.fps > 0:
+            index = int((time.monotonic() - self._start_time) * self.fps)
+        else:
+            index = self._step
+            self._step += 1
+
+        if self.loop:
+            return index % len(self.frame_paths)
+        return min(index, len(self.frame_paths) - 1)
+
+    def _load(self, path: str) -> np.ndarray:
+        if path.lower().endswith(".npy"):
+            frame = np.load(path)
+        else:
+            data = np.fromfile(path, dtype=np.uint8)
+            frame = cv2.cvtColor(cv2.imdecode(data, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+        return np.ascontiguousarray(frame[:, :, :3], dtype=np.uint8)
+
+    def current_frame(self) -> np.ndarray:
+        """현재 시점의 전체 프레임"""
+        with self._lock:
+            index = self._current_index()
+            if index != self._cached_index:
+                self._cached_frame = self._load(self.frame_paths[index])
+                self._cached_index = index
+            return self._cached_frame
+
+    def grab(self, region: Region) -> np.ndarray:
+        x1, y1, x2, y2 = region
+        return self.grab_into(region, np.empty((y2 - y1, x2 - x1, 3), dtype=np.uint8))
+
+    def grab_into(self, region: Region, out: np.ndarray) -> np.ndarray:
+        frame = self.current_frame()
+        ox, oy = self.origin
+        x1, y1, x2, y2 = region
+        out.fill(0)
+
+        # 프레임과 겹치는 부분만 복사
+        fx1, fy1 = max(x1 - ox, 0), max(y1 - oy, 0)
+        fx2, fy2 = min(x2 - ox, frame.shape[1]), min(y2 - oy, frame.shape[0])
+        if fx2 > fx1 and fy2 > fy1:
+            dx, dy = fx1 - (x1 - ox), fy1 - (y1 - oy)
+            out[dy:dy + fy2 - fy1, dx:dx + fx2 - fx1] = frame[fy1:fy2, fx1:fx2]
+        return out
+
+
+def create_backend(name: str, **kwargs) -> CaptureBackend:
+    """이름으로 캡처 백엔드를 생성합니다. (imagegrab / mss / replay)"""
+    name = (name or "imagegrab").lower()
+    if name == "imagegrab":
+        return ImageGrabBackend()
+    if name == "mss":
+        return MssBackend()
+    if name == "replay":
+        return ReplayBackend(**kwargs)
+    raise ValueError(f"알 수 없는 캡처 백엔드: {name}")
@@ -0,0 +1,174 @@
+"""
+리치 자동클릭 시퀀스 단계표
+- 단계 종류
+  until: 조건 이미지(watch)가 보일(visible) / 사라질(gone) 때까지 대상 이미지(target)에 동작 반복
+  once: delay_ticks 틱 기다린 뒤 대상 이미지에 한 번 동작 (없으면 그냥 다음 단계)
+  wait: seconds초 대기 (phase6_progress로 진행 상황 전달)
+- 단계표는 설정 파일(image_click_sequence)로 바꿀 수 있고, 비어 있으면 기존 10단계(DEFAULT_SEQUENCE)
+- 단계마다 필요한 조회(조건, 대상)를 미리 컴파일: 조건과 대상이 같은 이미지면 조회 한 개로 둘 다 판단
+- 이미지 이름 "surak"은 워커의 surak 템플릿 목록(검색 구역), 나머지는 이미지 경로(창인식 영역)
+"""
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+Region = Tuple[int, int, int, int]  # (x1, y1, x2, y2)
+
+SURAK = "surak"
+STEP_KINDS = ("until", "once", "wait")
+ACTIONS = ("click", "double_click")
+
+
+def image_label(name: Optional[str]) -> str:
+    """로그용 이미지 이름 (img/hunt.png → hunt)"""
+    if not name:
+        return ""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+@dataclass(frozen=True)
+class SequenceStep:
+    """시퀀스 단계 한 개"""
+
+    kind: str  # until / once / wait
+    watch: Optional[str] = None  # until: 조건 이미지
+    until: str = "visible"  # until: visible (보일 때까지) / gone (사라질 때까지)
+    target: Optional[str] = None  # 동작 대상 이미지
+    action: str = "click"  # click / double_click
+    delay_ticks: int = 0  # once: 동작 전 대기 틱 수
+    seconds: int = 0  # wait: 대기 시간
+    message: str = ""  # 완료 알림 (sequence_step), 비어 있으면 자동 생성
+    notify: bool = False  # 완료 시 phase5_completed 발생 (텔레그램 알림용)
+
+    def done_message(self) -> str:
+        if self.message:
+            return self.message
+        if self.kind == "until":
+            return f"{image_label(self.watch)} {'발견' if self.until == 'visible' else '사라짐'}"
+        if self.kind == "once":
+            return f"{image_label(self.target)} {'더블클릭' if self.action == 'double_click' else '클릭'}"
+        return f"{self.seconds}초 대기 완료"
+
+    def validate(self):
+        """잘못된 단계면 ValueError"""
+        if self.kind not in STEP_KINDS:
+            raise ValueError(f"알 수 없는 단계 종류: {self.kind}")
+        if self.kind != "wait" and self.action not in ACTIONS:
+            raise ValueError(f"알 수 없는 동작: {self.action}")
+        if self.kind == "until":
+            if not self.watch:
+                raise ValueError("until 단계에는 watch가 필요합니다")
+            if self.until not in ("visible", "gone"):
+                raise ValueError(f"until은 visible / gone 중 하나여야 합니다: {self.until}")
+            if not self.target:
+                raise ValueError("until 단계에는 target이 필요합니다")
+        elif self.kind == "once" and not self.target:
+            raise ValueError("once 단계에는 대상 이미지가 필요합니다")
+        elif self.kind == "wait" and self.seconds <= 0:
+            raise ValueError("wait 단계의 대기 시간은 0보다 커야 합니다")
+
+
+def _malon_until(watch: str, until: str, message: str = "", notify: bool = False) -> SequenceStep:
+    return SequenceStep("until", watch, until, "img/malon.png", "double_click", message=message, notify=notify)
+
+
+# 기존 Phase 1 ~ 10
+DEFAULT_SEQUENCE: Tuple[SequenceStep, ...] = (
+    SequenceStep("until", SURAK, "gone", SURAK, "click"),
+    _malon_until("img/hunt.png", "visible"),
+    SequenceStep("until", "img/filter.png", "visible", "img/hunt.png", "click"),
+    SequenceStep("once", target="img/filter.png", delay_ticks=1),
+    _malon_until("img/filter.png", "gone", "filter 사라짐, 3분 대기 시작", notify=True),
+    SequenceStep("wait", seconds=180, message="3분 대기 완료"),
+    _malon_until("img/hunt.png", "visible"),
+    SequenceStep("until", "img/filter.png", "visible", "img/hunt.png", "click"),
+    SequenceStep("once", target="img/filter.png", delay_ticks=1),
+    _malon_until("img/filter.png", "gone"),
+)
+
+
+def parse_sequence(items: Optional[Iterable[dict]]) -> List[SequenceStep]:
+    """
+    설정 파일의 image_click_sequence 목록을 단계표로 변환합니다. (비었거나 잘못된 단계가 있으면 DEFAULT_SEQUENCE)
+    {"watch", "until": "visible" | "gone", "target", "action": "click" | "double_click"} /
+    {"once": 대상 이미지, "action", "delay_ticks"} / {"wait": 초}
+    공통: "message" (완료 알림), "notify" (완료 시 phase5_completed)
+    """
+    steps = []
+    for index, item in enumerate(items or []):
+        try:
+            common = {"message": str(item.get("message", "")), "notify": bool(item.get("notify", False))}
+            if "wait" in item:
+                step = SequenceStep("wait", seconds=int(item["wait"]), **common)
+            elif "once" in item:
+                step = SequenceStep(
+                    "once",
+                    target=item["once"],
+                    action=item.get("action", "click"),
+                    delay_ticks=int(item.get("delay_ticks", 0)),
+                    **common,
+                )
+            else:
+                step = SequenceStep(
+                    "until",
+                    watch=item.get("watch"),
+                    until=item.get("until", "visible"),
+                    target=item.get("target"),
+                    action=item.get("action", "click"),
+                    **common,
+                )
+            step.validate()
+            steps.append(step)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            print(f"시퀀스 단계 설정 오류 ({index + 1}번째): {e} → 기본 시퀀스 사용")
+            return list(DEFAULT_SEQUENCE)
+    return steps or list(DEFAULT_SEQUENCE)
+
+
+@dataclass(frozen=True)
+class Lookup:
+    """템플릿 조회 한 개 (이미지 이름 → 템플릿 목록 + 검색 구역)"""
+
+    key: str  # 이미지 이름 (이전 위치 기록 키)
+    template_paths: Tuple[str, ...]
+    region: Region
+
+    @property
+    def label(self) -> str:
+        return image_label(self.key)
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """조회가 결정된 단계 (watch와 target이 같은 이미지면 같은 Lookup)"""
+
+    number: int  # 1부터 (Phase 번호)
+    step: SequenceStep
+    watch: Optional[Lookup]
+    target: Optional[Lookup]
+
+    @property
+    def lookups(self) -> Tuple[Lookup, ...]:
+        """이 단계가 한 틱에 수행할 수 있는 조회 (중복 제거)"""
+        lookups = []
+        for lookup in (self.watch, self.target):
+            if lookup is not None and lookup not in lookups:
+                lookups.append(lookup)
+        return tuple(lookups)
+
+
+def compile_sequence(steps: Iterable[SequenceStep], resolve: Callable[[str], Lookup]) -> List[CompiledStep]:
+    """단계표의 이미지 이름을 조회로 바꿉니다. (같은 이름은 같은 Lookup 객체를 공유)"""
+    cache = {}
+
+    def lookup(name: Optional[str]) -> Optional[Lookup]:
+        if not name:
+            return None
+        if name not in cache:
+            cache[name] = resolve(name)
+        return cache[name]
+
+    return [
+        CompiledStep(number, step, lookup(step.watch), lookup(step.target))
+        for number, step in enumerate(steps, start=1)
+    ]
@@ -0,0 +1,175 @@
+"""
+색 규칙 엔진
+- 규칙: RGB 범위 / 기준색 ± 허용오차 / HSV 범위 (OpenCV HSV, H 0~179, 범위가 0을 넘어가도 됨)
+- 규칙 목록을 채널별 룩업 테이블(256 × 3)로 한 번만 컴파일
+  테이블 값의 k번째 비트 = 그 채널 값이 k번째 규칙 범위 안인지
+- 분류: cv2.LUT 한 번 + 채널 AND 두 번 → 픽셀마다 만족한 규칙 비트 (최대 8개 규칙)
+- 같은 규칙 목록의 분류기는 공유 (get_classifier), 작업 버퍼는 스레드별로 재사용
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Color = Tuple[int, int, int]
+
+MAX_RULES = 8  # uint8 비트 수
+
+
+@dataclass(frozen=True)
+class ColorRule:
+    """색 규칙 한 개 (채널마다 lower ≤ 값 ≤ upper)"""
+
+    name: str
+    space: str  # "rgb" 또는 "hsv"
+    lower: Color
+    upper: Color
+
+    @classmethod
+    def rgb_range(cls, name: str, lower: Color, upper: Color) -> "ColorRule":
+        return cls(name, "rgb", tuple(lower), tuple(upper))
+
+    @classmethod
+    def tolerance(cls, name: str, color: Color, tolerance: int) -> "ColorRule":
+        """기준색에서 채널마다 tolerance 이내"""
+        lower = tuple(max(0, c - tolerance) for c in color)
+        upper = tuple(min(255, c + tolerance) for c in color)
+        return cls(name, "rgb", lower, upper)
+
+    @classmethod
+    def hsv_range(cls, name: str, lower: Color, upper: Color) -> "ColorRule":
+        """HSV 범위 (lower H > upper H이면 빨간색처럼 0을 넘어가는 범위)"""
+        return cls(name, "hsv", tuple(lower), tuple(upper))
+
+
+# 기존 유저 탐지의 빨간색 기준 (r >= 200, g <= 50, b <= 50)
+RED_RULE = ColorRule.rgb_range("red", (200, 0, 0), (255, 50, 50))
+
+
+def parse_color_rules(items: Iterable[dict]) -> List[ColorRule]:
+    """
+    설정 파일의 color_rules 목록을 규칙으로 변환합니다.
+    {"name", "rgb": [[r,g,b],[r,g,b]]} / {"name", "color": [r,g,b], "tolerance": n} / {"name", "hsv": [[h,s,v],[h,s,v]]}
+    """
+    rules = []
+    for index, item in enumerate(items):
+        try:
+            name = str(item.get("name") or f"rule{index + 1}")
+            if "rgb" in item:
+                rules.append(ColorRule.rgb_range(name, *item["rgb"]))
+            elif "color" in item:
+                rules.append(ColorRule.tolerance(name, item["color"], int(item.get("tolerance", 0))))
+            elif "hsv" in item:
+                rules.append(ColorRule.hsv_range(name, *item["hsv"]))
+            else:
+                raise ValueError("rgb / color / hsv 중 하나가 필요합니다")
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"색 규칙 설정 오류 ({index + 1}번째): {e}")
+    return rules
+
+
+def _channel_bits(lower: int, upper: int, bit: int, wrap: bool = False) -> np.ndarray:
+    values = np.arange(256)
+    if wrap and lower > upper:
+        inside = (values >= lower) | (values <= upper)
+    else:
+        inside = (values >= lower) & (values <= upper)
+    return np.where(inside, bit, 0).astype(np.uint8)
+
+
+class ColorClassifier:
+    """컴파일된 색 규칙 목록 (테이블은 불변, 버퍼는 스레드별)"""
+
+    def __init__(self, rules: Sequence[ColorRule]):
+        if not rules:
+            raise ValueError("색 규칙이 없습니다.")
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"색 규칙은 최대 {MAX_RULES}개입니다: {len(rules)}개")
+
+        self.rules: Tuple[ColorRule, ...] = tuple(rules)
+        self.bits: Dict[str, int] = {}
+
+        # 색 공간별 (1, 256, 3) 테이블
+        self._tables: Dict[str, np.ndarray] = {}
+        for index, rule in enumerate(self.rules):
+            bit = 1 << index
+            self.bits[rule.name] = self.bits.get(rule.name, 0) | bit
+            table = self._tables.setdefault(rule.space, np.zeros((1, 256, 3), dtype=np.uint8))
+            # 이 색 공간의 다른 규칙 비트는 모든 채널 값에서 통과시켜야 AND 결과가 유지됨
+            for channel in range(3):
+                wrap = rule.space == "hsv" and channel == 0
+                table[0, :, channel] |= _channel_bits(rule.lower[channel], rule.upper[channel], bit, wrap)
+        for space, table in self._tables.items():
+            other_bits = sum(1 << i for i, rule in enumerate(self.rules) if rule.space != space)
+            table |= np.uint8(other_bits)
+
+        self._local = threading.local()
+
+    def _buffers(self, shape: Tuple[int, int]) -> Dict[str, np.ndarray]:
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None or buffers["bits"].shape != shape:
+            buffers = {
+                "channels": np.empty(shape + (3,), dtype=np.uint8),
+                "hsv": np.empty(shape + (3,), dtype=np.uint8),
+                "bits": np.empty(shape, dtype=np.uint8),
+                "space_bits": np.empty(shape, dtype=np.uint8),
+            }
+            self._local.buffers = buffers
+        return buffers
+
+    def classify(self, frame: np.ndarray) -> np.ndarray:
+        """
+        RGB 프레임의 픽셀별 규칙 비트 (uint8, k번째 비트 = k번째 규칙 만족)
+        반환 배열은 스레드별 버퍼이므로 다음 classify 호출 전까지만 유효합니다.
+        """
+        buffers = self._buffers(frame.shape[:2])
+        bits = buffers["bits"]
+        bits.fill(0xFF)
+
+        for space, table in self._tables.items():
+            source = frame
+            if space == "hsv":
+                source = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV, dst=buffers["hsv"])
+            channels = cv2.LUT(source, table, dst=buffers["channels"])
+            space_bits = buffers["space_bits"]
+            np.bitwise_and(channels[:, :, 0], channels[:, :, 1], out=space_bits)
+            space_bits &= channels[:, :, 2]
+            bits &= space_bits
+        return bits
+
+    def rule_mask(self, names: Optional[Iterable[str]] = None) -> int:
+        """규칙 이름 목록의 비트 합 (None이면 모든 규칙)"""
+        if names is None:
+            return (1 << len(self.rules)) - 1
+        mask = 0
+        for name in names:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def mask(self, frame: np.ndarray, out: np.ndarray, names: Optional[Iterable[str]] = None) -> np.ndarray:
+        """규칙 중 하나라도 만족하는 픽셀 마스크를 out(bool, 프레임 크기)에 씁니다."""
+        bits = self.classify(frame)
+        np.bitwise_and(bits, self.rule_mask(names), out=bits)
+        return np.not_equal(bits, 0, out=out)
+
+    def counts(self, frame: np.ndarray) -> Dict[str, int]:
+        """규칙별 만족 픽셀 수"""
+        bits = self.classify(frame)
+        return {name: int(np.count_nonzero(bits & bit)) for name, bit in self.bits.items()}
+
+
+_classifiers: Dict[Tuple[ColorRule, ...], ColorClassifier] = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_classifier(rules: Sequence[ColorRule]) -> ColorClassifier:
+    """같은 규칙 목록이면 컴파일된 분류기를 공유합니다."""
+    key = tuple(rules)
+    with _classifiers_lock:
+        classifier = _classifiers.get(key)
+        if classifier is None:
+            classifier = ColorClassifier(key)
+            _classifiers[key] = classifier
+        return classifier
@@ -18,10 +18,34 @@ class ConfigManager:
             "telegram_chat_id": "",
             "user_nickname": "유저",
             "detection_region": (0, 0, 100, 100),
+            "detection_regions": [],  # [{"name", "region", "threshold", "found_text", "gone_text", "rules", "enter", "exit"}, ...]
+            "user_debounce": {  # 상태 전환 규칙: 최근 window번 중 hits번 이상 + min_ms 이상 연속
+                "enter": {"hits": 1, "window": 1, "min_ms": 0},
+                "exit": {"hits": 5, "window": 5, "min_ms": 0},
+            },
+            "color_rules": [],  # [{"name", "rgb" | "color"+"tolerance" | "hsv"}, ...] 비어 있으면 빨간색
             "image_click_region": (0, 0, 100, 100),
             "image_click_template": "",
             "image_click_confidence": 0.8,
             "hotkey_image_click": "",
+            "image_click_sequence": [],  # 리치 자동클릭 단계표, 비어 있으면 기본 10단계 (click_sequence.parse_sequence 참고)
+            "capture_backend": "imagegrab",
+            "matching_engine": "spatial",
+            "fft_cache_mb": 200,  # fft 엔진의 템플릿 스펙트럼 보관 한도 (gt 44개 구역 기준 약 186MB 사용)
+            "parallel_workers": 0,
+            "template_clustering": True,
+            "location_prior": True,
+            "change_gate": True,
+            "notify_coalesce_ms": 250,  # 이 시간 안에 쌓인 알림은 한 메시지로 합침
+            "notify_rate_per_sec": 1.0,  # 채팅방별 초당 전송 수
+            "notify_burst": 3,  # 연속으로 바로 보낼 수 있는 수
+            "notifier_backend": "telegram",  # telegram / mock (로컬 대역 서버) / file (notifier_file에 기록)
+            "notifier_file": "alerts.jsonl",
+            "telegram_base_url": "https://api.telegram.org/bot",  # 로컬 테스트 서버: "http://127.0.0.1:8081/bot"
+            "photo_format": "jpeg",  # 감지 스크린샷 형식: jpeg / webp / png
+            "photo_quality": 80,
+            "photo_max_side": 1280,  # 긴 변 최대 크기 (0이면 원본)
+            "photo_crop_padding": None,  # 숫자면 매칭 위치 주변 이 여백만 남기고 자름
             "window_x": None,
             "window_y": None
         }
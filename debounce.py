@@ -0,0 +1,87 @@
+"""
+상태 전환 디바운스 (N-of-M 히스테리시스)
+- 최근 관측 결과를 고정 크기 링에 보관
+- 들어가기/나가기 규칙을 따로 설정: "최근 window번 중 hits번 이상" + "연속으로 min_ms 이상 유지"
+- 기본값: 들어가기는 즉시(첫 알림 지연 없음), 나가기는 최근 5번 모두 없을 때
+"""
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass(frozen=True)
+class DebounceRule:
+    """전환 조건 (최근 window번 관측 중 hits번 이상 + 같은 관측이 min_ms 이상 연속)"""
+
+    hits: int = 1
+    window: int = 1
+    min_ms: int = 0
+
+    @classmethod
+    def from_config(cls, item: Optional[dict], default: "DebounceRule") -> "DebounceRule":
+        """설정 파일 값({"hits", "window", "min_ms"})으로 규칙 생성 (없는 값은 default 사용)"""
+        if not item:
+            return default
+        hits = int(item.get("hits", default.hits))
+        window = max(int(item.get("window", default.window)), hits, 1)
+        return cls(hits, window, int(item.get("min_ms", default.min_ms)))
+
+
+DEFAULT_ENTER = DebounceRule(hits=1, window=1)
+DEFAULT_EXIT = DebounceRule(hits=5, window=5)
+
+
+class HysteresisFilter:
+    """관측값(있음/없음)을 받아 디바운스된 상태를 반환하는 필터"""
+
+    def __init__(self, enter: DebounceRule = DEFAULT_ENTER, exit: DebounceRule = DEFAULT_EXIT):
+        self.enter = enter
+        self.exit = exit
+        self.size = max(enter.window, exit.window, 1)
+
+        self._ring: List[bool] = [False] * self.size
+        self._index = 0
+        self._filled = 0
+        self._run_value = False
+        self._run_start = 0.0  # 같은 관측이 이어지기 시작한 시각
+        self.state = False
+
+    def reset(self, state: bool = False):
+        """
+        관측 기록과 상태를 초기화합니다.
+        state가 True면 최근 관측이 모두 '있음'이었던 것처럼 시작합니다. (규칙을 바꿔도 이미 보낸 발견 알림을 다시 보내지 않도록)
+        """
+        state = bool(state)
+        self._ring = [state] * self.size
+        self._index = 0
+        self._filled = self.size if state else 0
+        self._run_start = 0.0
+        self._run_value = state
+        self.state = state
+
+    def _recent(self, count: int, value: bool) -> int:
+        """최근 count번 관측 중 value와 같은 수"""
+        count = min(count, self._filled)
+        return sum(1 for i in range(1, count + 1) if self._ring[(self._index - i) % self.size] == value)
+
+    def update(self, observed: bool, now: Optional[float] = None) -> bool:
+        """관측 한 번을 기록하고 디바운스된 상태를 반환합니다."""
+        now = time.monotonic() if now is None else now
+        observed = bool(observed)
+
+        if self._filled == 0 or observed != self._run_value:
+            self._run_value = observed
+            self._run_start = now
+        self._ring[self._index] = observed
+        self._index = (self._index + 1) % self.size
+        self._filled = min(self._filled + 1, self.size)
+
+        rule = self.exit if self.state else self.enter
+        target = not self.state
+        if (
+            observed == target
+            and self._recent(rule.window, target) >= rule.hits
+            and (now - self._run_start) * 1000 >= rule.min_ms
+        ):
+            self.state = target
+        return self.state
@@ -0,0 +1,262 @@
+"""
+공용 화면 캡처 서비스
+- 감지기들이 관심 구역과 주기를 등록(subscribe)
+- 캡처가 필요할 때는 요청한 감지기와, 그 프레임이 유효한 동안 다음 요청이 예정된 감지기의 구역만 함께 캡처
+  (주기가 맞지 않는 감지기의 큰 구역까지 매번 캡처하지 않음)
+- 각 감지기에는 잘라낸 뷰와 캡처 시각을 전달
+- 최근 캡처 중 구역을 포함하고 충분히 새로운 것이 있으면 다시 캡처하지 않고 재사용
+- 실제 캡처는 교체 가능한 캡처 백엔드(capture_backends)가 수행
+- 캡처는 버퍼 풀의 배열에 직접 기록 (틱마다 새 배열을 만들지 않음, in_place 백엔드만)
+  get_frame으로 받은 프레임은 그 구독자가 다음 프레임을 받거나 release / unsubscribe 할 때까지 빌려 간 것으로 보고,
+  빌려 간 구독자가 있거나 최근 캡처로 보관 중인 버퍼는 다시 쓰지 않음
+  따라서 감지기는 빌린 동안에는 프레임을 복사 없이 쓰고, 그 뒤에도 필요한 부분은 복사해 두어야 함
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from capture_backends import CaptureBackend, ImageGrabBackend
+
+Region = Tuple[int, int, int, int]  # (x1, y1, x2, y2)
+
+# 구독자가 허용하는 프레임 최대 나이의 상한 (초)
+MAX_FRAME_AGE = 0.25
+
+# 크기별 버퍼 풀에 보관하는 최대 버퍼 수 (모두 사용 중이면 풀 밖에서 새로 할당)
+POOL_SIZE = 4
+
+# 버퍼 풀을 유지하는 캡처 크기 수 (오래 쓰지 않은 크기부터 버림)
+MAX_POOL_SHAPES = 8
+
+# 재사용을 위해 보관하는 최근 캡처 수
+MAX_RECENT_GRABS = 4
+
+
+@dataclass(frozen=True)
+class CapturedFrame:
+    """구독자에게 전달되는 프레임 (RGB 배열 뷰)"""
+
+    image: np.ndarray
+    region: Region
+    timestamp: float  # time.monotonic() 기준 캡처 시각
+
+
+@dataclass
+class Subscription:
+    """감지기 한 개의 캡처 요청 정보"""
+
+    name: str
+    region: Region
+    interval_ms: int
+    max_age: float  # 초
+    last_request: Optional[float] = None  # 마지막으로 프레임을 받아 간 시각 (time.monotonic())
+
+    def due_within(self, now: float, horizon: float) -> bool:
+        """다음 요청 예정 시각이 now + horizon 이전인지 (아직 요청한 적이 없으면 곧 요청한다고 봄)"""
+        if self.last_request is None:
+            return True
+        return self.last_request + self.interval_ms / 1000.0 <= now + horizon
+
+
+@dataclass(frozen=True)
+class _Grab:
+    """실제 캡처 한 번의 결과"""
+
+    image: np.ndarray
+    region: Region
+    timestamp: float
+
+
+def union_region(regions) -> Region:
+    """여러 구역을 모두 감싸는 최소 구역"""
+    regions = list(regions)
+    return (
+        min(r[0] for r in regions),
+        min(r[1] for r in regions),
+        max(r[2] for r in regions),
+        max(r[3] for r in regions),
+    )
+
+
+def contains_region(outer: Region, inner: Region) -> bool:
+    """outer 구역이 inner 구역을 완전히 포함하는지 확인"""
+    return (
+        outer[0] <= inner[0] and outer[1] <= inner[1]
+        and outer[2] >= inner[2] and outer[3] >= inner[3]
+    )
+
+
+class FrameCaptureService:
+    """여러 감지기가 함께 사용하는 화면 캡처 서비스"""
+
+    def __init__(self, backend: Optional[CaptureBackend] = None, pool_size: int = POOL_SIZE):
+        self._lock = threading.Lock()
+        self.backend: CaptureBackend = backend or ImageGrabBackend()
+        self._subscriptions: Dict[str, Subscription] = {}
+
+        # 캡처 버퍼 풀 (캡처 영역 크기별, 아무도 들고 있지 않은 버퍼만 재사용)
+        self.pool_size = max(1, pool_size)
+        self._pools: "OrderedDict[Tuple[int, int, int], List[np.ndarray]]" = OrderedDict()
+
+        # 최근 캡처들 (새 것부터, 구독자 중 가장 긴 허용 나이까지만 보관)
+        self._grabs: List[_Grab] = []
+
+        # 구독자별로 빌려 간 프레임과 그 캡처 버퍼 (다음 get_frame / release / unsubscribe 때 반납)
+        self._leases: Dict[str, Tuple[CapturedFrame, np.ndarray]] = {}
+
+        # 통계
+        self.grab_count = 0
+        self.request_count = 0
+        self.grab_area = 0  # 캡처한 픽셀 수 합계
+
+    def set_backend(self, backend: CaptureBackend):
+        """캡처 백엔드를 교체합니다. 이전 캡처는 버립니다."""
+        with self._lock:
+            old_backend = self.backend
+            self.backend = backend
+            self._grabs = []
+        if old_backend is not backend:
+            old_backend.close()
+        print(f"[캡처] 백엔드: {backend.name}")
+
+    def subscribe(self, name: str, region: Region, interval_ms: int, max_age_ms: Optional[int] = None):
+        """감지기의 관심 구역과 주기를 등록합니다. 같은 이름이면 갱신합니다."""
+        if max_age_ms is None:
+            max_age = min(interval_ms / 2000.0, MAX_FRAME_AGE)
+        else:
+            max_age = max_age_ms / 1000.0
+
+        region = tuple(int(v) for v in region)
+        with self._lock:
+            self._subscriptions[name] = Subscription(name, region, interval_ms, max_age)
+        print(f"[캡처] 구독 등록: {name} 구역={region}, 주기={interval_ms}ms")
+
+    def unsubscribe(self, name: str):
+        """감지기 등록을 해제합니다."""
+        with self._lock:
+            self._subscriptions.pop(name, None)
+            self._leases.pop(name, None)
+            if not self._subscriptions:
+                self._grabs = []
+
+    def release(self, name: str, frame: Optional[CapturedFrame] = None):
+        """
+        구독자가 빌려 간 프레임을 반납합니다. 이후 그 버퍼는 다음 캡처에 다시 쓰일 수 있습니다.
+        frame을 주면 그 프레임을 아직 빌리고 있을 때만 반납합니다. (재시작 뒤에 끝난 이전 틱이 새 프레임을 반납하지 않도록)
+        """
+        with self._lock:
+            lease = self._leases.get(name)
+            if lease is not None and (frame is None or lease[0] is frame):
+                del self._leases[name]
+
+    def get_frame(self, name: str) -> CapturedFrame:
+        """
+        구독자의 구역 프레임을 반환합니다. 필요할 때만 새로 캡처합니다.
+        프레임은 이 구독자가 다음 프레임을 받거나 release / unsubscribe 할 때까지 유효합니다. (그 뒤에는 버퍼가 재사용될 수 있음)
+        새로 캡처할 때는 이 프레임이 유효한 동안 다음 요청이 예정된 구독자의 구역만 함께 캡처하고,
+        주기가 맞지 않는 구독자의 구역은 포함하지 않습니다. (작은 구역을 자주 보는 감지기가 큰 구역을 캡처하지 않도록)
+        """
+        with self._lock:
+            subscription = self._subscriptions.get(name)
+            if subscription is None:
+                raise KeyError(f"등록되지 않은 캡처 구독자: {name}")
+
+            self.request_count += 1
+            now = time.monotonic()
+            self._prune(now)
+
+            grab = next(
+                (
+                    g for g in self._grabs
+                    if contains_region(g.region, subscription.region) and now - g.timestamp <= subscription.max_age
+                ),
+                None,
+            )
+            if grab is None:
+                sharing = [
+                    s for s in self._subscriptions.values()
+                    if s is subscription or s.due_within(now, s.max_age)
+                ]
+                grab = self._grab(union_region(s.region for s in sharing), now)
+
+            subscription.last_request = now
+            frame = CapturedFrame(self._crop(grab, subscription.region), subscription.region, grab.timestamp)
+            self._leases[name] = (frame, grab.image)  # 이전에 빌린 프레임은 반납
+            return frame
+
+    def _prune(self, now: float):
+        """어떤 구독자에게도 너무 오래된 캡처는 버립니다. (버퍼를 풀로 돌려보냄)"""
+        max_age = max((s.max_age for s in self._subscriptions.values()), default=0.0)
+        self._grabs = [g for g in self._grabs if now - g.timestamp <= max_age]
+
+    def _grab(self, region: Region, now: float) -> _Grab:
+        # 밀려날 최근 캡처를 먼저 버려서 그 버퍼도 이번 캡처에 쓸 수 있도록 함
+        del self._grabs[MAX_RECENT_GRABS - 1:]
+        if self.backend.in_place:
+            image = self.backend.grab_into(region, self._acquire_buffer(region))
+        else:
+            # 버퍼에 직접 쓸 수 없는 백엔드는 새 배열을 그대로 사용 (복사를 한 번 더 하지 않음)
+            image = self.backend.grab(region)
+        grab = _Grab(image, region, now)
+        self._grabs.insert(0, grab)
+        self.grab_count += 1
+        self.grab_area += (region[2] - region[0]) * (region[3] - region[1])
+        return grab
+
+    def _acquire_buffer(self, region: Region) -> np.ndarray:
+        """
+        다음 캡처에 쓸 버퍼. 크기별 풀에서 최근 캡처로 보관 중이거나 구독자가 빌려 간 버퍼는 건너뛰고,
+        모두 사용 중이면 새로 할당합니다. (감지기가 빌린 프레임은 덮어쓰지 않음)
+        """
+        shape = (region[3] - region[1], region[2] - region[0], 3)
+        pool = self._pools.get(shape)
+        if pool is None:
+            pool = self._pools[shape] = []
+            while len(self._pools) > MAX_POOL_SHAPES:
+                self._pools.popitem(last=False)
+        else:
+            self._pools.move_to_end(shape)
+
+        in_use = {id(grab.image) for grab in self._grabs}
+        in_use.update(id(buffer) for _, buffer in self._leases.values())
+        for buffer in pool:
+            if id(buffer) not in in_use:
+                return buffer
+        buffer = np.empty(shape, dtype=np.uint8)
+        if len(pool) < self.pool_size:
+            pool.append(buffer)
+        return buffer
+
+    @staticmethod
+    def _crop(grab: _Grab, region: Region) -> np.ndarray:
+        """캡처에서 구역 부분의 뷰를 잘라냅니다. (복사 없음)"""
+        fx1, fy1, _, _ = grab.region
+        x1, y1, x2, y2 = region
+        return grab.image[y1 - fy1:y2 - fy1, x1 - fx1:x2 - fx1]
+
+    def stats(self) -> Dict[str, float]:
+        """캡처 통계 (요청 수, 실제 캡처 수, 재사용 비율, 캡처당 평균 픽셀 수)"""
+        with self._lock:
+            requests = self.request_count
+            grabs = self.grab_count
+            area = self.grab_area
+        reuse_ratio = 1.0 - grabs / requests if requests else 0.0
+        mean_area = area / grabs if grabs else 0.0
+        return {"requests": requests, "grabs": grabs, "reuse_ratio": reuse_ratio, "mean_area": mean_area}
+
+
+_shared_service: Optional[FrameCaptureService] = None
+_shared_lock = threading.Lock()
+
+
+def shared_capture_service() -> FrameCaptureService:
+    """프로세스 전체에서 공유하는 캡처 서비스"""
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is None:
+            _shared_service = FrameCaptureService()
+        return _shared_service
@@ -0,0 +1,170 @@
+"""
+프레임 변화 게이트
+- 구역 프레임을 타일(기본 32px)로 나누어 직전 틱과 달라진 타일만 찾음
+- 변화 없음: 매칭을 건너뛰고 직전 결과를 그대로 사용
+- 일부 변화: 달라진 타일을 감싸는 영역을 템플릿 크기만큼 넓혀 그 부분만 매칭
+- 기준 프레임은 달라진 타일만 갱신 (허용 오차 이하의 느린 변화는 누적되어 감지)
+- 건너뛴 비율과 실제로 매칭한 면적 비율을 통계로 제공
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from template_matcher import MatchResult
+
+Region = Tuple[int, int, int, int]  # (x1, y1, x2, y2)
+
+
+@dataclass(frozen=True)
+class GateDecision:
+    """한 틱의 변화 판단 결과"""
+
+    changed: bool  # 직전 틱과 다른 픽셀이 있는지
+    dirty: Optional[Region]  # 다시 매칭할 영역 (화면 좌표, None이면 전체 구역)
+
+
+def boxes_overlap(a: Region, b: Region) -> bool:
+    """두 영역이 겹치는지 확인"""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class ChangeGate:
+    """구역 하나의 직전 프레임과 매칭 결과를 기억하는 변화 게이트"""
+
+    def __init__(self, tile: int = 32, tolerance: int = 8):
+        self.tile = tile
+        self.tolerance = tolerance  # 픽셀 값 차이가 이보다 커야 변화로 판단 (캡처 잡음 무시)
+
+        self._lock = threading.Lock()
+        self._previous: Optional[np.ndarray] = None
+        self._previous_region: Optional[Region] = None
+        self._result: Optional[MatchResult] = None
+
+        # 통계
+        self.ticks = 0
+        self.skipped = 0
+        self.partial = 0
+        self.full = 0
+        self.matched_area = 0
+        self.total_area = 0
+
+    def reset(self):
+        """직전 프레임과 결과를 버립니다. (설정/템플릿/엔진이 바뀐 경우)"""
+        with self._lock:
+            self._previous = None
+            self._previous_region = None
+            self._result = None
+
+    def check(self, frame: np.ndarray, region: Region, margin: Tuple[int, int]) -> GateDecision:
+        """
+        직전 프레임과 비교하여 다시 매칭할 영역을 정하고 현재 프레임을 기억합니다.
+        margin은 (최대 템플릿 너비, 최대 템플릿 높이)로, 달라진 픽셀에 걸친 템플릿 위치를 모두 포함하도록 넓힙니다.
+        """
+        previous = self._previous
+        if previous is None or self._previous_region != tuple(region) or previous.shape != frame.shape:
+            self._remember(frame, region)
+            return GateDecision(True, None)
+
+        diff = cv2.absdiff(frame, previous)
+        if diff.ndim == 3:
+            diff = diff.max(axis=2)
+
+        height, width = diff.shape
+        rows = -(-height // self.tile)
+        cols = -(-width // self.tile)
+        padded = cv2.copyMakeBorder(
+            diff, 0, rows * self.tile - height, 0, cols * self.tile - width, cv2.BORDER_CONSTANT, value=0
+        )
+        changed = padded.reshape(rows, self.tile, cols, self.tile).max(axis=(1, 3)) > self.tolerance
+        if not changed.any():
+            # 기준 프레임은 그대로 두어 허용 오차 이하의 느린 변화도 누적되면 감지
+            return GateDecision(False, None)
+
+        # 달라진 타일만 기준 프레임에 반영 (나머지 타일은 느린 변화가 계속 누적되도록 그대로 둠)
+        mask = np.repeat(np.repeat(changed, self.tile, axis=0), self.tile, axis=1)[:height, :width]
+        if previous.ndim == 3:
+            mask = mask[:, :, None]
+        np.copyto(previous, frame, where=mask)
+
+        changed_rows = np.flatnonzero(changed.any(axis=1))
+        changed_cols = np.flatnonzero(changed.any(axis=0))
+        x1, y1, x2, y2 = region
+        margin_x, margin_y = margin
+        dirty = (
+            max(x1, x1 + int(changed_cols[0]) * self.tile - margin_x),
+            max(y1, y1 + int(changed_rows[0]) * self.tile - margin_y),
+            min(x2, x1 + (int(changed_cols[-1]) + 1) * self.tile + margin_x),
+            min(y2, y1 + (int(changed_rows[-1]) + 1) * self.tile + margin_y),
+        )
+        if dirty == tuple(region):
+            return GateDecision(True, None)
+        return GateDecision(True, dirty)
+
+    def _remember(self, frame: np.ndarray, region: Region):
+        self._previous = np.array(frame, copy=True)
+        self._previous_region = tuple(region)
+
+    def search(
+        self,
+        frame: np.ndarray,
+        region: Region,
+        margin: Tuple[int, int],
+        find: Callable[[np.ndarray, Region], Optional[MatchResult]]
+    ) -> Optional[MatchResult]:
+        """
+        변화 게이트를 거쳐 매칭합니다. find(frame, region)은 구역 프레임에서 첫 매칭을 찾는 함수입니다.
+        - 변화 없음: 직전 결과 재사용
+        - 일부 변화 + 직전 매칭 없음: 변한 영역만 매칭 (나머지 영역에는 매칭이 없었음)
+        - 일부 변화 + 직전 매칭이 변한 영역 밖: 직전 매칭 유지
+        - 그 외: 전체 구역 매칭
+        """
+        with self._lock:
+            decision = self.check(frame, region, margin)
+            previous_result = self._result
+            self.ticks += 1
+            self.total_area += frame.shape[0] * frame.shape[1]
+
+            if not decision.changed:
+                self.skipped += 1
+                return previous_result
+
+            dirty = decision.dirty
+            if dirty is not None and previous_result is not None and not boxes_overlap(previous_result.box, dirty):
+                self.skipped += 1
+                return previous_result
+
+            try:
+                if dirty is not None and previous_result is None:
+                    self.partial += 1
+                    x1, y1 = region[0], region[1]
+                    sub_frame = frame[dirty[1] - y1:dirty[3] - y1, dirty[0] - x1:dirty[2] - x1]
+                    self.matched_area += sub_frame.shape[0] * sub_frame.shape[1]
+                    result = find(sub_frame, dirty)
+                else:
+                    self.full += 1
+                    self.matched_area += frame.shape[0] * frame.shape[1]
+                    result = find(frame, region)
+            except Exception:
+                # 매칭에 실패한 프레임을 기준으로 다음 틱을 건너뛰지 않도록 초기화
+                self._previous = None
+                self._result = None
+                raise
+
+            self._result = result
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        """게이트 통계 (틱 수, 건너뛴/부분/전체 매칭 수, 건너뛴 비율, 매칭 면적 비율)"""
+        with self._lock:
+            ticks = self.ticks
+            return {
+                "ticks": ticks,
+                "skipped": self.skipped,
+                "partial": self.partial,
+                "full": self.full,
+                "skip_ratio": self.skipped / ticks if ticks else 0.0,
+                "area_ratio": self.matched_area / self.total_area if self.total_area else 0.0,
+            }
@@ -1,19 +1,33 @@
 """
-이미지 기반 자동 클릭 워커 (pyautogui 버전)
-- pyautogui를 사용한 간단한 이미지 인식 및 클릭
+이미지 기반 자동 클릭 워커
+- 공용 캡처 서비스 프레임에서 템플릿 매칭, pyautogui로 클릭
 - 전체 이미지가 구역 내에 있어야 감지
-- 조건부 시퀀스 실행: surak → hunt → filter 순차 처리
+- 조건부 시퀀스 실행: 단계표(click_sequence, 기본 surak → hunt → filter)를 틱마다 한 단계씩 실행
+- 시퀀스 단계의 조건/대상 조회는 틱마다 한 번 받은 프레임에서 수행 (모든 조회 구역을 감싸는 구역 캡처)
+- 이미지마다 마지막 위치 주변 창에서 마지막 템플릿만 먼저 확인하고 없을 때만 전체 영역 검색 (location_prior)
+- surak 검색은 직전 틱과 달라진 부분만 매칭 (change_gate)
+- 캡처/매칭/클릭은 워커 스레드(tick_thread)에서 실행하고, 결과는 시그널로 전달 (GUI 스레드 수신자는 대기열 연결)
 """
+import threading
 import time
-from typing import Optional, Tuple, List
-from PyQt5.QtCore import QObject, QTimer, pyqtSignal
-import pyautogui
-from PIL import Image
-from utils import resource_path
+from typing import Dict, Optional, Tuple, List
+from PyQt5.QtCore import QObject, pyqtSignal
+try:
+    import pyautogui
+except Exception:  # pragma: no cover - 디스플레이가 없는 환경 (리플레이 벤치마크 등)
+    pyautogui = None
+from template_matcher import MatchResult, TemplateMatcher, create_matcher
+from frame_capture import CapturedFrame, FrameCaptureService, shared_capture_service, union_region
+from capture_backends import CaptureBackend
+from frame_gate import ChangeGate
+from tick_thread import TickThread
+from click_sequence import (
+    DEFAULT_SEQUENCE, SURAK, CompiledStep, Lookup, SequenceStep, compile_sequence
+)
 
 
 class ImageClickerWorker(QObject):
-    """이미지를 찾아 자동으로 클릭하는 워커 (pyautogui 사용)"""
+    """이미지를 찾아 자동으로 클릭하는 워커"""
 
     image_clicked = pyqtSignal(int, int)  # 클릭 성공 (x, y)
     error_occurred = pyqtSignal(str)  # 오류 발생
@@ -24,7 +38,7 @@ class ImageClickerWorker(QObject):
     phase5_completed = pyqtSignal()  # Phase 5 완료 (리치해제 완료)
     phase6_progress = pyqtSignal(int, int)  # Phase 6 진행 상황 (경과 시간, 전체 시간)
 
-    def __init__(self):
+    def __init__(self, capture_backend: Optional[CaptureBackend] = None):
         super().__init__()
         self.is_running = False
         self.search_region: Optional[Tuple[int, int, int, int]] = None
@@ -33,9 +47,11 @@ class ImageClickerWorker(QObject):
         self.click_interval = 3000  # 3초마다 surak 검색
         self.action_interval = 500  # 0.5초 간격으로 액션
 
-        # 타이머
-        self.click_timer: Optional[QTimer] = None
-        self.sequence_timer: Optional[QTimer] = None
+        # 워커 스레드 (surak 검색은 click_interval, 시퀀스 중에는 action_interval 간격으로 틱)
+        self.click_thread: Optional[TickThread] = None
+        self._run_id = 0  # start마다 증가, 이전 실행의 스레드는 남은 틱을 건너뜀
+        self._match_lock = threading.Lock()  # 틱과 설정 변경이 겹치지 않도록
+        self._action_lock = threading.Lock()  # 클릭과 중지가 겹치지 않도록 (중지 뒤 늦은 클릭 방지)
 
         # 상태
         self.image_found = False
@@ -44,13 +60,36 @@ class ImageClickerWorker(QObject):
         
         # 시퀀스 관련
         self.is_sequence_running = False
-        self.sequence_phase = 0  # 시퀀스 단계
+        self.sequence_phase = 0  # 시퀀스 단계 (1부터, 단계표 길이를 넘으면 완료)
         self.wait_counter = 0  # 대기 카운터
-        self.phase6_start_time = 0  # Phase 6 시작 시간
+        self.wait_start_time = 0  # wait 단계 시작 시간
         
         # 창인식 영역 (고정: 20, 20, 1296, 759)
         self.window_region = (20, 20, 1296, 759)
 
+        # 시퀀스 단계표 (설정의 surak 템플릿/구역이 정해지면 컴파일)
+        self.sequence_steps: List[SequenceStep] = list(DEFAULT_SEQUENCE)
+        self.sequence: List[CompiledStep] = []
+        self.sequence_region: Tuple[int, int, int, int] = self.window_region
+
+        # 매칭 및 공용 캡처 서비스
+        self.matcher = TemplateMatcher()
+        if capture_backend is not None:
+            self.capture_service = FrameCaptureService(capture_backend)
+        else:
+            self.capture_service = shared_capture_service()
+        self.search_capture_name = "image_clicker.search"
+        self.window_capture_name = "image_clicker.window"
+
+        # 이전 위치 우선 검색 (이미지 경로 → 마지막 매칭 결과)
+        self.location_prior = True
+        self.prior_padding = 40
+        self.prior_matches: Dict[str, MatchResult] = {}
+
+        # surak 검색 구역 변화 게이트
+        self.use_change_gate = True
+        self.search_gate = ChangeGate()
+
     def set_config(
         self,
         search_region: Tuple[int, int, int, int],
@@ -58,9 +97,12 @@ class ImageClickerWorker(QObject):
         confidence: float = 0.7
     ):
         """단일 템플릿 설정 (기존 호환성 유지)"""
-        self.search_region = search_region
-        self.template_paths = [template_path]
-        self.confidence = confidence
+        with self._match_lock:
+            self.search_region = search_region
+            self.template_paths = [template_path]
+            self.confidence = confidence
+            self.search_gate.reset()
+            self._compile_sequence()
         print(f"이미지 클릭 설정: 구역={search_region}, 템플릿={template_path}, 신뢰도={confidence}")
 
     def set_config_multi(
@@ -70,375 +112,324 @@ class ImageClickerWorker(QObject):
         confidence: float = 0.7
     ):
         """다중 템플릿 설정 (3개의 surak 이미지 지원)"""
-        self.search_region = search_region
-        self.template_paths = template_paths
-        self.confidence = confidence
+        with self._match_lock:
+            self.search_region = search_region
+            self.template_paths = template_paths
+            self.confidence = confidence
+            self.search_gate.reset()
+            self._compile_sequence()
         print(f"이미지 클릭 설정: 구역={search_region}, 템플릿={len(template_paths)}개, 신뢰도={confidence}")
 
+    def set_sequence(self, steps: List[SequenceStep]):
+        """시퀀스 단계표 변경 (다음 틱부터 적용)"""
+        with self._match_lock:
+            self.sequence_steps = list(steps) or list(DEFAULT_SEQUENCE)
+            self._compile_sequence()
+        print(f"리치 자동클릭 시퀀스: {len(self.sequence_steps)}단계")
+
+    def set_matching_engine(self, engine: str, fft_cache_mb: Optional[int] = None):
+        """
+        매칭 엔진 변경 (spatial: 원본 해상도 전체 검색 / pyramid: 축소 후 후보 주변만 확인 / fft: 주파수 영역)
+        fft_cache_mb는 fft 엔진의 템플릿 스펙트럼 보관 한도 (None이면 기본값)
+        """
+        try:
+            matcher = create_matcher(engine, fft_cache_mb)
+            with self._match_lock:
+                self.matcher = matcher
+                self.search_gate.reset()
+            print(f"매칭 엔진: {engine}")
+        except ValueError as e:
+            print(f"매칭 엔진 설정 실패: {e}")
+
+    def set_location_prior(self, enabled: bool):
+        """마지막 위치 주변 먼저 검색 사용 여부"""
+        with self._match_lock:
+            self.location_prior = bool(enabled)
+            self.prior_matches.clear()
+
+    def set_change_gate(self, enabled: bool):
+        """surak 검색 변화 게이트 사용 여부"""
+        with self._match_lock:
+            self.use_change_gate = bool(enabled)
+            self.search_gate.reset()
+
     def start(self):
         """이미지 검색 및 클릭 시작"""
         if self.is_running or not self.search_region or not self.template_paths:
             return
 
-        self.is_running = True
-        self.image_found = False
-        self.last_location = None
-        self.current_template = None
-        self.is_sequence_running = False
-        self.sequence_phase = 0
-        self.phase6_start_time = 0
-
         print(f"이미지 클릭 시작: 구역={self.search_region}, 템플릿 {len(self.template_paths)}개, 신뢰도={self.confidence}")
 
-        # 3초마다 surak 이미지 검색
-        self.click_timer = QTimer()
-        self.click_timer.timeout.connect(self._search_surak)
-        self.click_timer.start(self.click_interval)
-        self._search_surak()
+        self.capture_service.subscribe(self.search_capture_name, self.search_region, self.click_interval)
+
+        # 이전 실행의 틱이 끝난 뒤에 상태를 초기화하고 새 실행 번호와 스레드를 공개
+        # (틱은 _match_lock 안에서 실행 번호를 다시 확인하므로, 이후 이전 실행의 틱은 아무것도 하지 않음)
+        with self._match_lock:
+            self.is_running = True
+            self.image_found = False
+            self.last_location = None
+            self.prior_matches.clear()
+            self.search_gate.reset()
+            self.current_template = None
+            self.is_sequence_running = False
+            self.sequence_phase = 0
+            self.wait_counter = 0
+            self.wait_start_time = 0
 
-    def stop(self):
-        """이미지 검색 중지"""
+            # 3초마다 surak 이미지 검색 (첫 검색은 워커 스레드에서 바로 실행)
+            self._run_id += 1
+            run_id = self._run_id
+            thread = TickThread(
+                "image_clicker", self.click_interval, lambda: self._tick(run_id), self._print_gate_stats
+            )
+            self.click_thread = thread
+        thread.start()
+
+    def stop(self, wait: float = 0.0) -> Optional[TickThread]:
+        """
+        이미지 검색 중지 (진행 중인 틱은 wait초까지만 기다림, 기본은 기다리지 않음)
+        워커 스레드를 반환하므로 여러 워커를 함께 기다릴 때는 tick_thread.join_all 사용
+        시퀀스 상태는 진행 중인 틱이 덮어쓸 수 있으므로 여기서 지우지 않고 다음 start()에서 초기화
+        """
         print("이미지 클릭 중지")
-        self.is_running = False
-        self.image_found = False
-        self.last_location = None
-        self.current_template = None
-        self.is_sequence_running = False
-        self.sequence_phase = 0
-        self.phase6_start_time = 0
+        with self._action_lock:
+            # 진행 중인 클릭이 끝난 뒤에 중지 (이후 끝나는 틱은 클릭하지 않음)
+            self.is_running = False
+
+        thread = self.click_thread
+        self.click_thread = None
+        if thread:
+            thread.stop()
+            if wait > 0:
+                thread.join(wait)
+
+        self.capture_service.unsubscribe(self.search_capture_name)
+        self.capture_service.unsubscribe(self.window_capture_name)
+        return thread
+
+    def _print_gate_stats(self):
+        """워커 스레드가 끝날 때 변화 게이트 통계 출력"""
+        gate = self.search_gate.stats()
+        if gate["ticks"]:
+            print(f"surak 변화 게이트: 건너뜀 {gate['skip_ratio']:.0%}, 매칭 면적 {gate['area_ratio']:.0%} ({gate['ticks']}틱)")
+
+    def _tick(self, run_id: int):
+        """워커 스레드 틱: 시퀀스 중이면 한 단계 실행, 아니면 surak 검색"""
+        if not self.is_running or run_id != self._run_id:
+            return
+        with self._match_lock:
+            # 락을 기다리는 동안 중지 → 재시작됐으면 이전 실행의 틱이므로 건너뜀
+            if not self.is_running or run_id != self._run_id:
+                return
+            if self.is_sequence_running:
+                self._execute_sequence(run_id)
+            else:
+                self._search_surak(run_id)
 
-        if self.click_timer:
-            self.click_timer.stop()
-            self.click_timer = None
-            
-        if self.sequence_timer:
-            self.sequence_timer.stop()
-            self.sequence_timer = None
+    def _set_tick_interval(self, interval_ms: int, run_id: int):
+        """run_id 실행의 워커 스레드 다음 틱 간격 변경 (다른 실행의 스레드는 건드리지 않음)"""
+        thread = self.click_thread
+        if thread and run_id == self._run_id:
+            thread.set_interval(interval_ms)
 
-    def _search_surak(self):
+    def _search_surak(self, run_id: int):
         """surak 이미지 검색 (3초 간격)"""
         if not self.is_running or self.is_sequence_running:
             return
 
         try:
-            x1, y1, x2, y2 = self.search_region
-            region_width = x2 - x1
-            region_height = y2 - y1
-            
-            # 모든 surak 템플릿에 대해 검색
-            found = False
-            
-            for idx, template_path in enumerate(self.template_paths):
-                template_full_path = resource_path(template_path)
-                template_img = Image.open(template_full_path)
-
-                location = pyautogui.locateOnScreen(
-                    template_full_path,
-                    confidence=self.confidence,
-                    region=(x1, y1, region_width, region_height)
+            # 구역을 한 번 받아 모든 surak 템플릿을 검색
+            captured = self.capture_service.get_frame(self.search_capture_name)
+            frame = captured.image
+            if self.use_change_gate:
+                margin = self.matcher.max_template_size(self.template_paths)
+                match = self.search_gate.search(
+                    frame, self.search_region, margin,
+                    lambda search_frame, region: self.matcher.find_first(
+                        search_frame, region, self.template_paths, self.confidence
+                    )
                 )
+            else:
+                match = self.matcher.find_first(frame, self.search_region, self.template_paths, self.confidence)
+            self.capture_service.release(self.search_capture_name, captured)
+            found = match is not None
+
+            if match:
+                left, top, right, bottom = match.box
+                self.image_found = True
+                self.last_location = match.box
+                self.prior_matches[SURAK] = match
+                self.current_template = match.template_path
 
-                if location:
-                    left, top, width, height = location
-                    right = left + width
-                    bottom = top + height
-                    
-                    # 전체 이미지가 구역 내에 있는지 확인
-                    if left >= x1 and top >= y1 and right <= x2 and bottom <= y2:
-                        found = True
-                        self.image_found = True
-                        self.last_location = (left, top, right, bottom)
-                        self.current_template = template_path
-                        
-                        print(f"✓ [SURAK FOUND] {template_path} 발견 at ({left}, {top}, {right}, {bottom})")
-                        print(f"→ surak 사라질 때까지 0.5초마다 클릭 시작")
-                        
-                        # surak 클릭 단계로 전환
-                        self._start_surak_clicking()
-                        break
+                print(f"✓ [SURAK FOUND] {match.template_path} 발견 at ({left}, {top}, {right}, {bottom})")
+                print(f"→ surak 사라질 때까지 0.5초마다 클릭 시작")
+
+                # surak 클릭 단계로 전환
+                self._start_surak_clicking(run_id)
 
             if not found and self.image_found:
                 print("[SURAK] 이미지 없음 (계속 검색 중...)")
 
         except Exception as e:
+            # 중지 직후 캡처 구독 해제로 생긴 오류는 무시
+            if not self.is_running:
+                return
             error_msg = f"surak 검색 오류: {e}"
             print(f"[ERROR] {error_msg}")
             self.error_occurred.emit(error_msg)
 
-    def _start_surak_clicking(self):
+    def _start_surak_clicking(self, run_id: int):
         """surak 클릭 단계 시작"""
-        if self.is_sequence_running:
+        if self.is_sequence_running or not self.is_running or run_id != self._run_id:
             return
             
-        # 3초 타이머 중지
-        if self.click_timer:
-            self.click_timer.stop()
-            
         self.is_sequence_running = True
-        self.sequence_phase = 1  # Phase 1: surak 클릭
+        self.sequence_phase = 1  # 단계표의 첫 단계부터
+        self.wait_counter = 0
+        self.wait_start_time = 0
         
         print("\n" + "="*60)
-        print("시퀀스 시작: Phase 1 - surak 클릭")
+        print(f"시퀀스 시작: {len(self.sequence)}단계")
         print("="*60 + "\n")
         self.sequence_started.emit()
+
+        # 시퀀스 동안 단계표의 모든 조회 구역을 한 프레임으로 캡처 구독
+        # (클릭 결과를 바로 봐야 하므로 오래된 프레임은 쓰지 않음)
+        self.capture_service.subscribe(
+            self.window_capture_name, self.sequence_region, self.action_interval, max_age_ms=100
+        )
         
-        # 0.5초마다 실행되는 시퀀스 타이머
-        self.sequence_timer = QTimer()
-        self.sequence_timer.timeout.connect(self._execute_sequence)
-        self.sequence_timer.start(self.action_interval)
+        # 다음 틱부터 0.5초마다 시퀀스 실행
+        self._set_tick_interval(self.action_interval, run_id)
 
-    def _execute_sequence(self):
-        """시퀀스 단계별 실행"""
+    def _execute_sequence(self, run_id: int):
+        """시퀀스 한 틱 실행 (현재 단계의 조회는 한 프레임에서 수행)"""
         if not self.is_running or not self.is_sequence_running:
-            if self.sequence_timer:
-                self.sequence_timer.stop()
-                self.sequence_timer = None
             return
 
         try:
-            if self.sequence_phase == 1:
-                # Phase 1: surak 사라질 때까지 클릭
-                self._phase1_click_surak()
-                
-            elif self.sequence_phase == 2:
-                # Phase 2: hunt 보일 때까지 malon 더블클릭
-                self._phase2_malon_until_hunt()
-                
-            elif self.sequence_phase == 3:
-                # Phase 3: filter 보일 때까지 hunt 클릭
-                self._phase3_hunt_until_filter()
-                
-            elif self.sequence_phase == 4:
-                # Phase 4: 0.5초 대기 후 filter 클릭
-                self._phase4_wait_and_click_filter()
-                
-            elif self.sequence_phase == 5:
-                # Phase 5: filter 안 보일 때까지 malon 더블클릭
-                self._phase5_malon_until_filter_gone()
-                
-            elif self.sequence_phase == 6:
-                # Phase 6: 3분 대기
-                self._phase6_wait_3min()
-                
-            elif self.sequence_phase == 7:
-                # Phase 7: hunt 보일 때까지 malon 더블클릭
-                self._phase7_malon_until_hunt()
-                
-            elif self.sequence_phase == 8:
-                # Phase 8: filter 보일 때까지 hunt 클릭
-                self._phase8_hunt_until_filter()
-                
-            elif self.sequence_phase == 9:
-                # Phase 9: 0.5초 대기 후 filter 클릭
-                self._phase9_wait_and_click_filter()
-                
-            elif self.sequence_phase == 10:
-                # Phase 10: filter 안 보일 때까지 malon 더블클릭
-                self._phase10_malon_until_filter_gone()
-                
+            if self.sequence_phase > len(self.sequence):
+                self._complete_sequence(run_id)
+            elif self.sequence[self.sequence_phase - 1].step.kind == "wait":
+                self._run_wait_step(self.sequence[self.sequence_phase - 1])
             else:
-                # 시퀀스 완료
-                self._complete_sequence()
+                self._run_step(self.sequence[self.sequence_phase - 1], run_id)
 
         except Exception as e:
+            # 중지 직후 캡처 구독 해제로 생긴 오류는 무시
+            if not self.is_running:
+                return
             error_msg = f"시퀀스 실행 오류: {e}"
             print(f"[ERROR] {error_msg}")
             self.error_occurred.emit(error_msg)
-            self._complete_sequence()
+            self._complete_sequence(run_id)
+
+    def _run_step(self, compiled: CompiledStep, run_id: int):
+        """until / once 단계 한 틱"""
+        step = compiled.step
+        if step.kind == "once" and self.wait_counter < step.delay_ticks:
+            self.wait_counter += 1
+            print(f"[Phase {compiled.number}] {step.delay_ticks * self.action_interval / 1000:g}초 대기 중...")
+            return
 
-    def _phase1_click_surak(self):
-        """Phase 1: surak 사라질 때까지 클릭"""
-        found = self._find_image_in_region("img/surak/surak.png", self.search_region) or \
-                self._find_image_in_region("img/surak/surak2.png", self.search_region) or \
-                self._find_image_in_region("img/surak/surak3.png", self.search_region)
-        
-        if found:
-            x, y = found
-            pyautogui.moveTo(x, y, duration=0.05)
-            pyautogui.click()
-            print(f"[Phase 1] surak 클릭: ({x}, {y})")
-            self.image_clicked.emit(x, y)
-        else:
-            print("[Phase 1] surak 사라짐 → Phase 2로 전환")
-            self.sequence_phase = 2
-            self.sequence_step.emit("Phase 1 완료: surak 사라짐")
+        frame = self.capture_service.get_frame(self.window_capture_name)
+        done, match = self._evaluate_step(compiled, frame)
+        self.capture_service.release(self.window_capture_name, frame)
+        if done:
+            self._advance(compiled)
+            return
 
-    def _phase2_malon_until_hunt(self):
-        """Phase 2: hunt 보일 때까지 malon 더블클릭"""
-        hunt_found = self._find_image_in_region("img/hunt.png", self.window_region)
-        
-        if hunt_found:
-            print("[Phase 2] hunt 발견 → Phase 3로 전환")
-            self.sequence_phase = 3
-            self.sequence_step.emit("Phase 2 완료: hunt 발견")
-        else:
-            malon_found = self._find_image_in_region("img/malon.png", self.window_region)
-            if malon_found:
-                x, y = malon_found
-                pyautogui.moveTo(x, y, duration=0.05)
+        if match:
+            self._click(compiled, match, run_id)
+        if step.kind == "once":
+            if match:
+                self._advance(compiled)
+            else:
+                print(f"[Phase {compiled.number}] {compiled.target.label} 없음 → 다음 단계로 전환")
+                self._advance(compiled, report=False)
+
+    def _evaluate_step(self, compiled: CompiledStep, frame: CapturedFrame) -> Tuple[bool, Optional[MatchResult]]:
+        """
+        한 프레임에서 단계의 조건과 대상을 평가합니다. → (단계 완료 여부, 동작할 대상 매칭)
+        조건이 충족되면 대상은 조회하지 않고, 조건과 대상이 같은 이미지면 조회 한 번으로 둘 다 판단
+        """
+        step = compiled.step
+        found: Dict[Lookup, Optional[MatchResult]] = {}
+
+        def locate(lookup: Lookup) -> Optional[MatchResult]:
+            if lookup not in found:
+                found[lookup] = self._locate(frame, lookup)
+            return found[lookup]
+
+        if step.kind == "until":
+            visible = locate(compiled.watch) is not None
+            if visible == (step.until == "visible"):
+                return True, None
+        return False, locate(compiled.target)
+
+    def _click(self, compiled: CompiledStep, match: MatchResult, run_id: int):
+        """단계의 동작(클릭 / 더블클릭)을 매칭 중심에 수행 (중지 뒤에 끝난 틱이나 이전 실행의 틱이면 클릭하지 않음)"""
+        x, y = match.center
+        with self._action_lock:
+            if not self.is_running or run_id != self._run_id:
+                return
+            pyautogui.moveTo(x, y, duration=0.05)
+            if compiled.step.action == "double_click":
                 pyautogui.doubleClick()
-                print(f"[Phase 2] malon 더블클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
-
-    def _phase3_hunt_until_filter(self):
-        """Phase 3: filter 보일 때까지 hunt 클릭"""
-        filter_found = self._find_image_in_region("img/filter.png", self.window_region)
-        
-        if filter_found:
-            print("[Phase 3] filter 발견 → Phase 4로 전환")
-            self.sequence_phase = 4
-            self.wait_counter = 0
-            self.sequence_step.emit("Phase 3 완료: filter 발견")
-        else:
-            hunt_found = self._find_image_in_region("img/hunt.png", self.window_region)
-            if hunt_found:
-                x, y = hunt_found
-                pyautogui.moveTo(x, y, duration=0.05)
+                action = "더블클릭"
+            else:
                 pyautogui.click()
-                print(f"[Phase 3] hunt 클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
+                action = "클릭"
+        print(f"[Phase {compiled.number}] {compiled.target.label} {action}: ({x}, {y})")
+        self.image_clicked.emit(x, y)
+
+    def _run_wait_step(self, compiled: CompiledStep):
+        """wait 단계 한 틱 (진행 상황은 phase6_progress로 전달)"""
+        total_seconds = compiled.step.seconds
 
-    def _phase4_wait_and_click_filter(self):
-        """Phase 4: 0.5초 대기 후 filter 클릭"""
         if self.wait_counter == 0:
-            print("[Phase 4] 0.5초 대기 중...")
+            print(f"[Phase {compiled.number}] {total_seconds}초 대기 시작...")
             self.wait_counter = 1
-        else:
-            filter_found = self._find_image_in_region("img/filter.png", self.window_region)
-            if filter_found:
-                x, y = filter_found
-                pyautogui.moveTo(x, y, duration=0.05)
-                pyautogui.click()
-                print(f"[Phase 4] filter 클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
-                self.sequence_phase = 5
-                self.sequence_step.emit("Phase 4 완료: filter 클릭")
-            else:
-                print("[Phase 4] filter 없음, Phase 5로 전환")
-                self.sequence_phase = 5
+            if not self.wait_start_time:
+                self.wait_start_time = time.time()
 
-    def _phase5_malon_until_filter_gone(self):
-        """Phase 5: filter 안 보일 때까지 malon 더블클릭"""
-        filter_found = self._find_image_in_region("img/filter.png", self.window_region)
-        
-        if not filter_found:
-            print("[Phase 5] filter 사라짐 → Phase 6 (3분 대기)로 전환")
-            self.sequence_phase = 6
-            self.wait_counter = 0
-            self.phase6_start_time = time.time()
-            self.sequence_step.emit("Phase 5 완료: filter 사라짐, 3분 대기 시작")
-            
-            # Phase 5 완료 시그널 발송 (텔레그램 알림용)
-            self.phase5_completed.emit()
-            
-            # Phase 6 시작 시그널 (UI 업데이트용)
-            self.phase6_progress.emit(0, 180)
-        else:
-            malon_found = self._find_image_in_region("img/malon.png", self.window_region)
-            if malon_found:
-                x, y = malon_found
-                pyautogui.moveTo(x, y, duration=0.05)
-                pyautogui.doubleClick()
-                print(f"[Phase 5] malon 더블클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
+        elapsed = int(time.time() - self.wait_start_time)
 
-    def _phase6_wait_3min(self):
-        """Phase 6: 3분(180초) 대기"""
-        total_seconds = 180
-        
-        if self.wait_counter == 0:
-            print("[Phase 6] 3분(180초) 대기 시작...")
-            self.wait_counter = 1
-            self.phase6_start_time = time.time()
-        
-        elapsed = int(time.time() - self.phase6_start_time)
-        
         # UI에 진행 상황 전송
         self.phase6_progress.emit(elapsed, total_seconds)
-        
-        if elapsed >= total_seconds:  # 3분
-            print("[Phase 6] 3분 대기 완료 → Phase 7로 전환")
-            self.sequence_phase = 7
-            self.wait_counter = 0
-            self.sequence_step.emit("Phase 6 완료: 3분 대기 완료")
+
+        if elapsed >= total_seconds:
+            self._advance(compiled)
             # 마지막 진행 상황 전송 (0초 남음)
             self.phase6_progress.emit(total_seconds, total_seconds)
         elif elapsed % 30 == 0 and elapsed > 0:  # 30초마다 로그 (0초 제외)
             remaining = total_seconds - elapsed
-            print(f"[Phase 6] 대기 중... ({elapsed}초 경과 / {remaining}초 남음)")
-
-    def _phase7_malon_until_hunt(self):
-        """Phase 7: hunt 보일 때까지 malon 더블클릭"""
-        hunt_found = self._find_image_in_region("img/hunt.png", self.window_region)
-        
-        if hunt_found:
-            print("[Phase 7] hunt 발견 → Phase 8로 전환")
-            self.sequence_phase = 8
-            self.sequence_step.emit("Phase 7 완료: hunt 발견")
-        else:
-            malon_found = self._find_image_in_region("img/malon.png", self.window_region)
-            if malon_found:
-                x, y = malon_found
-                pyautogui.moveTo(x, y, duration=0.05)
-                pyautogui.doubleClick()
-                print(f"[Phase 7] malon 더블클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
-
-    def _phase8_hunt_until_filter(self):
-        """Phase 8: filter 보일 때까지 hunt 클릭"""
-        filter_found = self._find_image_in_region("img/filter.png", self.window_region)
-        
-        if filter_found:
-            print("[Phase 8] filter 발견 → Phase 9로 전환")
-            self.sequence_phase = 9
-            self.wait_counter = 0
-            self.sequence_step.emit("Phase 8 완료: filter 발견")
-        else:
-            hunt_found = self._find_image_in_region("img/hunt.png", self.window_region)
-            if hunt_found:
-                x, y = hunt_found
-                pyautogui.moveTo(x, y, duration=0.05)
-                pyautogui.click()
-                print(f"[Phase 8] hunt 클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
+            print(f"[Phase {compiled.number}] 대기 중... ({elapsed}초 경과 / {remaining}초 남음)")
+
+    def _advance(self, compiled: CompiledStep, report: bool = True):
+        """다음 단계로 전환 (report면 완료 알림)"""
+        step = compiled.step
+        next_phase = compiled.number + 1
+        if report:
+            message = step.done_message()
+            after = f"Phase {next_phase}로 전환" if next_phase <= len(self.sequence) else "시퀀스 완료"
+            print(f"[Phase {compiled.number}] {message} → {after}")
+            self.sequence_step.emit(f"Phase {compiled.number} 완료: {message}")
+
+        self.sequence_phase = next_phase
+        self.wait_counter = 0
+        self.wait_start_time = 0
 
-    def _phase9_wait_and_click_filter(self):
-        """Phase 9: 0.5초 대기 후 filter 클릭"""
-        if self.wait_counter == 0:
-            print("[Phase 9] 0.5초 대기 중...")
-            self.wait_counter = 1
-        else:
-            filter_found = self._find_image_in_region("img/filter.png", self.window_region)
-            if filter_found:
-                x, y = filter_found
-                pyautogui.moveTo(x, y, duration=0.05)
-                pyautogui.click()
-                print(f"[Phase 9] filter 클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
-                self.sequence_phase = 10
-                self.sequence_step.emit("Phase 9 완료: filter 클릭")
-            else:
-                print("[Phase 9] filter 없음, Phase 10으로 전환")
-                self.sequence_phase = 10
+        if step.notify:
+            # 단계 완료 시그널 발송 (텔레그램 알림용)
+            self.phase5_completed.emit()
 
-    def _phase10_malon_until_filter_gone(self):
-        """Phase 10: filter 안 보일 때까지 malon 더블클릭"""
-        filter_found = self._find_image_in_region("img/filter.png", self.window_region)
-        
-        if not filter_found:
-            print("[Phase 10] filter 사라짐 → 시퀀스 완료")
-            self.sequence_phase = 11  # 완료 단계
-            self.sequence_step.emit("Phase 10 완료: filter 사라짐")
-        else:
-            malon_found = self._find_image_in_region("img/malon.png", self.window_region)
-            if malon_found:
-                x, y = malon_found
-                pyautogui.moveTo(x, y, duration=0.05)
-                pyautogui.doubleClick()
-                print(f"[Phase 10] malon 더블클릭: ({x}, {y})")
-                self.image_clicked.emit(x, y)
+        # 다음 단계가 대기면 지금부터 시간을 재고 UI에 시작 알림
+        if next_phase <= len(self.sequence) and self.sequence[next_phase - 1].step.kind == "wait":
+            self.wait_start_time = time.time()
+            self.phase6_progress.emit(0, self.sequence[next_phase - 1].step.seconds)
 
-    def _complete_sequence(self):
+    def _complete_sequence(self, run_id: int):
         """시퀀스 완료"""
         print("\n" + "="*60)
         print("시퀀스 완료!")
@@ -447,48 +438,55 @@ class ImageClickerWorker(QObject):
         self.is_sequence_running = False
         self.sequence_phase = 0
         self.wait_counter = 0
-        self.phase6_start_time = 0
-        
-        if self.sequence_timer:
-            self.sequence_timer.stop()
-            self.sequence_timer = None
+        self.wait_start_time = 0
+
+        self.capture_service.unsubscribe(self.window_capture_name)
             
-        # 3초 타이머 재시작
-        if self.click_timer:
-            self.click_timer.start(self.click_interval)
+        # 다시 3초마다 surak 검색
+        self._set_tick_interval(self.click_interval, run_id)
             
         self.sequence_completed.emit()
 
-    def _find_image_in_region(self, image_path: str, region: Tuple[int, int, int, int]) -> Optional[Tuple[int, int]]:
-        """특정 영역에서 이미지를 찾아 중심 좌표 반환"""
+    def _resolve_image(self, name: str) -> Lookup:
+        """단계표의 이미지 이름 → 조회 (surak은 surak 템플릿 목록과 검색 구역, 나머지는 창인식 영역)"""
+        if name == SURAK:
+            return Lookup(SURAK, tuple(self.template_paths), tuple(self.search_region))
+        return Lookup(name, (name,), tuple(self.window_region))
+
+    def _compile_sequence(self):
+        """단계표를 조회로 컴파일하고 시퀀스 캡처 구역(모든 조회 구역을 감싸는 구역)을 정합니다."""
+        if not self.search_region:
+            return
+        self.sequence = compile_sequence(self.sequence_steps, self._resolve_image)
+        regions = [lookup.region for compiled in self.sequence for lookup in compiled.lookups]
+        self.sequence_region = union_region(regions) if regions else tuple(self.window_region)
+
+    def _locate(self, frame: CapturedFrame, lookup: Lookup) -> Optional[MatchResult]:
+        """시퀀스 프레임에서 조회 구역 부분만 잘라 검색 (이전 위치 주변 창에서 이전 템플릿 먼저, 없을 때만 전체 구역)"""
+        fx1, fy1 = frame.region[0], frame.region[1]
+        x1, y1, x2, y2 = lookup.region
+        view = frame.image[y1 - fy1:y2 - fy1, x1 - fx1:x2 - fx1]
+
+        match = None
         try:
-            x1, y1, x2, y2 = region
-            region_width = x2 - x1
-            region_height = y2 - y1
-            
-            template_full_path = resource_path(image_path)
-            
-            location = pyautogui.locateOnScreen(
-                template_full_path,
-                confidence=self.confidence,
-                region=(x1, y1, region_width, region_height)
-            )
-            
-            if location:
-                left, top, width, height = location
-                right = left + width
-                bottom = top + height
-                
-                # 전체 이미지가 구역 내에 있는지 확인
-                if left >= x1 and top >= y1 and right <= x2 and bottom <= y2:
-                    x = left + width // 2
-                    y = top + height // 2
-                    return (x, y)
-            
-            return None
-            
+            # 다른 템플릿은 창에서 검사해도 전체 구역 검색에서 다시 검사해야 하므로 이전 템플릿만 확인
+            prior = self.prior_matches.get(lookup.key)
+            if self.location_prior and prior:
+                match = self.matcher.find_near(
+                    view, lookup.region, prior.box, [prior.template_path], self.confidence, self.prior_padding
+                )
+            if match is None:
+                match = self.matcher.find_first(view, lookup.region, lookup.template_paths, self.confidence)
         except Exception as e:
-            return None
+            # 기존 _find_image_in_region과 같이 조회 실패는 못 찾은 것으로 처리 (시퀀스는 다음 틱에 다시 시도)
+            print(f"[ERROR] 이미지 검색 오류 ({lookup.label}): {e}")
+            match = None
+
+        if match:
+            self.prior_matches[lookup.key] = match
+        else:
+            self.prior_matches.pop(lookup.key, None)
+        return match
 
     def on_image_release_completed(self):
         """외부에서 호출 가능한 릴리즈 완료 핸들러"""
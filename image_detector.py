@@ -1,28 +1,53 @@
 """
-이미지 감지 및 텔레그램 알림 (pyautogui 버전)
-- pyautogui를 사용한 간단한 이미지 인식
+이미지 감지 및 텔레그램 알림
+- 구역을 틱당 한 번만 캡처하고 모든 템플릿을 같은 프레임에서 매칭 (single_capture)
+- single_capture를 끄면 기존 pyautogui 템플릿별 검색 사용
+- parallel_workers > 0이면 템플릿들을 스레드 풀에서 병렬 검색
+- 최근에 자주 맞은 템플릿부터 검색 (template_stats)
+- 비슷한 템플릿은 클러스터 대표만 먼저 검색 (template_clustering, parallel_workers와 함께 사용 가능)
+- 이전 감지 위치 주변 창에서 직전 템플릿만 먼저 확인하고 없을 때만 전체 구역 검색 (location_prior)
+- 직전 틱과 달라진 부분만 매칭하고, 변화가 없으면 직전 결과 재사용 (change_gate)
 - 전체 이미지가 구역 내에 있어야 감지
 - 감지 시 구역 스크린샷 + 매칭 위치 표시
+- 텔레그램 전송은 공용 알림 서비스(notifier)의 큐에 넣고 바로 반환
+- 캡처/매칭은 감지 스레드(tick_thread)에서 실행하고, 감지 상태 변화만 대기열 시그널로 GUI 스레드에 전달
 """
-import asyncio
 import threading
-import time
-import io
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, List
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer
-import pyautogui
+try:
+    import pyautogui
+except Exception:  # pragma: no cover - 디스플레이가 없는 환경 (리플레이 벤치마크 등)
+    pyautogui = None
 from PIL import ImageGrab, Image, ImageDraw
-from telegram import Bot
-from telegram.error import TelegramError
 from utils import resource_path
+from template_matcher import MatchResult, TemplateMatcher, create_matcher
+from template_stats import TemplateHitStats
+from template_clusters import TemplateClusterIndex
+from frame_gate import ChangeGate
+from frame_capture import CapturedFrame, FrameCaptureService, shared_capture_service
+from capture_backends import CaptureBackend
+from notifier import NotificationService, PhotoOptions, shared_notifier
+from tick_thread import TickThread
+
+
+# 감지/사라짐 알림의 상태 키 (전송 전에 반대 상태가 오면 둘 다 취소, user_detector의 "user:구역"과 같은 방식)
+STATE_KEY = "image:gt"
 
 
 class ImageDetector(QObject):
-    """이미지 감지 및 텔레그램 알림 클래스 (pyautogui 사용)"""
+    """이미지 감지 및 텔레그램 알림 클래스"""
 
     image_detected = pyqtSignal(str)
+    stopped = pyqtSignal()  # 중지 후 대기 중인 알림까지 전달되면 (알림 서비스 스레드에서 발생, 대기열 연결)
+    _detection_changed = pyqtSignal(int, bool)  # (실행 번호, 감지 여부) 감지 스레드 → GUI 스레드
 
-    def __init__(self):
+    def __init__(
+        self,
+        capture_backend: Optional[CaptureBackend] = None,
+        notifier: Optional[NotificationService] = None
+    ):
         super().__init__()
         self.is_running = False
         self.detection_region: Optional[Tuple[int, int, int, int]] = None
@@ -32,25 +57,60 @@ class ImageDetector(QObject):
         self.confidence_threshold = 0.8
         self.check_interval = 5000  # 5초
 
+        # 매칭 방식: True면 구역을 한 번 캡처해 모든 템플릿 검색, False면 템플릿마다 pyautogui 캡처
+        self.single_capture = True
+        self.matcher = TemplateMatcher()
+        # 캡처 백엔드를 따로 받으면 전용 캡처 서비스 사용 (벤치마크/리플레이)
+        if capture_backend is not None:
+            self.capture_service = FrameCaptureService(capture_backend)
+        else:
+            self.capture_service = shared_capture_service()
+        self.capture_name = "image_detector"
+
+        # 병렬 검색 (0이면 순차 검색)
+        self.parallel_workers = 0
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+        # 템플릿 적중 통계 (검색 순서 결정)
+        self.hit_stats = TemplateHitStats()
+
+        # 템플릿 클러스터 (대표 먼저 검색)
+        self.template_clustering = True
+        self.cluster_index = TemplateClusterIndex()
+
+        # 이전 위치 우선 검색 (prior_match: 직전 틱의 감지 결과, 못 찾으면 None)
+        # 창에서는 직전 템플릿만 확인하므로 사라진 틱도 전체 구역 검색 + 1개만 더 검사
+        self.location_prior = True
+        self.prior_padding = 40
+        self.prior_match: Optional[MatchResult] = None
+
+        # 프레임 변화 게이트
+        self.use_change_gate = True
+        self.change_gate = ChangeGate()
+
         # 텔레그램 설정
         self.telegram_token: Optional[str] = None
         self.telegram_chat_id: Optional[str] = None
         self.user_nickname: str = "유저"
 
-        # 타이머
-        self.check_timer: Optional[QTimer] = None
+        # 감지 스레드 (캡처/매칭은 GUI 스레드 밖에서 실행)
+        self.check_thread: Optional[TickThread] = None
+        self._run_id = 0  # start마다 증가, 이전 실행의 늦은 결과는 버림
+        self._match_lock = threading.Lock()  # 매칭 틱과 설정 변경이 겹치지 않도록
+        self._result_lock = threading.Lock()  # 틱 결과 처리와 중지가 겹치지 않도록 (중지 뒤 늦은 알림 방지)
 
         # 감지 상태
         self.last_detected = False
         self.detection_count = 0
         self.last_screenshot: Optional[Image.Image] = None
+        self.last_frame = None  # 마지막 틱에서 캡처한 구역 프레임 (single_capture)
+        self.last_captured: Optional[CapturedFrame] = None  # last_frame을 담은 캡처 서비스 프레임 (틱이 끝나면 반납)
         self.last_matched_location: Optional[Tuple[int, int, int, int]] = None
         self.last_matched_template: Optional[str] = None
 
-        # 텔레그램 봇
-        self.bot: Optional[Bot] = None
-        self.loop: Optional[asyncio.AbstractEventLoop] = None
-        self.bot_thread: Optional[threading.Thread] = None
+        # 텔레그램 전송 (공용 알림 서비스)
+        self.notifier = notifier or shared_notifier()
+        self.photo_options = PhotoOptions()
 
         # 반복 알림 관련
         self.repeat_timer: Optional[QTimer] = None
@@ -61,6 +121,8 @@ class ImageDetector(QObject):
         self.user_responded = False
         self.screenshot_sent = False
 
+        self._detection_changed.connect(self._on_detection_changed)
+
     def set_config(
         self,
         detection_region: Tuple[int, int, int, int],
@@ -71,41 +133,80 @@ class ImageDetector(QObject):
         confidence: float = 0.85
     ):
         """설정을 업데이트합니다."""
-        self.detection_region = detection_region
-        self.template_paths = template_paths
-        self.telegram_token = telegram_token
-        self.telegram_chat_id = telegram_chat_id
-        self.user_nickname = user_nickname
-        self.confidence_threshold = confidence
-
-        print(f"이미지 감지 설정: 구역={detection_region}, 템플릿 {len(template_paths)}개, 신뢰도={confidence}")
-
-        if self.telegram_token:
-            self._init_telegram_bot()
-
-    def _init_telegram_bot(self):
-        """텔레그램 봇 초기화"""
+        with self._match_lock:
+            self.detection_region = detection_region
+            self.template_paths = template_paths
+            self.telegram_token = telegram_token
+            self.telegram_chat_id = telegram_chat_id
+            self.user_nickname = user_nickname
+            self.confidence_threshold = confidence
+
+            print(f"이미지 감지 설정: 구역={detection_region}, 템플릿 {len(template_paths)}개, 신뢰도={confidence}")
+            self.hit_stats.reset()
+            self.change_gate.reset()
+            if self.template_clustering:
+                # 시작 시 클러스터 분석 (결과는 템플릿이 바뀔 때까지 재사용)
+                self.cluster_index.clusters(sorted(template_paths))
+
+    def set_matching_engine(self, engine: str, fft_cache_mb: Optional[int] = None):
+        """
+        매칭 엔진 변경 (spatial: 원본 해상도 전체 검색 / pyramid: 축소 후 후보 주변만 확인 / fft: 주파수 영역)
+        fft_cache_mb는 fft 엔진의 템플릿 스펙트럼 보관 한도 (None이면 기본값)
+        """
         try:
-            if self.loop and not self.loop.is_closed():
-                self.loop.call_soon_threadsafe(self.loop.stop)
-                time.sleep(0.3)
-                try:
-                    self.loop.close()
-                except Exception:
-                    pass
-
-            self.loop = asyncio.new_event_loop()
-            self.bot = Bot(token=self.telegram_token)
-
-            def run_loop():
-                asyncio.set_event_loop(self.loop)
-                self.loop.run_forever()
-
-            self.bot_thread = threading.Thread(target=run_loop, daemon=True)
-            self.bot_thread.start()
-            print("텔레그램 봇 초기화 완료")
-        except Exception as e:
-            print(f"텔레그램 봇 초기화 실패: {e}")
+            matcher = create_matcher(engine, fft_cache_mb)
+            with self._match_lock:
+                self.matcher = matcher
+                self.change_gate.reset()
+            print(f"매칭 엔진: {engine}")
+        except ValueError as e:
+            print(f"매칭 엔진 설정 실패: {e}")
+
+    def set_parallel_workers(self, workers: int):
+        """병렬 검색 스레드 수 변경 (0이면 순차 검색)"""
+        workers = max(0, int(workers))
+        if workers == self.parallel_workers:
+            return
+        with self._match_lock:
+            if self.executor:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            self.parallel_workers = workers
+            if workers > 0:
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image_detector")
+        print(f"병렬 검색 스레드: {workers if workers else '사용 안 함'}")
+
+    def set_template_clustering(self, enabled: bool):
+        """클러스터 대표 먼저 검색 사용 여부 (병렬 검색보다 우선)"""
+        with self._match_lock:
+            self.template_clustering = bool(enabled)
+        print(f"템플릿 클러스터 검색: {'사용' if self.template_clustering else '사용 안 함'}")
+
+    def set_location_prior(self, enabled: bool):
+        """이전 감지 위치 주변 먼저 검색 사용 여부"""
+        with self._match_lock:
+            self.location_prior = bool(enabled)
+            self.prior_match = None
+        print(f"이전 위치 우선 검색: {'사용' if self.location_prior else '사용 안 함'}")
+
+    def set_change_gate(self, enabled: bool):
+        """프레임 변화 게이트 사용 여부"""
+        with self._match_lock:
+            self.use_change_gate = bool(enabled)
+            self.change_gate.reset()
+        print(f"프레임 변화 게이트: {'사용' if self.use_change_gate else '사용 안 함'}")
+
+    def set_photo_options(self, options: PhotoOptions):
+        """첫 감지 스크린샷 인코딩 설정 (형식, 품질, 축소, 매칭 위치 주변 자르기)"""
+        self.photo_options = options
+        crop = f", 매칭 위치 주변 {options.crop_padding}px" if options.crop_padding is not None else ""
+        print(f"스크린샷 형식: {options.format} 품질 {options.quality}, 긴 변 {options.max_side or '원본'}{crop}")
+
+    def get_diagnostics(self) -> dict:
+        """템플릿 적중 통계 (양성 틱당 검사 템플릿 수 등)와 변화 게이트 통계"""
+        diagnostics = self.hit_stats.diagnostics()
+        diagnostics["change_gate"] = self.change_gate.stats()
+        return diagnostics
 
     def start(self):
         """이미지 감지 시작"""
@@ -115,134 +216,247 @@ class ImageDetector(QObject):
             print("텔레그램 설정이 없습니다.")
             return
 
-        self._init_telegram_bot()
-
         self.is_running = True
         self.last_detected = False
         self.detection_count = 0
         self.is_repeating = False
         self.user_responded = False
         self.screenshot_sent = False
+        self.prior_match = None
+        self.change_gate.reset()
 
         print(f"이미지 감지 시작: 구역={self.detection_region}, 템플릿 {len(self.template_paths)}개")
 
-        self.check_timer = QTimer()
-        self.check_timer.timeout.connect(self._check_image)
-        self.check_timer.start(self.check_interval)
-        self._check_image()
+        self.capture_service.subscribe(self.capture_name, self.detection_region, self.check_interval)
 
-    def stop(self):
-        """이미지 감지 중지"""
-        print("이미지 감지 중지 시작...")
-        self.is_running = False
+        # 첫 틱은 감지 스레드에서 바로 실행
+        self._run_id += 1
+        run_id = self._run_id
+        self.check_thread = TickThread(
+            "image_detector", self.check_interval, lambda: self._check_image(run_id), self._print_diagnostics
+        ).start()
 
-        for timer in [self.check_timer, self.repeat_timer]:
-            if timer:
-                timer.stop()
-        self.check_timer = None
-        self.repeat_timer = None
+    def stop(self, wait: float = 0.0) -> Optional[TickThread]:
+        """
+        이미지 감지 중지 (진행 중인 매칭은 wait초까지만 기다림, 기본은 기다리지 않음)
+        감지 스레드를 반환하므로 여러 워커를 함께 기다릴 때는 tick_thread.join_all 사용
+        """
+        print("이미지 감지 중지 시작...")
+        with self._result_lock:
+            # 진행 중인 틱의 결과 처리가 끝난 뒤에 중지 (이후 끝나는 틱의 결과는 버림)
+            self.is_running = False
+
+        thread = self.check_thread
+        self.check_thread = None
+        if thread:
+            thread.stop()
+            if wait > 0:
+                thread.join(wait)
+        if self.repeat_timer:
+            self.repeat_timer.stop()
+            self.repeat_timer = None
+        self.capture_service.unsubscribe(self.capture_name)
+
+        # 알림 서비스의 이벤트 루프는 계속 재사용하고, 남은 알림 전송은 기다리지 않음
+        self.notifier.flush_async().add_done_callback(lambda _: self.stopped.emit())
+        print("이미지 감지 중지 완료")
+        return thread
+
+    def _print_diagnostics(self):
+        """감지 스레드가 끝날 때 통계 출력 (마지막 틱 이후라 통계를 건드리는 스레드가 없음)"""
+        diagnostics = self.get_diagnostics()
+        if diagnostics["positive_ticks"]:
+            print(
+                f"템플릿 적중 통계: 양성 틱 {diagnostics['positive_ticks']}/{diagnostics['ticks']}, "
+                f"틱당 검사 {diagnostics['evaluated_per_positive_tick']:.1f}개 "
+                f"(고정 순서 {diagnostics['fixed_order_per_positive_tick']:.1f}개)"
+            )
+        if diagnostics["evaluated_per_negative_tick"] is not None:
+            print(f"음성 틱당 검사 템플릿: {diagnostics['evaluated_per_negative_tick']:.1f}개")
+        gate = diagnostics["change_gate"]
+        if gate["ticks"]:
+            print(f"변화 게이트: 건너뜀 {gate['skip_ratio']:.0%}, 매칭 면적 {gate['area_ratio']:.0%} ({gate['ticks']}틱)")
+
+    def _check_image(self, run_id: int):
+        """이미지 감지 수행 (감지 스레드) - 전체 이미지가 구역 내에 있어야 함"""
+        if not self.is_running or run_id != self._run_id:
+            return
 
+        captured = None
         try:
-            if self.loop:
-                if self.loop.is_running():
-                    self.loop.call_soon_threadsafe(self.loop.stop)
-                    time.sleep(0.5)
-                if not self.loop.is_closed():
-                    self.loop.close()
-            if self.bot_thread and self.bot_thread.is_alive():
-                self.bot_thread.join(timeout=1)
+            with self._match_lock:
+                if self.single_capture:
+                    detected, best_box, best_template = self._find_single_capture()
+                    captured = self.last_captured
+                else:
+                    detected, best_box, best_template = self._find_with_pyautogui()
+
+            with self._result_lock:
+                # 중지 뒤에 끝난 틱의 결과는 버림 (중지 후 첫 감지 알림이 나가지 않도록)
+                if not self.is_running or run_id != self._run_id:
+                    return
+
+                if detected and not self.last_detected:
+                    self.detection_count += 1
+                    self.last_detected = True
+                    self.is_repeating = True
+                    self.repeat_count = 0
+                    self.screenshot_sent = False
+                    self.last_matched_location = best_box
+                    self.last_matched_template = best_template
+
+                    left, top, right, bottom = best_box
+                    print(f"이미지 감지! 위치: ({left}, {top}, {right}, {bottom}), 템플릿: {best_template}")
+
+                    # 구역 스크린샷 캡처 및 매칭 위치 표시하여 전송 (매칭한 프레임이 유효한 감지 스레드에서)
+                    self._send_first_detection(best_box, best_template)
+                    self._detection_changed.emit(run_id, True)
+
+                elif not detected and self.last_detected:
+                    self.last_detected = False
+                    self.is_repeating = False
+                    msg = f"✅ {self.user_nickname} 거탐 사라짐"
+                    self._send_telegram_message(msg, STATE_KEY, "gone")
+                    self._detection_changed.emit(run_id, False)
+
         except Exception as e:
-            print(f"이벤트 루프 정리 오류: {e}")
+            # 중지 직후 캡처 구독 해제로 생긴 오류는 무시
+            if self.is_running:
+                print(f"이미지 체크 오류: {e}")
+
+        finally:
+            # 첫 감지 스크린샷까지 끝났으므로 이 틱의 프레임을 캡처 서비스에 반납
+            if captured is not None:
+                self._release_frame(captured)
+
+    def _release_frame(self, captured: CapturedFrame):
+        """틱에서 빌린 프레임 반납 (그 사이 다른 틱이 새 프레임을 받았으면 그 프레임은 그대로 둠)"""
+        self.capture_service.release(self.capture_name, captured)
+        with self._match_lock:
+            if self.last_captured is captured:
+                self.last_captured = None
+                self.last_frame = None
+
+    def _on_detection_changed(self, run_id: int, detected: bool):
+        """감지 상태 변화 처리 (GUI 스레드): 반복 알림 타이머와 UI 알림"""
+        if not self.is_running or run_id != self._run_id:
+            return
 
-        self.loop = None
-        self.bot_thread = None
-        self.bot = None
-        print("이미지 감지 중지 완료")
+        if self.repeat_timer:
+            self.repeat_timer.stop()
+            self.repeat_timer = None
+
+        if detected:
+            self.repeat_timer = QTimer()
+            self.repeat_timer.timeout.connect(self._send_repeat_message)
+            self.repeat_timer.start(self.repeat_interval)
+            self.image_detected.emit(f"거탐 이미지 감지: 감지 #{self.detection_count}")
+        else:
+            self.image_detected.emit("거탐 이미지 사라짐")
+
+    def _find_single_capture(self) -> Tuple[bool, Optional[Tuple[int, int, int, int]], Optional[str]]:
+        """공용 캡처 서비스에서 구역 프레임을 한 번 받아 모든 템플릿을 검색합니다."""
+        self.last_captured = self.capture_service.get_frame(self.capture_name)
+        frame = self.last_frame = self.last_captured.image
+
+        # 최근에 자주 맞은 템플릿부터 검색
+        template_paths = self.hit_stats.order(self.template_paths)
+
+        def find(search_frame, search_region) -> Optional[MatchResult]:
+            return self._match_frame(search_frame, search_region, template_paths)
+
+        if self.use_change_gate:
+            margin = self.matcher.max_template_size(template_paths)
+            match = self.change_gate.search(frame, self.detection_region, margin, find)
+        else:
+            match = find(frame, self.detection_region)
+
+        self.prior_match = match
+        if not match:
+            return False, None, None
+
+        left, top, right, bottom = match.box
+        print(f"✓ 전체 이미지 감지: {match.template_path} at ({left}, {top}, {right}, {bottom})")
+        return True, match.box, match.template_path
+
+    def _match_frame(self, frame, region: Tuple[int, int, int, int], template_paths: List[str]) -> Optional[MatchResult]:
+        """frame(region을 캡처한 배열)에서 템플릿 검색 (직전 위치 주변 먼저, 없으면 전체)"""
+        match = None
+        evaluated = 0
+
+        # 직전 위치 주변 창에서 직전 템플릿만 확인 (아직 있는지 확인하는 틱을 싸게)
+        # 다른 템플릿은 창에서 검사해도 전체 구역 검색에서 다시 검사해야 하므로 창에서는 건너뜀
+        prior = self.prior_match
+        if self.location_prior and prior:
+            match = self.matcher.find_near(
+                frame, region, prior.box, [prior.template_path], self.confidence_threshold, self.prior_padding
+            )
+            evaluated += self.matcher.last_evaluated
+
+        if match is None:
+            match = self._find_in_region(frame, region, template_paths)
+            evaluated += self.matcher.last_evaluated
+
+        self.hit_stats.record(
+            self.template_paths, template_paths, match.template_path if match else None, evaluated
+        )
+        return match
+
+    def _find_in_region(self, frame, region: Tuple[int, int, int, int], template_paths: List[str]) -> Optional[MatchResult]:
+        """구역 전체에서 템플릿 검색 (클러스터 대표 먼저 / 병렬 / 순차, 클러스터 검색도 병렬 가능)"""
+        if self.template_clustering:
+            return self.matcher.find_first_clustered(
+                frame, region, self.cluster_index.ordered(template_paths), self.confidence_threshold,
+                executor=self.executor
+            )
+        if self.executor:
+            return self.matcher.find_first_parallel(
+                frame, region, template_paths, self.confidence_threshold, self.executor
+            )
+        return self.matcher.find_first(frame, region, template_paths, self.confidence_threshold)
 
-    def _check_image(self):
-        """이미지 감지 수행 - 전체 이미지가 구역 내에 있어야 함"""
-        if not self.is_running:
-            return
-            
-        try:
-            x1, y1, x2, y2 = self.detection_region
-            region_width = x2 - x1
-            region_height = y2 - y1
-            
-            # 모든 템플릿에 대해 검색
-            detected = False
-            best_box = None
-            best_template = None
-
-            for template_path in self.template_paths:
-                try:
-                    template_full_path = resource_path(template_path)
-                    
-                    # 템플릿 이미지 로드하여 크기 확인
-                    template_img = Image.open(template_full_path)
-                    template_width, template_height = template_img.size
-                    
-                    # pyautogui로 이미지 찾기 (구역 내에서만 검색)
-                    location = pyautogui.locateOnScreen(
-                        template_full_path,
-                        confidence=self.confidence_threshold,
-                        region=(x1, y1, region_width, region_height)
-                    )
+    def _find_with_pyautogui(self) -> Tuple[bool, Optional[Tuple[int, int, int, int]], Optional[str]]:
+        """템플릿마다 pyautogui로 구역을 캡처하여 검색합니다. (기존 방식)"""
+        self.last_frame = None
+        if pyautogui is None:
+            raise RuntimeError("pyautogui를 사용할 수 없는 환경입니다.")
 
-                    if location:
-                        # location은 (left, top, width, height) 형식
-                        left, top, width, height = location
-                        right = left + width
-                        bottom = top + height
-                        
-                        # 전체 이미지가 구역 내에 있는지 확인
-                        if left >= x1 and top >= y1 and right <= x2 and bottom <= y2:
-                            detected = True
-                            best_box = (left, top, right, bottom)
-                            best_template = template_path
-                            print(f"✓ 전체 이미지 감지: {template_path} at ({left}, {top}, {right}, {bottom})")
-                            break  # 첫 번째 매칭 발견 시 중단
-                        else:
-                            print(f"✗ 부분 이미지 감지 (무시): {template_path} - 구역 밖으로 벗어남")
-
-                except Exception as e:
-                    print(f"템플릿 {template_path} 검색 오류: {e}")
-                    continue
-
-            if detected and not self.last_detected:
-                self.detection_count += 1
-                self.last_detected = True
-                self.is_repeating = True
-                self.repeat_count = 0
-                self.screenshot_sent = False
-                self.last_matched_location = best_box
-                self.last_matched_template = best_template
-
-                left, top, right, bottom = best_box
-                print(f"이미지 감지! 위치: ({left}, {top}, {right}, {bottom}), 템플릿: {best_template}")
-
-                # 구역 스크린샷 캡처 및 매칭 위치 표시하여 전송
-                self._send_first_detection(best_box, best_template)
-
-                if self.repeat_timer:
-                    self.repeat_timer.stop()
-                self.repeat_timer = QTimer()
-                self.repeat_timer.timeout.connect(self._send_repeat_message)
-                self.repeat_timer.start(self.repeat_interval)
-                self.image_detected.emit(f"거탐 이미지 감지: 감지 #{self.detection_count}")
-
-            elif not detected and self.last_detected:
-                self.last_detected = False
-                self.is_repeating = False
-                if self.repeat_timer:
-                    self.repeat_timer.stop()
-                    self.repeat_timer = None
-                msg = f"✅ {self.user_nickname} 거탐 사라짐"
-                self._send_telegram_message(msg)
-                self.image_detected.emit("거탐 이미지 사라짐")
+        x1, y1, x2, y2 = self.detection_region
+        region_width = x2 - x1
+        region_height = y2 - y1
 
-        except Exception as e:
-            print(f"이미지 체크 오류: {e}")
+        template_paths = self.hit_stats.order(self.template_paths)
+        for template_path in template_paths:
+            try:
+                template_full_path = resource_path(template_path)
+
+                # pyautogui로 이미지 찾기 (구역 내에서만 검색)
+                location = pyautogui.locateOnScreen(
+                    template_full_path,
+                    confidence=self.confidence_threshold,
+                    region=(x1, y1, region_width, region_height)
+                )
+
+                if location:
+                    # location은 (left, top, width, height) 형식
+                    left, top, width, height = location
+                    right = left + width
+                    bottom = top + height
+
+                    # 전체 이미지가 구역 내에 있는지 확인
+                    if left >= x1 and top >= y1 and right <= x2 and bottom <= y2:
+                        print(f"✓ 전체 이미지 감지: {template_path} at ({left}, {top}, {right}, {bottom})")
+                        self.hit_stats.record(self.template_paths, template_paths, template_path)
+                        return True, (left, top, right, bottom), template_path  # 첫 번째 매칭 발견 시 중단
+                    else:
+                        print(f"✗ 부분 이미지 감지 (무시): {template_path} - 구역 밖으로 벗어남")
+
+            except Exception as e:
+                print(f"템플릿 {template_path} 검색 오류: {e}")
+                continue
+
+        self.hit_stats.record(self.template_paths, template_paths, None)
+        return False, None, None
 
     def _send_first_detection(self, match_box: Tuple[int, int, int, int], template_name: str):
         """첫 감지 시 구역 스크린샷 + 매칭 위치 표시하여 전송"""
@@ -251,8 +465,11 @@ class ImageDetector(QObject):
                 x1, y1, x2, y2 = self.detection_region
                 left, top, right, bottom = match_box
                 
-                # 구역 전체 스크린샷 캡처
-                screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
+                # 구역 전체 스크린샷 (매칭에 사용한 프레임이 있으면 재사용)
+                if self.last_frame is not None:
+                    screenshot = Image.fromarray(self.last_frame)
+                else:
+                    screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
                 
                 # 매칭된 위치에 빨간 테두리 그리기
                 draw = ImageDraw.Draw(screenshot)
@@ -276,14 +493,16 @@ class ImageDetector(QObject):
                     f"매칭 템플릿: {template_name}\n"
                     f"감지 구역: ({x1}, {y1}, {x2}, {y2})"
                 )
-                self._send_telegram_photo(screenshot, msg)
+                self._send_telegram_photo(
+                    screenshot, msg, (box_left, box_top, box_right, box_bottom), STATE_KEY, "found"
+                )
                 self.screenshot_sent = True
                 self.repeat_count = 1
                 print(f"첫 감지 메시지 + 스크린샷 전송 (매칭 위치 표시)")
             except Exception as e:
                 print(f"스크린샷 전송 오류: {e}")
                 msg = f"🚨 {self.user_nickname} 거탐 감지됨 (1/{self.max_repeat_count})"
-                self._send_telegram_message(msg)
+                self._send_telegram_message(msg, STATE_KEY, "found")
                 self.screenshot_sent = True
                 self.repeat_count = 1
 
@@ -304,79 +523,32 @@ class ImageDetector(QObject):
             return
             
         msg = f"🚨 {self.user_nickname} 거탐 감지됨 ({self.repeat_count}/{self.max_repeat_count})"
-        self._send_telegram_message(msg)
+        # 아직 전송되지 않은 이전 반복 메시지는 새 메시지로 대체
+        self._send_telegram_message(msg, "image_detector:repeat", "detected")
         print(f"반복 메시지 전송: {self.repeat_count}/{self.max_repeat_count}")
 
-    def _send_telegram_message(self, message: str):
-        """텔레그램으로 텍스트 메시지 전송"""
-        if not self.bot or not self.loop or not self.telegram_chat_id:
-            self._init_telegram_bot()
+    def _send_telegram_message(self, message: str, state_key: Optional[str] = None, state: Optional[str] = None):
+        """텔레그램으로 텍스트 메시지 전송 (공용 알림 서비스 큐에 넣고 바로 반환)"""
+        self.notifier.send_message(self.telegram_token, self.telegram_chat_id, message, state_key, state)
 
-        try:
-            if not self.loop.is_running():
-                raise RuntimeError("이벤트 루프가 실행 중이 아님")
-
-            asyncio.run_coroutine_threadsafe(
-                self._async_send_message(message),
-                self.loop
-            )
-        except Exception as e:
-            print(f"메시지 전송 실패: {e}")
-
-    def _send_telegram_photo(self, image: Image.Image, caption: str):
-        """텔레그램으로 사진 전송"""
-        if not self.bot or not self.loop or not self.telegram_chat_id:
-            self._init_telegram_bot()
-
-        try:
-            if not self.loop.is_running():
-                raise RuntimeError("이벤트 루프가 실행 중이 아님")
+    def _send_telegram_photo(
+        self,
+        image: Image.Image,
+        caption: str,
+        match_box: Optional[Tuple[int, int, int, int]] = None,
+        state_key: Optional[str] = None,
+        state: Optional[str] = None
+    ):
+        """텔레그램으로 사진 전송 (인코딩은 알림 서비스의 별도 스레드에서 처리)"""
+        self.notifier.send_photo(
+            self.telegram_token, self.telegram_chat_id, image, caption, self.photo_options, match_box,
+            state_key, state
+        )
 
-            asyncio.run_coroutine_threadsafe(
-                self._async_send_photo(image, caption),
-                self.loop
-            )
-        except Exception as e:
-            print(f"사진 전송 실패: {e}")
-    
     def send_notification(self, message: str):
         """외부에서 호출할 수 있는 텔레그램 알림 전송 함수"""
         if not self.telegram_token or not self.telegram_chat_id:
             print("텔레그램 설정이 없어 메시지를 보낼 수 없습니다.")
             return
 
-        if not self.bot or not self.loop or (self.loop and self.loop.is_closed()):
-            self._init_telegram_bot()
-
-        try:
-            self._send_telegram_message(message)
-        except Exception as e:
-            print(f"텔레그램 알림 전송 실패: {e}")
-
-    async def _async_send_message(self, message: str):
-        """비동기 메시지 전송"""
-        try:
-            await self.bot.send_message(chat_id=self.telegram_chat_id, text=message)
-            print(f"텔레그램 메시지 전송 성공: {message}")
-        except TelegramError as e:
-            print(f"텔레그램 오류: {e}")
-        except Exception as e:
-            print(f"전송 오류: {e}")
-
-    async def _async_send_photo(self, image: Image.Image, caption: str):
-        """비동기 사진 전송"""
-        try:
-            bio = io.BytesIO()
-            image.save(bio, format='PNG')
-            bio.seek(0)
-            
-            await self.bot.send_photo(
-                chat_id=self.telegram_chat_id,
-                photo=bio,
-                caption=caption
-            )
-            print(f"텔레그램 사진 전송 성공: {caption}")
-        except TelegramError as e:
-            print(f"텔레그램 오류: {e}")
-        except Exception as e:
-            print(f"사진 전송 오류: {e}")
\ No newline at end of file
+        self._send_telegram_message(message)
@@ -2,9 +2,17 @@
 
 block_cipher = None
 
+# img/ 템플릿을 팩 파일 하나로 묶음 (실행 시 mmap 한 번으로 로드)
+import os
+import sys
+sys.path.insert(0, SPECPATH)
+from template_pack import build_pack
+build_pack(os.path.join(SPECPATH, 'img'), os.path.join(SPECPATH, 'img', 'templates.pack'))
+
 # 포함할 이미지 데이터
 datas = [
     ('images/*.png', 'images'),
+    ('img/templates.pack', 'img'),
 ]
 
 a = Analysis(
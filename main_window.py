@@ -8,7 +8,12 @@ from PyQt5.QtGui import QIcon, QFont
 from settings_dialog import SettingsDialog
 from window_monitor import WindowMonitor
 from key_input_worker import KeyInputWorker
-from user_detector import UserDetector
+from user_detector import UserDetector, parse_detection_regions
+from color_rules import parse_color_rules
+from debounce import DEFAULT_ENTER, DEFAULT_EXIT, DebounceRule
+from click_sequence import parse_sequence
+from notifier import PhotoOptions, shared_notifier
+from notify_backends import DEFAULT_BASE_URL, create_notifier_backend
 from image_clicker_worker import ImageClickerWorker
 from config_manager import ConfigManager
 from buff_worker import BuffWorker
@@ -16,6 +21,10 @@ from hotkey_manager import HotkeyManager
 from system_tray import SystemTrayManager
 from image_detector import ImageDetector
 from utils import resource_path
+from frame_capture import shared_capture_service
+from capture_backends import create_backend
+from template_bank import shared_template_bank
+from tick_thread import join_all
 
 class MainWindow(QMainWindow):
     """메인 윈도우"""
@@ -34,6 +43,10 @@ class MainWindow(QMainWindow):
         self.buff2_worker = BuffWorker(2)
         self.buff3_worker = BuffWorker(3)
         self.image_detector = ImageDetector()  # 텔레그램 모니터 대신 이미지 감지기
+        self._notifier_backend_key = None  # 현재 알림 백엔드 설정 (바뀔 때만 교체)
+
+        # img/ 템플릿을 시작 시 한 번만 디코딩 (이미지 감지기와 리치 클릭이 공유)
+        shared_template_bank().preload()
 
         # 핫키 매니저 초기화
         self.hotkey_manager = HotkeyManager()
@@ -736,6 +749,15 @@ class MainWindow(QMainWindow):
 
     def apply_config(self):
         """설정 적용"""
+        # 화면 캡처 백엔드 (imagegrab / mss)
+        backend_name = self.config.get("capture_backend", "imagegrab")
+        capture_service = shared_capture_service()
+        if capture_service.backend.name != backend_name:
+            try:
+                capture_service.set_backend(create_backend(backend_name))
+            except Exception as e:
+                print(f"캡처 백엔드 설정 실패: {e}")
+
         # 창 모니터 설정
         if self.config.get("selected_window"):
             hwnd = self.config["selected_window"]["hwnd"]
@@ -786,30 +808,81 @@ class MainWindow(QMainWindow):
 
         self.update_buff_info_labels()
 
-        # 유저 탐지 설정
+        # 유저 탐지 색 규칙 (없으면 기본 빨간색)
+        self.user_detector.set_color_rules(parse_color_rules(self.config.get("color_rules", [])))
+
+        # 유저 탐지 상태 전환 디바운스 (발견/사라짐 알림 기준)
+        debounce = self.config.get("user_debounce", {})
+        self.user_detector.set_debounce(
+            DebounceRule.from_config(debounce.get("enter"), DEFAULT_ENTER),
+            DebounceRule.from_config(debounce.get("exit"), DEFAULT_EXIT),
+        )
+
+        # 텔레그램 알림 합치기 / 전송 속도 제한 (두 감지기가 공유)
+        notifier = shared_notifier()
+        notifier.configure(
+            self.config.get("notify_coalesce_ms", 250) / 1000.0,
+            self.config.get("notify_rate_per_sec", 1.0),
+            self.config.get("notify_burst", 3),
+        )
+
+        # 알림 백엔드 (telegram / mock / file), 설정이 바뀐 경우에만 교체
+        backend_name = self.config.get("notifier_backend", "telegram")
+        if backend_name == "file":
+            backend_options = {"path": self.config.get("notifier_file", "alerts.jsonl")}
+        elif backend_name == "telegram":
+            backend_options = {"base_url": self.config.get("telegram_base_url") or DEFAULT_BASE_URL}
+        else:
+            backend_options = {}
+        backend_key = (backend_name, tuple(sorted(backend_options.items())))
+        if backend_key != self._notifier_backend_key:
+            try:
+                notifier.set_backend(create_notifier_backend(backend_name, **backend_options))
+                self._notifier_backend_key = backend_key
+            except ValueError as e:
+                print(f"알림 백엔드 설정 실패: {e}")
+
+        # 유저 탐지 설정 (detection_regions가 있으면 여러 구역, 없으면 detection_region 한 개)
         if self.config.get("detection_region"):
             self.user_detector.set_config(
                 self.config.get("detection_region", (0, 0, 100, 100)),
                 self.config.get("telegram_token", ""),
                 self.config.get("telegram_chat_id", ""),
-                self.config.get("user_nickname", "유저")
+                self.config.get("user_nickname", "유저"),
+                parse_detection_regions(self.config.get("detection_regions", []))
             )
 
+        # 템플릿 매칭 엔진 (spatial / pyramid / fft), fft는 스펙트럼 보관 한도(MB)도 설정
+        matching_engine = self.config.get("matching_engine", "spatial")
+        fft_cache_mb = self.config.get("fft_cache_mb", 200)
+        self.image_detector.set_matching_engine(matching_engine, fft_cache_mb)
+        self.image_clicker_worker.set_matching_engine(matching_engine, fft_cache_mb)
+        # 거탐 템플릿 병렬 검색 스레드 수 (0이면 순차 검색)
+        self.image_detector.set_parallel_workers(self.config.get("parallel_workers", 0))
+        # 비슷한 거탐 템플릿은 대표만 먼저 검색
+        self.image_detector.set_template_clustering(self.config.get("template_clustering", True))
+        # 이전 감지 위치 주변 먼저 검색
+        location_prior = self.config.get("location_prior", True)
+        self.image_detector.set_location_prior(location_prior)
+        self.image_clicker_worker.set_location_prior(location_prior)
+        # 직전 틱과 달라진 부분만 매칭
+        change_gate = self.config.get("change_gate", True)
+        self.image_detector.set_change_gate(change_gate)
+        self.image_clicker_worker.set_change_gate(change_gate)
+
+        # 거탐 감지 스크린샷 인코딩 (형식, 품질, 축소, 매칭 위치 주변 자르기)
+        crop_padding = self.config.get("photo_crop_padding")
+        self.image_detector.set_photo_options(PhotoOptions(
+            format=self.config.get("photo_format", "jpeg"),
+            quality=int(self.config.get("photo_quality", 80)),
+            max_side=int(self.config.get("photo_max_side", 1280)),
+            crop_padding=int(crop_padding) if crop_padding is not None else None,
+        ))
+
         # 거탐 이미지 감지 설정 - 고정 구역 (30, 52, 1305, 595)
         gt_region = (30, 52, 1305, 595)
-        gt_images = [
-            "img/gt/gt1.png", "img/gt/gt2.png", "img/gt/gt3.png", "img/gt/gt4.png",
-            "img/gt/gt5.png", "img/gt/gt6.png", "img/gt/gt7.png", "img/gt/gt8.png",
-            "img/gt/gt9.png", "img/gt/gt10.png", "img/gt/gt11.png", "img/gt/gt12.png",
-            "img/gt/gt13.png", "img/gt/gt14.png", "img/gt/gt15.png", "img/gt/gt16.png",
-            "img/gt/gt17.png", "img/gt/gt18.png", "img/gt/gt19.png", "img/gt/gt20.png",
-            "img/gt/gt22.png", "img/gt/gt23.png", "img/gt/gt24.png", "img/gt/gt25.png",
-            "img/gt/gt26.png", "img/gt/gt27.png", "img/gt/gt28.png", "img/gt/gt29.png",
-            "img/gt/gt30.png", "img/gt/gt31.png", "img/gt/gt32.png", "img/gt/gt33.png",
-            "img/gt/gt34.png", "img/gt/gt35.png", "img/gt/gt36.png", "img/gt/gt37.png",
-            "img/gt/gt38.png", "img/gt/gt39.png", "img/gt/gt40.png", "img/gt/gt41.png",
-            "img/gt/gt42.png", "img/gt/gt43.png", "img/gt/gt45.png", "img/gt/gt46.png"
-        ]
+        # img/gt 아래 템플릿 자동 검색 (gt1, gt2, ... 숫자 순)
+        gt_images = shared_template_bank().discover("gt")
 
         if self.config.get("telegram_token") and self.config.get("telegram_chat_id"):
             self.image_detector.set_config(
@@ -828,6 +901,7 @@ class MainWindow(QMainWindow):
         
         print(f"[설정] 리치 자동클릭: 구역={reach_region}, 템플릿={reach_templates}, 신뢰도={reach_confidence}")
         self.image_clicker_worker.set_config_multi(reach_region, reach_templates, reach_confidence)
+        self.image_clicker_worker.set_sequence(parse_sequence(self.config.get("image_click_sequence", [])))
 
     def toggle_monitoring(self):
         """창 감지 토글"""
@@ -1307,12 +1381,18 @@ class MainWindow(QMainWindow):
             self.buff3_worker.stop()
         if self.is_detecting:
             self.user_detector.stop()
+        # 매칭 스레드는 모두 중지를 요청한 뒤 진행 중인 틱을 같은 마감 시각(2초)까지 함께 기다림
+        matching_threads = []
         if self.is_image_clicking:
-            self.image_clicker_worker.stop()
+            matching_threads.append(self.image_clicker_worker.stop())
         if self.is_image_detecting:
-            self.image_detector.stop()
+            matching_threads.append(self.image_detector.stop())
+        join_all(matching_threads, 2.0)
         
 
+        # 알림 서비스 종료 요청 (기다리지 않음, 보내지 못한 알림은 발송함에 남아 다음 실행 때 전송)
+        shared_notifier().close_async(timeout=2.0)
+
         # 핫키 비활성화
         self.hotkey_manager.disable_hotkeys()
 
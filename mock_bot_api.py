@@ -0,0 +1,217 @@
+"""
+로컬 텔레그램 Bot API 대역 서버 (알림 전송 테스트용)
+- sendMessage / sendPhoto / getMe에 실제 Bot API와 같은 형식으로 응답
+- 일정 비율로 429(retry_after)와 응답 지연(시간 초과)을 섞어 재시도/백오프를 확인
+- 받은 메시지는 received 목록에 보관
+
+사용법:
+    python mock_bot_api.py [--port 8081] [--rate-429 0.1] [--retry-after 1] [--timeout-rate 0.05]
+    config.json의 "telegram_base_url"을 "http://127.0.0.1:8081/bot"으로 지정
+"""
+import argparse
+import email
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+
+@dataclass
+class ReceivedMessage:
+    """대역 서버가 받은 메시지 한 개"""
+
+    method: str
+    chat_id: str
+    text: str
+    photo_bytes: int  # 사진 크기 (텍스트면 0)
+    received: float  # time.monotonic() 기준
+
+
+def _parse_form(content_type: str, body: bytes) -> Dict[str, object]:
+    """x-www-form-urlencoded / multipart 본문을 {이름: 값}으로 변환 (파일은 bytes)"""
+    if content_type.startswith("multipart/form-data"):
+        message = email.message_from_bytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        fields = {}
+        for part in message.walk():
+            name = part.get_param("name", header="content-disposition")
+            if name is None:
+                continue
+            payload = part.get_payload(decode=True) or b""
+            fields[name] = payload if part.get_filename() else payload.decode("utf-8")
+        return fields
+    if content_type.startswith("application/json"):
+        return json.loads(body or b"{}")
+    return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+
+class MockBotApi:
+    """스레드에서 도는 Bot API 대역 서버"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        rate_429: float = 0.0,
+        retry_after: int = 1,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 10.0,
+        latency: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.rate_429 = rate_429  # 429로 응답할 비율
+        self.retry_after = retry_after
+        self.timeout_rate = timeout_rate  # 응답을 hang_seconds만큼 늦출 비율 (클라이언트 시간 초과)
+        self.hang_seconds = hang_seconds
+        self.latency = latency  # 정상 응답 지연 (초)
+        self._random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self.received: List[ReceivedMessage] = []
+        self.requests = 0
+        self.rejected = 0  # 429 응답 수
+        self.hung = 0  # 지연 응답 수
+        self._message_id = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """NotificationService / config의 telegram_base_url로 쓸 주소"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self) -> "MockBotApi":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockBotApi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _decide(self) -> str:
+        """이번 요청의 응답 종류 (ok / 429 / hang)"""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            if roll < self.rate_429:
+                self.rejected += 1
+                return "429"
+            if roll < self.rate_429 + self.timeout_rate:
+                self.hung += 1
+                return "hang"
+            return "ok"
+
+    def _record(self, method: str, fields: Dict[str, object]) -> dict:
+        photo = fields.get("photo")
+        text = str(fields.get("text") or fields.get("caption") or "")
+        with self._lock:
+            self._message_id += 1
+            message_id = self._message_id
+            self.received.append(ReceivedMessage(
+                method,
+                str(fields.get("chat_id", "")),
+                text,
+                len(photo) if isinstance(photo, bytes) else 0,
+                time.monotonic(),
+            ))
+        result = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(fields.get("chat_id", 0) or 0), "type": "private"},
+        }
+        if method == "sendPhoto":
+            result["caption"] = text
+            result["photo"] = []
+        else:
+            result["text"] = text
+        return result
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                # 경로: /bot<token>/<method>
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+
+                if method == "getMe":
+                    self._reply(200, {"ok": True, "result": {
+                        "id": 1, "is_bot": True, "first_name": "mock", "username": "mock_bot",
+                    }})
+                    return
+                if method not in ("sendMessage", "sendPhoto"):
+                    self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                    return
+
+                outcome = api._decide()
+                if outcome == "429":
+                    self._reply(429, {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": f"Too Many Requests: retry after {api.retry_after}",
+                        "parameters": {"retry_after": api.retry_after},
+                    })
+                    return
+                if outcome == "hang":
+                    time.sleep(api.hang_seconds)
+                    # 클라이언트가 이미 끊었으면 전송 실패로 처리되어야 하므로 기록하지 않음
+                    self._reply(200, {"ok": False, "error_code": 504, "description": "Gateway Timeout"})
+                    return
+                if api.latency:
+                    time.sleep(api.latency)
+
+                fields = _parse_form(self.headers.get("Content-Type", ""), body)
+                self._reply(200, {"ok": True, "result": api._record(method, fields)})
+
+            def _reply(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 텔레그램 Bot API 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429로 응답할 비율 (0~1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 응답의 retry_after (초)")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="응답을 늦춰 시간 초과를 낼 비율 (0~1)")
+    parser.add_argument("--hang-seconds", type=float, default=10.0, help="늦춘 응답의 지연 (초)")
+    parser.add_argument("--latency", type=float, default=0.0, help="정상 응답 지연 (초)")
+    args = parser.parse_args()
+
+    api = MockBotApi(
+        args.host, args.port, args.rate_429, args.retry_after, args.timeout_rate, args.hang_seconds, args.latency
+    ).start()
+    print(f"Bot API 대역 서버: {api.base_url} (Ctrl+C로 종료)")
+    try:
+        while True:
+            time.sleep(5)
+            with api._lock:
+                print(f"요청 {api.requests}개, 받은 메시지 {len(api.received)}개, 429 {api.rejected}개, 지연 {api.hung}개")
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
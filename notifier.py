@@ -0,0 +1,628 @@
+"""
+공용 텔레그램 알림 서비스
+- 프로세스 전체에서 이벤트 루프 스레드 한 개와 전송 백엔드(notify_backends) 한 개를 공유
+- 텔레그램 백엔드는 토큰별 Bot의 연결 풀을 유지하므로 메시지마다 TLS 연결을 새로 맺지 않음
+- 채팅방별 큐와 전송 작업이 순서를 보장
+- send_message / send_photo는 어느 스레드에서 불러도 바로 반환 (보내고 잊기)
+- 짧은 시간(coalesce_window) 안에 쌓인 텍스트는 한 메시지로 합쳐 전송
+- 채팅방별 토큰 버킷으로 전송 속도 제한 (기다리는 동안 쌓인 메시지도 합쳐짐)
+- 같은 state_key의 상태 메시지가 아직 대기 중이면 새 메시지가 대체
+  (발견 직후 사라짐처럼 반대 상태면 둘 다 버림)
+- 사진 인코딩(JPEG/WebP/PNG, 축소, 매칭 위치 주변 자르기)은 별도 스레드에서 처리해 이벤트 루프를 막지 않음
+- 모든 알림은 먼저 발송함(SQLite, alert_outbox)에 기록하고 전송 후 지움
+  메모리에는 채팅방별 memory_limit개만 두고, 나머지는 발송함에서 순서대로 다시 읽음
+- 연결 끊김/시간 초과는 지수 백오프 + 지터로, 429는 retry_after만큼 기다린 뒤 다시 전송
+- 다음 실행이나 재연결 때 남은 알림을 순서대로 보내며, 그 사이 쌓인 상태 메시지는 합쳐서 정리
+- 알림마다 넣은 시각부터 전송 완료까지의 지연을 기록 (latency_stats)
+- 이벤트 루프 스레드는 처음 보낼 때 한 번 시작해 감지 시작/중지와 상관없이 재사용
+  flush_async / close_async는 기다리지 않고 완료 Future를 반환 (GUI 스레드를 막지 않음)
+"""
+import asyncio
+import io
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from PIL import Image, features
+from telegram.error import BadRequest, ChatMigrated, Forbidden, InvalidToken, NetworkError, RetryAfter
+
+from alert_outbox import DEFAULT_OUTBOX_PATH, AlertOutbox, ChatKey, OutboxItem
+from notify_backends import NotifierBackend, TelegramBackend
+Box = Tuple[int, int, int, int]  # (left, top, right, bottom)
+
+
+@dataclass(frozen=True)
+class PhotoOptions:
+    """사진 알림 인코딩 설정"""
+
+    format: str = "jpeg"  # "jpeg" / "webp" / "png"
+    quality: int = 80  # JPEG/WebP 품질 (1~100)
+    max_side: int = 1280  # 긴 변이 이보다 크면 축소 (0이면 원본 크기)
+    crop_padding: Optional[int] = None  # 지정하면 매칭 위치 주변 이 여백만 남기고 자름
+
+
+def encode_photo(image: Image.Image, options: PhotoOptions, crop_box: Optional[Box] = None) -> io.BytesIO:
+    """사진을 설정대로 자르고 축소해 인코딩합니다. (crop_box는 이미지 좌표)"""
+    if crop_box is not None and options.crop_padding is not None:
+        pad = options.crop_padding
+        left, top, right, bottom = crop_box
+        image = image.crop((
+            max(0, left - pad),
+            max(0, top - pad),
+            min(image.width, right + pad),
+            min(image.height, bottom + pad),
+        ))
+
+    if options.max_side and max(image.size) > options.max_side:
+        scale = options.max_side / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.BILINEAR)
+
+    image_format = options.format.lower()
+    if image_format == "webp" and not features.check("webp"):
+        image_format = "jpeg"
+
+    bio = io.BytesIO()
+    if image_format == "png":
+        image.save(bio, format="PNG")
+    elif image_format == "webp":
+        image.save(bio, format="WEBP", quality=options.quality, method=0)  # method 0: 가장 빠른 압축
+    else:
+        image_format = "jpeg"
+        image.convert("RGB").save(bio, format="JPEG", quality=options.quality)
+    bio.name = f"alert.{'jpg' if image_format == 'jpeg' else image_format}"
+    bio.seek(0)
+    return bio
+
+
+@dataclass
+class Notification:
+    """보낼 알림 한 개 (photo가 있으면 사진 + 캡션)"""
+
+    text: str
+    photo: Optional[Image.Image] = None
+    state_key: Optional[str] = None  # 같은 키의 대기 중인 메시지를 대체 (예: "user:구역1")
+    state: Optional[str] = None  # 상태 값 (예: "found" / "gone")
+    photo_options: Optional[PhotoOptions] = None
+    crop_box: Optional[Box] = None  # 사진에서 매칭 위치 (자르기 기준)
+    created: float = field(default_factory=time.time)  # 넣은 시각 (지연 측정 기준)
+
+
+MAX_TEXT_LENGTH = 4096  # 텔레그램 메시지 최대 길이
+
+
+class TokenBucket:
+    """초당 rate개, 최대 burst개까지 모아 쓰는 토큰 버킷 (이벤트 루프에서만 사용)"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def delay(self) -> float:
+        """토큰 한 개를 쓸 수 있을 때까지 남은 시간 (0이면 바로 사용 가능)"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1.0 or self.rate <= 0:
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    async def acquire(self):
+        delay = self.delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.delay()
+        self._tokens -= 1.0
+
+
+class LatencyRecorder:
+    """넣은 시각부터 전송 완료까지의 지연 (최근 capacity개, 이벤트 루프에서 기록)"""
+
+    def __init__(self, capacity: int = 10000):
+        self._samples: Deque[float] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.count = 0
+
+    def percentiles(self) -> Dict[str, float]:
+        """지연 백분위 (초): p50 / p95 / p99 / max"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {}
+        last = len(samples) - 1
+        return {
+            "count": self.count,
+            "p50": samples[int(last * 0.50)],
+            "p95": samples[int(last * 0.95)],
+            "p99": samples[int(last * 0.99)],
+            "max": samples[last],
+        }
+
+
+class ChatQueue:
+    """
+    채팅방 하나의 대기 알림 (이벤트 루프에서만 사용)
+    pending에는 최대 memory_limit개만 두고, 넘치면 발송함에만 남겨 둠 (spilled)
+    """
+
+    def __init__(self, bucket: TokenBucket):
+        self.pending: Deque[OutboxItem] = deque()
+        self.bucket = bucket
+        self.last_id = 0  # 메모리로 읽어 온 마지막 발송함 id
+        self.spilled = True  # 발송함에만 있는 알림이 있는지 (처음에는 지난 실행에서 남은 알림부터 읽음)
+        self.storing = 0  # 발송함에 기록 중인 알림 수
+        self.inflight = 0  # pending 앞쪽에서 전송 중인 항목 수 (대체 대상에서 제외)
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+
+
+class NotificationService:
+    """이벤트 루프 스레드 한 개로 모든 텔레그램 전송을 처리하는 서비스"""
+
+    def __init__(
+        self,
+        backend: Optional[NotifierBackend] = None,
+        coalesce_window: float = 0.25,
+        rate: float = 1.0,
+        burst: int = 3,
+        outbox_path: str = DEFAULT_OUTBOX_PATH,
+        memory_limit: int = 50,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+        max_age: float = 86400.0,
+    ):
+        self.backend = backend or TelegramBackend()  # 이벤트 루프에서만 사용
+        self.coalesce_window = coalesce_window  # 첫 메시지 후 이 시간(초) 동안 쌓인 텍스트를 합침
+        self.rate = rate  # 채팅방별 초당 전송 수
+        self.burst = burst
+        self.outbox_path = outbox_path
+        self.memory_limit = max(2, memory_limit)  # 채팅방별 메모리에 둘 최대 알림 수
+        self.backoff_base = backoff_base  # 재시도 대기 시간 (초, 실패할 때마다 두 배)
+        self.backoff_max = backoff_max
+        self.max_age = max_age  # 이보다 오래된 알림은 보내지 않고 버림 (초)
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_finished: "Future[None]" = Future()  # 현재 이벤트 루프 스레드가 끝나면 완료
+        self._closing: Optional[asyncio.AbstractEventLoop] = None  # 종료 중인 이벤트 루프
+        self._queues: Dict[ChatKey, ChatQueue] = {}
+
+        # 발송함 기록과 사진 인코딩은 이 스레드 한 개에서 순서대로 처리
+        self._outbox: Optional[AlertOutbox] = None
+        self._outbox_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert_outbox")
+
+        # 통계
+        self.enqueued = 0
+        self.sent = 0  # 실제 전송 요청 수
+        self.merged = 0  # 다른 메시지에 합쳐진 메시지 수
+        self.superseded = 0  # 대체되어 버린 상태 메시지 수
+        self.retried = 0  # 다시 시도한 전송 수
+        self.dropped = 0  # 보내지 못하고 버린 알림 수
+        self.latency_stats = LatencyRecorder()
+
+    def set_backend(self, backend: NotifierBackend):
+        """전송 백엔드를 바꿉니다. (이전 백엔드는 이벤트 루프에서 정리)"""
+        with self._lock:
+            loop = self._loop
+            previous, self.backend = self.backend, backend
+        if loop is not None and previous is not backend:
+            asyncio.run_coroutine_threadsafe(previous.close(), loop)
+        print(f"알림 백엔드: {backend.name}")
+
+    def configure(self, coalesce_window: float, rate: float, burst: int):
+        """합치기 시간과 전송 속도 제한을 바꿉니다. (이미 만든 채팅방 버킷은 다음 실행부터 적용)"""
+        self.coalesce_window = max(0.0, coalesce_window)
+        self.rate = rate
+        self.burst = burst
+        print(f"알림 합치기 {self.coalesce_window * 1000:.0f}ms, 채팅방별 초당 {rate}개 (최대 {burst}개 연속)")
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._loop_finished = Future()
+                # 이전 루프의 전송 작업이 들고 있는 큐와 섞이지 않도록 새 딕셔너리 사용
+                self._queues = {}
+                self._thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(self._loop, self._loop_finished),
+                    name="NotificationService",
+                    daemon=True,
+                )
+                self._thread.start()
+                # 지난 실행에서 남은 알림 전송 재개
+                asyncio.run_coroutine_threadsafe(self._restore(), self._loop)
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, finished: "Future[None]"):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+            finished.set_result(None)
+
+    def start(self):
+        """이벤트 루프를 시작하고 발송함에 남은 알림 전송을 재개합니다."""
+        self._ensure_loop()
+
+    def send_message(
+        self,
+        token: str,
+        chat_id: str,
+        text: str,
+        state_key: Optional[str] = None,
+        state: Optional[str] = None
+    ):
+        """
+        텍스트 메시지를 채팅방 큐에 넣습니다.
+        state_key가 있으면 같은 키로 아직 대기 중인 메시지를 대체합니다.
+        """
+        self._enqueue(token, chat_id, Notification(text, state_key=state_key, state=state))
+
+    def send_photo(
+        self,
+        token: str,
+        chat_id: str,
+        image: Image.Image,
+        caption: str,
+        options: Optional[PhotoOptions] = None,
+        crop_box: Optional[Box] = None,
+        state_key: Optional[str] = None,
+        state: Optional[str] = None
+    ):
+        """
+        사진(캡션 포함)을 채팅방 큐에 넣습니다. (options가 없으면 기본 JPEG 설정)
+        state_key는 send_message와 같음 (반대 상태 메시지가 전송 전에 오면 둘 다 취소)
+        """
+        self._enqueue(token, chat_id, Notification(
+            caption, image, state_key=state_key, state=state, photo_options=options, crop_box=crop_box
+        ))
+
+    def _enqueue(self, token: str, chat_id: str, notification: Notification):
+        if not token or not chat_id:
+            return
+        try:
+            loop = self._ensure_loop()
+            loop.call_soon_threadsafe(self._put, (token, str(chat_id)), notification)
+        except RuntimeError as e:
+            print(f"알림 전송 예약 실패: {e}")
+
+    # --- 발송함 스레드 ---
+
+    def _db(self) -> AlertOutbox:
+        if self._outbox is None:
+            self._outbox = AlertOutbox(self.outbox_path)
+        return self._outbox
+
+    def _store(self, key: ChatKey, notification: Notification) -> OutboxItem:
+        """(발송함 스레드) 사진을 인코딩하고 발송함에 기록"""
+        photo = photo_name = None
+        if notification.photo is not None:
+            bio = encode_photo(notification.photo, notification.photo_options or PhotoOptions(), notification.crop_box)
+            photo, photo_name = bio.getvalue(), bio.name
+        return self._db().add(
+            key[0], key[1], notification.text, photo, photo_name,
+            notification.state_key, notification.state, notification.created
+        )
+
+    async def _run_outbox(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._outbox_executor, func, *args)
+
+    # --- 이벤트 루프 ---
+
+    async def _restore(self):
+        """발송함에 남은 알림이 있는 채팅방의 전송 작업 시작"""
+        try:
+            chats = await self._run_outbox(lambda: self._db().chats())
+        except Exception as e:
+            print(f"발송함 열기 실패: {e}")
+            return
+        leftover = [key for key in chats if key not in self._queues]
+        for key in leftover:
+            self._queue(key)
+        if leftover:
+            print(f"발송함에 남은 알림 전송 재개: 채팅방 {len(leftover)}개")
+
+    def _queue(self, key: ChatKey) -> ChatQueue:
+        """채팅방 큐 (처음 보는 채팅방이면 전송 작업 시작)"""
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = ChatQueue(TokenBucket(self.rate, self.burst))
+            self._queues[key] = queue
+            self._loop.create_task(self._chat_worker(key, queue))
+        return queue
+
+    def _put(self, key: ChatKey, notification: Notification):
+        """채팅방 큐에 넣기 전에 발송함에 기록 (기록 순서 = 전송 순서)"""
+        queue = self._queue(key)
+        self.enqueued += 1
+        queue.storing += 1
+        queue.idle.clear()
+        future = self._loop.run_in_executor(self._outbox_executor, self._store, key, notification)
+        future.add_done_callback(lambda f: self._stored(queue, f))
+
+    def _stored(self, queue: ChatQueue, future: "asyncio.Future[OutboxItem]"):
+        queue.storing -= 1
+        queue.wakeup.set()
+        try:
+            item = future.result()
+        except Exception as e:
+            print(f"알림 기록 실패: {e}")
+            return
+
+        if item.id <= queue.last_id:  # 발송함에서 이미 읽어 옴
+            return
+        if queue.spilled or len(queue.pending) >= self.memory_limit:
+            queue.spilled = True  # 발송함에만 두고 차례가 되면 읽음
+            return
+        queue.last_id = item.id
+        dropped = self._admit(queue, item)
+        if dropped:
+            self._loop.run_in_executor(self._outbox_executor, self._delete, dropped)
+
+    def _admit(self, queue: ChatQueue, item: OutboxItem) -> List[int]:
+        """
+        알림을 pending 끝에 넣고, 버릴 발송함 id 목록을 반환합니다.
+        같은 state_key로 대기 중인 메시지는 새 메시지로 대체하고,
+        상태가 반대면 (발견 → 사라짐) 결과적으로 바뀐 것이 없으므로 둘 다 버립니다.
+        """
+        if item.state_key is not None:
+            for index in range(len(queue.pending) - 1, queue.inflight - 1, -1):
+                old = queue.pending[index]
+                if old.state_key != item.state_key:
+                    continue
+                del queue.pending[index]
+                self.superseded += 1
+                if old.state != item.state:
+                    self.superseded += 1
+                    return [old.id, item.id]
+                queue.pending.append(item)
+                return [old.id]
+        queue.pending.append(item)
+        return []
+
+    def _delete(self, ids: List[int]):
+        self._db().delete(ids)
+
+    async def _refill(self, key: ChatKey, queue: ChatQueue):
+        """
+        발송함에만 있는 알림을 순서대로 읽어 옵니다. (쌓여 있던 상태 메시지는 여기서 정리)
+        읽는 동안 새로 기록된 알림의 완료 콜백은 이 작업이 이어진 뒤에 실행되므로 빠지는 항목이 없습니다.
+        """
+        limit = self.memory_limit - len(queue.pending)
+        items = await self._run_outbox(lambda: self._db().load(key, queue.last_id, limit))
+        dropped = []
+        for item in items:
+            queue.last_id = max(queue.last_id, item.id)
+            dropped.extend(self._admit(queue, item))
+        if len(items) < limit:
+            queue.spilled = False
+        if dropped:
+            await self._run_outbox(self._delete, dropped)
+
+    async def _chat_worker(self, key: ChatKey, queue: ChatQueue):
+        """채팅방 하나의 알림을 순서대로 전송 (합치기 시간 → 속도 제한 → 합쳐서 전송 → 실패 시 백오프)"""
+        token, chat_id = key
+        while True:
+            if not queue.pending:
+                if queue.spilled:
+                    await self._refill(key, queue)
+                    continue
+                if not queue.storing:
+                    queue.idle.set()
+                queue.wakeup.clear()
+                await queue.wakeup.wait()
+                if self.coalesce_window > 0:
+                    await asyncio.sleep(self.coalesce_window)
+                continue
+
+            if queue.spilled and len(queue.pending) < self.memory_limit // 2:
+                await self._refill(key, queue)
+
+            await queue.bucket.acquire()
+            batch = self._take_batch(queue)
+            if not batch:
+                continue
+
+            queue.inflight = len(batch)
+            delay = await self._deliver(token, chat_id, batch)
+            queue.inflight = 0
+            if delay is None:  # 전송 완료 또는 버림
+                for _ in batch:
+                    queue.pending.popleft()
+                await self._run_outbox(self._delete, [item.id for item in batch])
+            else:
+                # 실패한 알림은 pending 앞에 그대로 두고, 기다리는 동안 쌓인 알림과 함께 다시 전송
+                await asyncio.sleep(delay)
+
+    def _take_batch(self, queue: ChatQueue) -> List[OutboxItem]:
+        """
+        pending 앞쪽에서 이번에 보낼 알림 (꺼내지는 않음)
+        사진은 한 개씩, 텍스트는 이어지는 텍스트를 최대 길이까지 합침. 너무 오래된 알림은 버림
+        """
+        expired = []
+        now = time.time()
+        while queue.pending and now - queue.pending[0].created > self.max_age:
+            expired.append(queue.pending.popleft().id)
+        if expired:
+            self.dropped += len(expired)
+            print(f"오래된 알림 {len(expired)}개를 보내지 않고 버립니다.")
+            self._loop.run_in_executor(self._outbox_executor, self._delete, expired)
+        if not queue.pending:
+            return []
+
+        first = queue.pending[0]
+        if first.photo is not None:
+            return [first]
+        batch = [first]
+        length = len(first.text)
+        for item in list(queue.pending)[1:]:
+            length += len(item.text) + 1
+            if item.photo is not None or length > MAX_TEXT_LENGTH:
+                break
+            batch.append(item)
+        return batch
+
+    def _backoff(self, attempts: int) -> float:
+        """지수 백오프 + 지터 (base × 2^attempts, 최대 backoff_max, 50~100% 중 무작위)"""
+        return min(self.backoff_max, self.backoff_base * 2 ** attempts) * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, token: str, chat_id: str, batch: List[OutboxItem]) -> Optional[float]:
+        """
+        알림을 보냅니다. 전송했거나 다시 보내도 소용없는 오류면 None,
+        다시 보내야 하면 기다릴 시간(초)을 반환합니다.
+        """
+        first = batch[0]
+        text = "\n".join(item.text for item in batch)
+        try:
+            if first.photo is not None:
+                await self.backend.send_photo(token, chat_id, first.photo, first.photo_name, first.text)
+            else:
+                await self.backend.send_message(token, chat_id, text)
+            self.sent += 1
+            self.merged += len(batch) - 1
+            now = time.time()
+            for item in batch:
+                self.latency_stats.record(now - item.created)
+            print(f"텔레그램 {'사진' if first.photo is not None else '메시지'} 전송 성공: {text}")
+            return None
+        except RetryAfter as e:
+            delay = float(e.retry_after)
+            print(f"텔레그램 전송 제한 (429): {delay:.0f}초 후 다시 시도")
+        except (BadRequest, Forbidden, InvalidToken, ChatMigrated) as e:
+            # 요청 자체가 잘못된 경우 (BadRequest는 NetworkError의 하위 클래스라 먼저 처리)
+            print(f"텔레그램 전송 실패 (버림): {e}")
+            self.dropped += len(batch)
+            return None
+        except NetworkError as e:
+            # 연결 끊김, 시간 초과, 서버 오류
+            delay = self._backoff(first.attempts)
+            print(f"텔레그램 전송 실패({first.attempts + 1}번째), {delay:.1f}초 후 다시 시도: {e}")
+        except Exception as e:
+            print(f"전송 오류 (버림): {e}")
+            self.dropped += len(batch)
+            return None
+
+        self.retried += 1
+        for item in batch:
+            item.attempts += 1
+        await self._run_outbox(lambda: self._db().record_attempt([item.id for item in batch]))
+        return delay
+
+    @staticmethod
+    async def _wait_idle(queues: List[ChatQueue], timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.idle.wait() for queue in queues)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def flush_async(self, timeout: float = 5.0) -> "Future[bool]":
+        """
+        대기 중인 알림을 모두 보내면 완료되는 Future를 바로 반환합니다.
+        결과는 timeout 안에 모두 보냈으면 True입니다.
+        """
+        with self._lock:
+            loop = self._loop
+        if loop is None or not loop.is_running():
+            future: "Future[bool]" = Future()
+            future.set_result(True)
+            return future
+
+        async def join_all() -> bool:
+            return await self._wait_idle(list(self._queues.values()), timeout)
+
+        return asyncio.run_coroutine_threadsafe(join_all(), loop)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """대기 중인 알림을 모두 보낼 때까지 기다립니다. (시간 안에 끝나면 True)"""
+        try:
+            return self.flush_async(timeout).result(timeout + 1.0)
+        except Exception:
+            return False
+
+    def close_async(self, timeout: float = 5.0) -> "Future[None]":
+        """
+        대기 중인 알림을 timeout까지 보낸 뒤 백엔드를 닫고 이벤트 루프를 멈춥니다.
+        기다리지 않고, 이벤트 루프 스레드가 끝나면 완료되는 Future를 반환합니다.
+        시간 안에 보내지 못한 알림은 발송함에 남아 다음 실행 때 전송됩니다.
+        종료 중에 넣은 알림은 발송함에 기록되어, 루프가 끝난 뒤 다음 알림과 함께 새 루프에서 전송됩니다.
+        """
+        with self._lock:
+            loop, finished = self._loop, self._loop_finished
+            if loop is None or not self._thread.is_alive():
+                # 이벤트 루프를 시작한 적이 없거나 이미 끝났으면 기다릴 것이 없음
+                done: "Future[None]" = Future()
+                done.set_result(None)
+                return done
+            if self._closing is loop:
+                return finished
+            self._closing = loop
+
+        async def close():
+            # 이 코루틴보다 먼저 예약된 알림까지 포함해서 기다림
+            if not await self._wait_idle(list(self._queues.values()), timeout):
+                print("보내지 못한 알림은 발송함에 남겨 다음 실행 때 전송합니다.")
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await self.backend.close()
+            except Exception as e:
+                print(f"알림 백엔드 종료 오류: {e}")
+            asyncio.get_running_loop().stop()
+
+        asyncio.run_coroutine_threadsafe(close(), loop)
+        return finished
+
+    def shutdown(self, timeout: float = 5.0):
+        """close_async를 호출하고 이벤트 루프 스레드가 끝날 때까지 기다립니다."""
+        try:
+            self.close_async(timeout).result(timeout + 1.0)
+        except Exception as e:
+            print(f"알림 서비스 종료 오류: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """전송 통계 (넣은 수, 전송 요청 수, 합쳐진 수, 대체된 수, 재시도 수, 버린 수, 전송된 알림 수)"""
+        return {
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "merged": self.merged,
+            "superseded": self.superseded,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "delivered": self.latency_stats.count,
+        }
+
+
+_shared_notifier: Optional[NotificationService] = None
+_shared_lock = threading.Lock()
+
+
+def shared_notifier() -> NotificationService:
+    """프로세스 전체에서 공유하는 알림 서비스"""
+    global _shared_notifier
+    with _shared_lock:
+        if _shared_notifier is None:
+            _shared_notifier = NotificationService()
+        return _shared_notifier
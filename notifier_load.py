@@ -0,0 +1,133 @@
+"""
+알림 파이프라인 부하 생성기 (네트워크 없이 실행 가능)
+- 여러 스레드에서 NotificationService에 알림 수천 개를 넣고 모두 전송될 때까지 기다림
+- 넣기/전송 처리량, 전송 요청 수(합치기 결과), 재시도 수, 넣은 시각부터 전송 완료까지의 지연 백분위를 보고
+- 백엔드: mock (로컬 Bot API 대역 서버, 429/시간 초과 주입) / file (JSON Lines)
+
+사용법:
+    python notifier_load.py --alerts 5000 --chats 4
+    python notifier_load.py --alerts 2000 --rate-429 0.05 --timeout-rate 0.01 --hang-seconds 6
+    python notifier_load.py --backend file --alerts 10000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from notifier import NotificationService
+from notify_backends import create_notifier_backend
+
+TOKEN = "1:load"
+
+
+def run_load(
+    alerts: int = 2000,
+    chats: int = 4,
+    producers: int = 4,
+    backend: str = "mock",
+    coalesce_ms: float = 0.0,
+    rate: float = 0.0,
+    burst: int = 3,
+    rate_429: float = 0.0,
+    timeout_rate: float = 0.0,
+    hang_seconds: float = 10.0,
+    latency: float = 0.0,
+    state_every: int = 0,
+    timeout: float = 300.0,
+) -> Dict[str, object]:
+    """
+    알림을 넣고 결과를 출력합니다. rate가 0이면 채팅방별 속도 제한 없음.
+    state_every > 0이면 그 간격마다 발견/사라짐 상태 메시지를 섞습니다. (대체 확인)
+    """
+    workdir = tempfile.mkdtemp(prefix="notifier_load_")
+    if backend == "mock":
+        notify_backend = create_notifier_backend(
+            "mock", rate_429=rate_429, timeout_rate=timeout_rate, hang_seconds=hang_seconds, latency=latency
+        )
+    elif backend == "file":
+        notify_backend = create_notifier_backend("file", path=os.path.join(workdir, "alerts.jsonl"))
+    else:
+        raise ValueError(f"부하 테스트에는 mock / file 백엔드만 사용할 수 있습니다: {backend}")
+
+    service = NotificationService(
+        notify_backend,
+        coalesce_window=coalesce_ms / 1000.0,
+        rate=rate,
+        burst=burst,
+        outbox_path=os.path.join(workdir, "outbox.db"),
+        backoff_base=0.2,
+        backoff_max=5.0,
+    )
+    service.start()
+
+    def produce(worker: int):
+        for i in range(worker, alerts, producers):
+            chat_id = str(1000 + i % chats)
+            if state_every and i % state_every == 0:
+                state = "found" if (i // state_every) % 2 == 0 else "gone"
+                service.send_message(TOKEN, chat_id, f"state {state} {i}", "load:state", state)
+            else:
+                service.send_message(TOKEN, chat_id, f"alert {i}")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(w,)) for w in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    enqueue_seconds = time.perf_counter() - start
+
+    finished = service.flush(timeout)
+    total_seconds = time.perf_counter() - start
+    stats = service.stats()
+    latency_stats = service.latency_stats.percentiles()
+    service.shutdown(timeout=5.0)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    delivered = stats["delivered"]
+    print(
+        f"알림 {alerts}개 ({chats}개 채팅방, 스레드 {producers}개, 백엔드 {backend}) → "
+        f"전송 요청 {stats['sent']}개 (합쳐짐 {stats['merged']}, 대체 {stats['superseded']}, "
+        f"재시도 {stats['retried']}, 버림 {stats['dropped']})"
+    )
+    print(
+        f"넣기 {enqueue_seconds:.2f}초 ({alerts / enqueue_seconds:.0f}개/초), "
+        f"전송 완료 {total_seconds:.2f}초 ({delivered / total_seconds:.0f}개/초)"
+        + ("" if finished else f"  ※ {timeout:.0f}초 안에 끝나지 않음")
+    )
+    if latency_stats:
+        print(
+            "지연 " + "  ".join(
+                f"{name} {latency_stats[name] * 1000:.1f}ms" for name in ("p50", "p95", "p99", "max")
+            )
+        )
+    return {"stats": stats, "latency": latency_stats, "seconds": total_seconds, "finished": finished}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="알림 파이프라인 부하 생성기")
+    parser.add_argument("--alerts", type=int, default=2000, help="넣을 알림 수")
+    parser.add_argument("--chats", type=int, default=4, help="채팅방 수")
+    parser.add_argument("--producers", type=int, default=4, help="알림을 넣는 스레드 수")
+    parser.add_argument("--backend", choices=["mock", "file"], default="mock")
+    parser.add_argument("--coalesce-ms", type=float, default=0.0, help="합치기 시간 (ms)")
+    parser.add_argument("--rate", type=float, default=0.0, help="채팅방별 초당 전송 수 (0이면 제한 없음)")
+    parser.add_argument("--burst", type=int, default=3)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="mock: 429로 응답할 비율")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="mock: 응답을 늦출 비율")
+    parser.add_argument("--hang-seconds", type=float, default=10.0, help="mock: 늦춘 응답의 지연 (초)")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock: 정상 응답 지연 (초)")
+    parser.add_argument("--state-every", type=int, default=0, help="이 간격마다 상태 메시지 섞기 (0이면 없음)")
+    args = parser.parse_args()
+
+    run_load(
+        args.alerts, args.chats, args.producers, args.backend, args.coalesce_ms, args.rate, args.burst,
+        args.rate_429, args.timeout_rate, args.hang_seconds, args.latency, args.state_every,
+    )
+
+
+if __name__ == "__main__":
+    main()
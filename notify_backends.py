@@ -0,0 +1,125 @@
+"""
+알림 전송 백엔드
+- TelegramBackend: 텔레그램 Bot API (토큰별 Bot, 연결 풀 유지, base_url 변경 가능)
+- MockBotApiBackend: 로컬 Bot API 대역 서버(mock_bot_api)를 띄우고 실제 HTTP 경로로 전송 (429/시간 초과 주입)
+- FileSinkBackend: 네트워크 없이 알림을 JSON Lines 파일에 기록
+모든 메서드는 NotificationService의 이벤트 루프에서 호출됩니다.
+재시도 판단을 위해 오류는 telegram.error 예외(RetryAfter, NetworkError 등)로 알립니다.
+"""
+import json
+import time
+from typing import Dict, Optional
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+DEFAULT_BASE_URL = "https://api.telegram.org/bot"
+
+
+class NotifierBackend:
+    """알림 전송 백엔드 인터페이스"""
+
+    name = "base"
+
+    async def send_message(self, token: str, chat_id: str, text: str):
+        """텍스트 메시지를 보냅니다."""
+        raise NotImplementedError
+
+    async def send_photo(self, token: str, chat_id: str, photo: bytes, photo_name: str, caption: str):
+        """인코딩된 사진을 보냅니다. (photo_name의 확장자로 형식 표시)"""
+        raise NotImplementedError
+
+    async def close(self):
+        """백엔드 자원을 정리합니다."""
+
+
+class TelegramBackend(NotifierBackend):
+    """텔레그램 Bot API (토큰별 Bot 한 개, 연결 풀 공유)"""
+
+    name = "telegram"
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, pool_size: int = 4):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self._bots: Dict[str, Bot] = {}
+
+    def _bot(self, token: str) -> Bot:
+        bot = self._bots.get(token)
+        if bot is None:
+            bot = Bot(
+                token=token,
+                base_url=self.base_url,
+                request=HTTPXRequest(connection_pool_size=self.pool_size),
+            )
+            self._bots[token] = bot
+        return bot
+
+    async def send_message(self, token: str, chat_id: str, text: str):
+        await self._bot(token).send_message(chat_id=chat_id, text=text)
+
+    async def send_photo(self, token: str, chat_id: str, photo: bytes, photo_name: str, caption: str):
+        await self._bot(token).send_photo(chat_id=chat_id, photo=photo, filename=photo_name, caption=caption)
+
+    async def close(self):
+        for bot in self._bots.values():
+            try:
+                await bot.shutdown()
+            except Exception as e:
+                print(f"텔레그램 연결 종료 오류: {e}")
+        self._bots.clear()
+
+
+class MockBotApiBackend(TelegramBackend):
+    """로컬 Bot API 대역 서버를 띄우고 그 서버로 전송 (오프라인 부하/장애 테스트)"""
+
+    name = "mock"
+
+    def __init__(self, pool_size: int = 4, **server_options):
+        from mock_bot_api import MockBotApi
+
+        self.server = MockBotApi(**server_options).start()
+        super().__init__(self.server.base_url, pool_size)
+
+    async def close(self):
+        await super().close()
+        self.server.stop()
+
+
+class FileSinkBackend(NotifierBackend):
+    """알림을 JSON Lines 파일에 기록 (사진은 크기만 기록)"""
+
+    name = "file"
+
+    def __init__(self, path: str = "alerts.jsonl"):
+        self.path = path
+        self._file = None
+
+    def _write(self, record: dict):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        record["time"] = time.time()
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    async def send_message(self, token: str, chat_id: str, text: str):
+        self._write({"chat_id": chat_id, "method": "sendMessage", "text": text})
+
+    async def send_photo(self, token: str, chat_id: str, photo: bytes, photo_name: str, caption: str):
+        self._write({"chat_id": chat_id, "method": "sendPhoto", "text": caption, "photo": photo_name, "bytes": len(photo)})
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def create_notifier_backend(name: Optional[str], **kwargs) -> NotifierBackend:
+    """이름으로 알림 백엔드를 생성합니다. (telegram / mock / file)"""
+    name = (name or "telegram").lower()
+    if name == "telegram":
+        return TelegramBackend(**kwargs)
+    if name == "mock":
+        return MockBotApiBackend(**kwargs)
+    if name == "file":
+        return FileSinkBackend(**kwargs)
+    raise ValueError(f"알 수 없는 알림 백엔드: {name}")
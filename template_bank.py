@@ -0,0 +1,191 @@
+"""
+템플릿 저장소
+- img/ 아래 모든 템플릿을 시작 시 한 번만 디코딩
+- 컬러(RGB)/그레이 배열과 크기를 미리 계산하여 보관 (연속 메모리)
+- 파일 수정 시각(mtime)이 바뀐 템플릿만 다시 읽음 (크기와 내용 해시가 같으면 디코딩하지 않음)
+- 템플릿 팩(img/templates.pack)이 있으면 mmap 한 번으로 전체를 불러옴
+  (새로 체크아웃해서 mtime만 바뀐 파일은 팩의 내용 해시로 확인하여 그대로 사용)
+- ImageDetector와 ImageClickerWorker가 같은 저장소를 공유
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from utils import resource_path
+
+TEMPLATE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+PACK_FILENAME = "templates.pack"
+
+
+@dataclass(frozen=True)
+class Template:
+    """디코딩된 템플릿"""
+
+    path: str  # 저장소 키 (예: img/gt/gt1.png)
+    color: np.ndarray  # (H, W, 3) RGB
+    gray: np.ndarray  # (H, W)
+    width: int
+    height: int
+    mtime: float
+    size: int = 0  # 원본 파일 크기 (0이면 모름)
+    digest: str = ""  # 원본 파일 내용의 SHA-1 (비어 있으면 모름)
+
+
+def normalize_path(path: str) -> str:
+    """저장소 키 형식으로 경로 정규화 (구분자 '/')"""
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def natural_key(path: str):
+    """gt2가 gt10보다 앞에 오도록 숫자 기준 정렬 키"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def decode_image(full_path: str) -> np.ndarray:
+    """이미지 파일을 RGB 배열로 읽습니다. (한글 경로에서도 동작하도록 imdecode 사용)"""
+    data = np.fromfile(full_path, dtype=np.uint8)
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"템플릿을 읽을 수 없습니다: {full_path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def file_digest(full_path: str) -> str:
+    """파일 내용의 SHA-1 (16진수)"""
+    with open(full_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def make_template(path: str, color: np.ndarray, mtime: float, size: int = 0, digest: str = "") -> Template:
+    """컬러 배열로부터 Template 생성 (그레이/크기 미리 계산)"""
+    color = np.ascontiguousarray(color)
+    gray = np.ascontiguousarray(cv2.cvtColor(color, cv2.COLOR_RGB2GRAY))
+    height, width = color.shape[:2]
+    return Template(path, color, gray, width, height, mtime, size, digest)
+
+
+class TemplateBank:
+    """디코딩된 템플릿을 보관하는 저장소"""
+
+    def __init__(self, root: str = "img", check_interval: float = 2.0):
+        self.root = root
+        self.check_interval = check_interval  # mtime 확인 최소 간격 (초)
+
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Template] = {}
+        self._last_checked: Dict[str, float] = {}
+
+    def load_pack(self, pack_path: Optional[str] = None) -> int:
+        """템플릿 팩을 불러옵니다. 불러온 템플릿 수를 반환합니다."""
+        # template_pack이 이 모듈을 사용하므로 여기서 import
+        from template_pack import load_pack
+
+        pack_path = pack_path or resource_path(os.path.join(self.root, PACK_FILENAME))
+        templates = load_pack(pack_path)
+        with self._lock:
+            self._templates.update(templates)
+        print(f"템플릿 팩: {len(templates)}개 ({pack_path})")
+        return len(templates)
+
+    def preload(self) -> int:
+        """
+        root 아래 모든 템플릿을 읽어 둡니다. 읽은 개수를 반환합니다.
+        팩 파일이 있으면 먼저 불러오고, 디스크의 원본 파일은 내용이 팩과 다를 때만 다시 디코딩합니다.
+        """
+        pack_path = resource_path(os.path.join(self.root, PACK_FILENAME))
+        if os.path.exists(pack_path):
+            try:
+                self.load_pack(pack_path)
+            except Exception as e:
+                print(f"템플릿 팩 로드 오류: {e}")
+
+        count = 0
+        for path in self.discover():
+            try:
+                self.get(path)
+                count += 1
+            except Exception as e:
+                print(f"템플릿 {path} 로드 오류: {e}")
+        print(f"템플릿 저장소: {count}개 로드 ({self.root})")
+        return count
+
+    def discover(self, subdir: str = "") -> List[str]:
+        """
+        root(또는 그 하위 폴더) 아래 템플릿 경로 목록 (저장소 키 형식, 숫자 순 정렬)
+        디스크의 파일과 팩에서 불러온 템플릿을 모두 포함합니다.
+        """
+        base = normalize_path(os.path.join(self.root, subdir) if subdir else self.root)
+        base_full = resource_path(base)
+        paths = set()
+        for dirpath, _, filenames in os.walk(base_full):
+            for filename in filenames:
+                if filename.lower().endswith(TEMPLATE_EXTENSIONS):
+                    full_path = os.path.join(dirpath, filename)
+                    relative = os.path.relpath(full_path, resource_path(""))
+                    paths.add(normalize_path(relative))
+
+        with self._lock:
+            paths.update(key for key in self._templates if key.startswith(base + "/"))
+        return sorted(paths, key=natural_key)
+
+    def get(self, path: str) -> Template:
+        """템플릿 반환. 파일이 바뀐 경우에만 다시 디코딩합니다. (mtime만 바뀌고 내용이 같으면 그대로 사용)"""
+        key = normalize_path(path)
+        now = time.monotonic()
+
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None and now - self._last_checked.get(key, 0.0) < self.check_interval:
+                return template
+
+        full_path = resource_path(key)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            if template is not None:
+                # 파일이 없으면 (팩만 포함된 빌드 등) 마지막으로 읽은 템플릿을 계속 사용
+                with self._lock:
+                    self._last_checked[key] = now
+                return template
+            raise
+
+        mtime = stat.st_mtime
+        if template is None or template.mtime != mtime:
+            digest = file_digest(full_path)
+            if template is not None and template.size == stat.st_size and template.digest == digest:
+                template = replace(template, mtime=mtime)
+            else:
+                reloaded = template is not None
+                template = make_template(key, decode_image(full_path), mtime, stat.st_size, digest)
+                if reloaded:
+                    print(f"템플릿 다시 로드: {key}")
+
+        with self._lock:
+            self._templates[key] = template
+            self._last_checked[key] = now
+        return template
+
+    def loaded_paths(self) -> List[str]:
+        """현재 메모리에 있는 템플릿 목록"""
+        with self._lock:
+            return sorted(self._templates)
+
+
+_shared_bank: Optional[TemplateBank] = None
+_shared_lock = threading.Lock()
+
+
+def shared_template_bank() -> TemplateBank:
+    """프로세스 전체에서 공유하는 템플릿 저장소"""
+    global _shared_bank
+    with _shared_lock:
+        if _shared_bank is None:
+            _shared_bank = TemplateBank()
+        return _shared_bank
@@ -0,0 +1,144 @@
+"""
+템플릿 클러스터링
+- 템플릿 B 이미지 안에서 템플릿 A의 점수가 threshold 이상이면 A가 B를 대표할 수 있음
+  (gt23이 gt28의 일부인 경우처럼 B가 화면에 있으면 A도 높은 점수로 검색됨)
+- 아직 묶이지 않은 템플릿을 가장 많이 대표하는 템플릿부터 골라 클러스터를 만듦
+- 실행 중에는 대표만 먼저 검색하고, 대표 점수가 기준에 가까울 때만 멤버를 검색
+  (TemplateMatcher.find_first_clustered)
+
+분석 리포트:
+    python template_clusters.py [--subdir gt] [--threshold 0.9]
+"""
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from template_bank import Template, TemplateBank, shared_template_bank
+
+
+@dataclass(frozen=True)
+class TemplateCluster:
+    """대표 템플릿과 멤버 (멤버에는 대표도 포함)"""
+
+    representative: str
+    members: Tuple[str, ...]
+
+
+def coverage(representative: Template, member: Template) -> float:
+    """
+    member 이미지 안에서 representative가 받는 최고 점수 (컬러 TM_CCOEFF_NORMED)
+    representative가 member보다 크면 0
+    """
+    if representative.width > member.width or representative.height > member.height:
+        return 0.0
+    result = cv2.matchTemplate(member.color, representative.color, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, _ = cv2.minMaxLoc(result)
+    return float(max_val) if np.isfinite(max_val) else 0.0
+
+
+def coverage_matrix(templates: Sequence[Template]) -> np.ndarray:
+    """matrix[r, m] = coverage(templates[r], templates[m]) (대각선 1)"""
+    count = len(templates)
+    matrix = np.eye(count, dtype=np.float32)
+    for r in range(count):
+        for m in range(count):
+            if r != m:
+                matrix[r, m] = coverage(templates[r], templates[m])
+    return matrix
+
+
+def cluster_templates(templates: Sequence[Template], threshold: float = 0.9) -> List[TemplateCluster]:
+    """
+    아직 묶이지 않은 템플릿을 가장 많이 대표하는 템플릿부터 대표로 고릅니다. (탐욕적 집합 덮개)
+    대표의 멤버는 coverage가 threshold 이상인 템플릿이며, 결과는 가장 앞 멤버 순서로 정렬됩니다.
+    """
+    covers = coverage_matrix(templates) >= threshold
+    remaining = np.ones(len(templates), dtype=bool)
+    clusters = []
+
+    while remaining.any():
+        counts = (covers & remaining).sum(axis=1) * remaining
+        representative = int(np.argmax(counts))  # 같으면 앞 순서
+        indices = np.flatnonzero(covers[representative] & remaining)
+        remaining[indices] = False
+        clusters.append((int(indices[0]), TemplateCluster(
+            templates[representative].path,
+            tuple(templates[i].path for i in indices),
+        )))
+
+    return [cluster for _, cluster in sorted(clusters, key=lambda item: item[0])]
+
+
+class TemplateClusterIndex:
+    """템플릿 목록별 클러스터 결과 보관 (템플릿 파일이 바뀌면 다시 계산)"""
+
+    def __init__(self, bank: Optional[TemplateBank] = None, threshold: float = 0.9):
+        self.bank = bank or shared_template_bank()
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[Tuple[str, float], ...], List[TemplateCluster]] = {}
+
+    def clusters(self, template_paths: Sequence[str]) -> List[TemplateCluster]:
+        """템플릿 목록의 클러스터 (목록 순서 기준)"""
+        templates = []
+        for path in template_paths:
+            try:
+                templates.append(self.bank.get(path))
+            except Exception as e:
+                print(f"템플릿 {path} 로드 오류: {e}")
+
+        key = tuple((t.path, t.mtime) for t in templates)
+        with self._lock:
+            clusters = self._cache.get(key)
+        if clusters is None:
+            clusters = cluster_templates(templates, self.threshold)
+            with self._lock:
+                self._cache.clear()
+                self._cache[key] = clusters
+            print(f"템플릿 클러스터: {len(templates)}개 → 대표 {len(clusters)}개 (점수 ≥ {self.threshold})")
+        return clusters
+
+    def ordered(self, template_paths: Sequence[str]) -> List[TemplateCluster]:
+        """
+        template_paths 순서(적중 빈도 순서 등)를 따르는 클러스터 목록
+        클러스터 분석은 순서와 무관하게 한 번만 하고, 클러스터는 가장 앞 멤버 순서로, 멤버는 목록 순서로 정렬합니다.
+        """
+        position = {path: i for i, path in enumerate(template_paths)}
+        ordered = []
+        for cluster in self.clusters(sorted(template_paths)):
+            members = tuple(sorted((m for m in cluster.members if m in position), key=position.__getitem__))
+            if members:
+                ordered.append(TemplateCluster(cluster.representative, members))
+        ordered.sort(key=lambda cluster: position[cluster.members[0]])
+        return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="템플릿 클러스터 리포트")
+    parser.add_argument("--subdir", default="gt", help="img 아래 템플릿 폴더")
+    parser.add_argument("--threshold", type=float, default=0.9, help="대표가 멤버 이미지 안에서 받아야 하는 점수")
+    args = parser.parse_args()
+
+    bank = shared_template_bank()
+    templates = [bank.get(path) for path in bank.discover(args.subdir)]
+    matrix = coverage_matrix(templates)
+    index = {t.path: i for i, t in enumerate(templates)}
+    clusters = cluster_templates(templates, args.threshold)
+
+    print(f"템플릿 {len(templates)}개 → 대표 {len(clusters)}개 (점수 ≥ {args.threshold})")
+    for cluster in clusters:
+        rep = index[cluster.representative]
+        print(f"- 대표 {cluster.representative} ({templates[rep].width}x{templates[rep].height})")
+        for member in cluster.members:
+            if member != cluster.representative:
+                m = index[member]
+                print(f"    {member} ({templates[m].width}x{templates[m].height})  점수 {matrix[rep, m]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
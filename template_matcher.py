@@ -0,0 +1,639 @@
+"""
+템플릿 매칭 엔진 (OpenCV 버전)
+- 한 번 캡처한 구역 프레임에서 모든 템플릿을 검색
+- pyautogui.locateOnScreen과 같은 TM_CCOEFF_NORMED 점수 사용
+- 템플릿은 공용 템플릿 저장소(TemplateBank)에서 가져오므로 매 틱 디코딩하지 않음
+- 전체 이미지가 구역 내에 있어야 감지
+- PyramidMatcher: 축소 프레임에서 후보를 찾고 원본 해상도에서는 후보 주변만 확인
+- FFTMatcher: 프레임 FFT를 틱당 한 번 계산하고 같은 크기 템플릿끼리 묶어 주파수 영역에서 상관 계산
+- find_first_parallel: 템플릿들을 스레드 풀에 나눠 검색 (OpenCV 매칭은 GIL을 놓음)
+- find_first_clustered: 클러스터 대표만 먼저 검색하고 점수가 기준에 가까울 때만 멤버 검색 (스레드 풀 병렬 가능)
+- find_near: 이전 매칭 위치 주변 작은 창만 검색 (못 찾으면 호출하는 쪽에서 전체 구역 검색)
+"""
+import math
+import threading
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from template_bank import Template, TemplateBank, shared_template_bank
+from template_clusters import TemplateCluster
+
+Region = Tuple[int, int, int, int]  # (x1, y1, x2, y2)
+
+# 클러스터 멤버 점수 차가 이 값 이내면 더 큰 멤버를 보고 (대표가 큰 멤버의 일부인 경우)
+MEMBER_TIE_MARGIN = 0.01
+
+
+@dataclass(frozen=True)
+class MatchResult:
+    """매칭 결과 (화면 절대 좌표)"""
+
+    template_path: str
+    box: Tuple[int, int, int, int]  # (left, top, right, bottom)
+    score: float
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        left, top, right, bottom = self.box
+        return (left + (right - left) // 2, top + (bottom - top) // 2)
+
+
+class TemplateMatcher:
+    """하나의 프레임에서 여러 템플릿을 순서대로 검색하는 클래스"""
+
+    # 같은 준비 프레임에 대해 match_template을 여러 스레드에서 동시에 호출해도 되는지
+    parallel_safe = True
+
+    def __init__(self, bank: Optional[TemplateBank] = None, grayscale: bool = False):
+        self.bank = bank or shared_template_bank()
+        self.grayscale = grayscale  # True면 그레이 배열끼리 매칭 (pyautogui grayscale 옵션과 동일)
+        self.last_evaluated = 0  # 마지막 검색에서 점수를 계산한 템플릿 수
+
+    def get_template(self, path: str) -> Template:
+        """저장소에서 디코딩된 템플릿을 가져옵니다."""
+        return self.bank.get(path)
+
+    def template_array(self, template: Template) -> np.ndarray:
+        """매칭 방식(컬러/그레이)에 맞는 템플릿 배열"""
+        return template.gray if self.grayscale else template.color
+
+    def load_templates(self, template_paths: Iterable[str]) -> List[Template]:
+        """경로 목록의 템플릿을 가져옵니다. 읽지 못한 템플릿은 건너뜁니다."""
+        templates = []
+        for template_path in template_paths:
+            try:
+                templates.append(self.get_template(template_path))
+            except Exception as e:
+                print(f"템플릿 {template_path} 로드 오류: {e}")
+        return templates
+
+    def max_template_size(self, template_paths: Iterable[str]) -> Tuple[int, int]:
+        """템플릿 목록의 최대 (너비, 높이)"""
+        templates = self.load_templates(template_paths)
+        if not templates:
+            return 0, 0
+        return max(t.width for t in templates), max(t.height for t in templates)
+
+    def prepare_frame(self, frame: np.ndarray, templates: Sequence[Template] = ()):
+        """매칭 방식에 맞게 프레임 변환 (틱당 한 번, templates는 이번 틱에 검색할 템플릿)"""
+        if self.grayscale and frame.ndim == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        return frame
+
+    def match_template(self, prepared, template: Template, confidence: float) -> Tuple[float, Tuple[int, int]]:
+        """준비된 프레임에서 템플릿의 최고 점수와 위치(x, y)를 반환합니다."""
+        return self.match(prepared, self.template_array(template))
+
+    def match(self, frame: np.ndarray, template: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        """프레임 안에서 가장 높은 점수와 그 위치(x, y)를 반환합니다."""
+        frame_height, frame_width = frame.shape[:2]
+        template_height, template_width = template.shape[:2]
+        if template_height > frame_height or template_width > frame_width:
+            return 0.0, (0, 0)
+
+        result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if not np.isfinite(max_val):
+            # 단색 템플릿은 분모가 0이 되어 점수가 정의되지 않음
+            return 0.0, (0, 0)
+        return float(max_val), max_loc
+
+    def find_first(
+        self,
+        frame: np.ndarray,
+        region: Region,
+        template_paths: Iterable[str],
+        confidence: float,
+        report_partial: bool = True
+    ) -> Optional[MatchResult]:
+        """
+        구역 프레임에서 템플릿을 순서대로 검색하여 첫 번째로 구역 안에 완전히 들어온 매칭을 반환합니다.
+        frame은 region을 캡처한 배열이어야 합니다.
+        """
+        templates = self.load_templates(template_paths)
+        prepared = self.prepare_frame(frame, templates)
+        self.last_evaluated = 0
+
+        for template in templates:
+            self.last_evaluated += 1
+            score, location = self.match_template(prepared, template, confidence)
+            if score < confidence:
+                continue
+
+            result = self.to_result(region, template, score, location, report_partial)
+            if result:
+                return result
+
+        return None
+
+    def find_near(
+        self,
+        frame: np.ndarray,
+        region: Region,
+        box: Tuple[int, int, int, int],
+        template_paths: Iterable[str],
+        confidence: float,
+        padding: int = 40
+    ) -> Optional[MatchResult]:
+        """
+        이전 매칭 위치(box, 화면 좌표) 주변을 padding만큼 넓힌 창에서만 검색합니다.
+        창은 region 안으로 잘리며, 창 밖으로 걸친 매칭은 무시합니다. (전체 구역 검색으로 다시 확인)
+        """
+        x1, y1, x2, y2 = region
+        window = (
+            max(x1, box[0] - padding),
+            max(y1, box[1] - padding),
+            min(x2, box[2] + padding),
+            min(y2, box[3] + padding),
+        )
+        if window[2] <= window[0] or window[3] <= window[1]:
+            return None
+
+        sub_frame = frame[window[1] - y1:window[3] - y1, window[0] - x1:window[2] - x1]
+        return self.find_first(sub_frame, window, template_paths, confidence, report_partial=False)
+
+    def find_first_parallel(
+        self,
+        frame: np.ndarray,
+        region: Region,
+        template_paths: Iterable[str],
+        confidence: float,
+        executor: Executor
+    ) -> Optional[MatchResult]:
+        """
+        find_first와 같은 결과를 스레드 풀에서 병렬로 계산합니다.
+        - 템플릿 순서상 가장 앞의 완전한 매칭이 결과 (순차 검색의 break와 동일)
+        - 매칭을 찾으면 그보다 뒤 순서의 남은 작업은 시작하지 않고 건너뜀
+        """
+        templates = self.load_templates(template_paths)
+        if not self.parallel_safe or len(templates) < 2:
+            return self.find_first(frame, region, [t.path for t in templates], confidence)
+
+        prepared = self.prepare_frame(frame, templates)
+        lock = threading.Lock()
+        found = [len(templates)]  # 지금까지 찾은 가장 앞의 매칭 순서
+        evaluated = []
+
+        def evaluate(index: int, template: Template) -> Optional[MatchResult]:
+            if index > found[0]:
+                return None
+            evaluated.append(index)
+            score, location = self.match_template(prepared, template, confidence)
+            if score < confidence:
+                return None
+            result = self.to_result(region, template, score, location)
+            if result:
+                with lock:
+                    found[0] = min(found[0], index)
+            return result
+
+        futures = [executor.submit(evaluate, i, t) for i, t in enumerate(templates)]
+        try:
+            # 순서대로 결과를 확인하므로 앞 순서 작업이 끝날 때까지만 기다림
+            for future in futures:
+                result = future.result()
+                if result:
+                    return result
+            return None
+        finally:
+            for future in futures:
+                future.cancel()
+            self.last_evaluated = len(evaluated)
+
+    def find_first_clustered(
+        self,
+        frame: np.ndarray,
+        region: Region,
+        clusters: Sequence[TemplateCluster],
+        confidence: float,
+        expand_margin: float = 0.2,
+        executor: Optional[Executor] = None
+    ) -> Optional[MatchResult]:
+        """
+        클러스터 대표를 순서대로 검색하고, 대표 점수가 confidence - expand_margin 이상일 때만
+        그 클러스터의 나머지 멤버를 검색합니다. 결과는 클러스터 순서상 가장 앞의 매칭입니다.
+        - 대표는 큰 멤버의 일부일 수 있으므로 클러스터 안에서는 실제 화면의 멤버를 보고
+          (점수가 가장 높은 멤버, 점수 차가 MEMBER_TIE_MARGIN 이내면 더 큰 멤버)
+        - executor가 있으면 클러스터들을 스레드 풀에서 병렬 검색 (find_first_parallel과 같은 방식)
+        """
+        representatives = {
+            template.path: template
+            for template in self.load_templates(cluster.representative for cluster in clusters)
+        }
+        prepared = self.prepare_frame(frame, list(representatives.values()))
+        expand_threshold = confidence - expand_margin
+        evaluated = []
+
+        def evaluate(cluster: TemplateCluster) -> Optional[MatchResult]:
+            candidates = []
+            representative = representatives.get(cluster.representative)
+            if representative is not None:
+                evaluated.append(representative.path)
+                score, location = self.match_template(prepared, representative, expand_threshold)
+                if score < expand_threshold:
+                    return None
+                candidates.append((representative, score, location))
+
+            # 대표를 읽지 못했으면 멤버를 모두 검색
+            members = [m for m in cluster.members if m != cluster.representative]
+            for template in self.load_templates(members):
+                evaluated.append(template.path)
+                score, location = self.match_template(prepared, template, confidence)
+                candidates.append((template, score, location))
+
+            results = [
+                self.to_result(region, template, score, location)
+                for template, score, location in candidates
+                if score >= confidence
+            ]
+            results = [result for result in results if result]
+            if not results:
+                return None
+            best_score = max(result.score for result in results)
+            return max(
+                (result for result in results if result.score >= best_score - MEMBER_TIE_MARGIN),
+                key=lambda result: (result.box[2] - result.box[0]) * (result.box[3] - result.box[1]),
+            )
+
+        if executor is None or not self.parallel_safe or len(clusters) < 2:
+            try:
+                for cluster in clusters:
+                    result = evaluate(cluster)
+                    if result:
+                        return result
+                return None
+            finally:
+                self.last_evaluated = len(evaluated)
+
+        lock = threading.Lock()
+        found = [len(clusters)]  # 지금까지 찾은 가장 앞의 클러스터 순서
+
+        def evaluate_at(index: int, cluster: TemplateCluster) -> Optional[MatchResult]:
+            if index > found[0]:
+                return None
+            result = evaluate(cluster)
+            if result:
+                with lock:
+                    found[0] = min(found[0], index)
+            return result
+
+        futures = [executor.submit(evaluate_at, i, cluster) for i, cluster in enumerate(clusters)]
+        try:
+            for future in futures:
+                result = future.result()
+                if result:
+                    return result
+            return None
+        finally:
+            for future in futures:
+                future.cancel()
+            self.last_evaluated = len(evaluated)
+
+    def to_result(
+        self,
+        region: Region,
+        template: Template,
+        score: float,
+        location: Tuple[int, int],
+        report_partial: bool = True
+    ) -> Optional[MatchResult]:
+        """프레임 내 위치를 화면 좌표로 바꾸고 전체 이미지가 구역 안에 있을 때만 결과를 반환합니다."""
+        x1, y1, x2, y2 = region
+        left = x1 + location[0]
+        top = y1 + location[1]
+        right = left + template.width
+        bottom = top + template.height
+
+        # 전체 이미지가 구역 내에 있는지 확인
+        if left >= x1 and top >= y1 and right <= x2 and bottom <= y2:
+            return MatchResult(template.path, (left, top, right, bottom), score)
+
+        if report_partial:
+            print(f"✗ 부분 이미지 감지 (무시): {template.path} - 구역 밖으로 벗어남")
+        return None
+
+
+@dataclass
+class PyramidFrame:
+    """피라미드 매칭용으로 준비된 프레임 (원본 + 축소본)"""
+
+    full: np.ndarray
+    coarse: np.ndarray
+
+
+class PyramidMatcher(TemplateMatcher):
+    """
+    축소 프레임에서 먼저 후보를 찾고 원본 해상도에서는 후보 주변의 작은 창만 확인하는 매처
+    - scale: 축소 비율 (0.5 = 1/2, 0.25 = 1/4)
+    - coarse_margin: 축소 단계 통과 점수를 confidence보다 이만큼 낮춤
+    - 축소 시 너무 작아지는 템플릿은 원본 해상도에서 바로 매칭
+    """
+
+    def __init__(
+        self,
+        bank: Optional[TemplateBank] = None,
+        grayscale: bool = False,
+        scale: float = 0.5,
+        coarse_margin: float = 0.15,
+        max_candidates: int = 3,
+        min_template_size: int = 10
+    ):
+        super().__init__(bank, grayscale)
+        self.scale = scale
+        self.coarse_margin = coarse_margin
+        self.max_candidates = max_candidates
+        self.min_template_size = min_template_size
+        self._scaled: Dict[Tuple[str, float, bool], Optional[np.ndarray]] = {}
+
+    def prepare_frame(self, frame: np.ndarray, templates: Sequence[Template] = ()) -> PyramidFrame:
+        full = super().prepare_frame(frame, templates)
+        coarse = cv2.resize(full, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return PyramidFrame(full, coarse)
+
+    def _scaled_template(self, template: Template) -> Optional[np.ndarray]:
+        """축소 템플릿 (템플릿 파일이 바뀌면 다시 계산, 너무 작으면 None)"""
+        key = (template.path, template.mtime, self.grayscale)
+        if key not in self._scaled:
+            width = int(round(template.width * self.scale))
+            height = int(round(template.height * self.scale))
+            if min(width, height) < self.min_template_size:
+                self._scaled[key] = None
+            else:
+                self._scaled[key] = cv2.resize(
+                    self.template_array(template), (width, height), interpolation=cv2.INTER_AREA
+                )
+        return self._scaled[key]
+
+    def _coarse_candidates(self, coarse: np.ndarray, scaled: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+        """축소 프레임에서 threshold 이상인 후보 위치 (점수 높은 순, 서로 겹치지 않게)"""
+        frame_height, frame_width = coarse.shape[:2]
+        template_height, template_width = scaled.shape[:2]
+        if template_height > frame_height or template_width > frame_width:
+            return []
+
+        result = cv2.matchTemplate(coarse, scaled, cv2.TM_CCOEFF_NORMED)
+        np.nan_to_num(result, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+
+        candidates = []
+        for _ in range(self.max_candidates):
+            _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+            if max_val < threshold:
+                break
+            candidates.append((x, y))
+            # 같은 자리 주변이 다시 후보로 뽑히지 않도록 지움
+            result[
+                max(0, y - template_height // 2):y + template_height // 2 + 1,
+                max(0, x - template_width // 2):x + template_width // 2 + 1
+            ] = -1.0
+        return candidates
+
+    def match_template(self, prepared: PyramidFrame, template: Template, confidence: float) -> Tuple[float, Tuple[int, int]]:
+        array = self.template_array(template)
+        scaled = self._scaled_template(template)
+        if scaled is None:
+            return self.match(prepared.full, array)
+
+        candidates = self._coarse_candidates(prepared.coarse, scaled, confidence - self.coarse_margin)
+
+        # 원본 해상도에서 후보 주변만 확인 (축소로 생긴 위치 오차만큼 여유)
+        padding = int(math.ceil(1 / self.scale)) + 2
+        frame_height, frame_width = prepared.full.shape[:2]
+        best_score, best_loc = 0.0, (0, 0)
+        for cx, cy in candidates:
+            fx = int(round(cx / self.scale))
+            fy = int(round(cy / self.scale))
+            wx1 = max(0, fx - padding)
+            wy1 = max(0, fy - padding)
+            wx2 = min(frame_width, fx + template.width + padding)
+            wy2 = min(frame_height, fy + template.height + padding)
+
+            score, (x, y) = self.match(prepared.full[wy1:wy2, wx1:wx2], array)
+            if score > best_score:
+                best_score, best_loc = score, (wx1 + x, wy1 + y)
+            if best_score >= confidence:
+                break
+
+        return best_score, best_loc
+
+
+@dataclass
+class FFTFrame:
+    """FFT 매칭용으로 준비된 프레임"""
+
+    image: np.ndarray  # (H, W, C) uint8
+    spectra: np.ndarray  # (C, P, Q // 2 + 1) 프레임 채널별 스펙트럼
+    fft_shape: Tuple[int, int]  # (P, Q)
+    groups: Dict[Tuple[int, int], List[Template]]  # (높이, 너비) → 같은 크기 템플릿
+    results: Dict[str, Tuple[float, Tuple[int, int]]]  # 이번 틱에 계산된 템플릿 결과
+    window_stats: Dict[Tuple[int, int], np.ndarray]  # 크기별 창 표준편차 항
+    spectrum_cache: "SpectrumCache"  # 템플릿 스펙트럼 보관소 (구역 / find_near 창)
+    integrals: Optional[Tuple[np.ndarray, np.ndarray]] = None  # (합, 제곱합) 적분 영상, 첫 그룹에서 한 번 계산
+
+    def integral_images(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(H+1, W+1, C) 합 / 제곱합 적분 영상 (프레임당 한 번 계산하고 모든 크기 그룹이 공유)"""
+        if self.integrals is None:
+            sums, sqsums = cv2.integral2(self.image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+            if sums.ndim == 2:
+                sums, sqsums = sums[:, :, None], sqsums[:, :, None]
+            self.integrals = (sums, sqsums)
+        return self.integrals
+
+
+class SpectrumCache:
+    """
+    FFT 크기별 템플릿 스펙트럼 보관소
+    - 한도를 넘으면 같은 템플릿의 옛 버전과 다른 FFT 크기의 오래된 것부터 비움
+    - 같은 FFT 크기끼리는 교체하지 않고 새 스펙트럼을 보관하지 않음
+      (매 틱 같은 순서로 훑으므로 LRU 교체는 적중률이 0이 됨)
+    """
+
+    def __init__(self, limit_mb: int):
+        self.limit_bytes = limit_mb * 1024 * 1024
+        self.nbytes = 0
+        # 스펙트럼은 FFT 크기마다 다르므로 키에 포함
+        self._entries: "OrderedDict[Tuple[str, float, Tuple[int, int]], Tuple[np.ndarray, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[str, float, Tuple[int, int]]) -> Optional[Tuple[np.ndarray, float]]:
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+        return cached
+
+    def put(self, key: Tuple[str, float, Tuple[int, int]], stored: np.ndarray, norm: float):
+        path, _, fft_shape = key
+        for old_key in [k for k in self._entries if k[0] == path]:
+            self.nbytes -= self._entries.pop(old_key)[0].nbytes
+
+        for old_key in [k for k in self._entries if k[2] != fft_shape]:
+            if self.nbytes + stored.nbytes <= self.limit_bytes:
+                break
+            self.nbytes -= self._entries.pop(old_key)[0].nbytes
+
+        # 같은 FFT 크기끼리는 교체하지 않음 (보관된 것들은 계속 적중)
+        if self.nbytes + stored.nbytes <= self.limit_bytes:
+            self._entries[key] = (stored, norm)
+            self.nbytes += stored.nbytes
+
+
+class FFTMatcher(TemplateMatcher):
+    """
+    주파수 영역 상관 매처 (TM_CCOEFF_NORMED와 같은 점수)
+    - 프레임 FFT는 틱당 한 번
+    - 템플릿 스펙트럼은 노름으로 나눠 반정밀도(float16 실수/허수)로 보관
+      (gt 44개 구역 기준 약 186MB라 기본 한도는 200MB, 설정 fft_cache_mb로 변경)
+    - find_near 창의 스펙트럼은 창마다 FFT 크기가 달라 구역 스펙트럼과 따로 보관 (window_cache_mb)
+    - 같은 크기 템플릿은 창 분산(분모)을 공유하고 역FFT를 한 번에 계산
+    - 그룹 결과를 준비 프레임에 기록하므로 병렬 검색 시에는 순차 검색으로 대체
+    """
+
+    parallel_safe = False
+
+    def __init__(
+        self,
+        bank: Optional[TemplateBank] = None,
+        grayscale: bool = False,
+        spectrum_cache_mb: int = 200,
+        window_cache_mb: int = 32
+    ):
+        super().__init__(bank, grayscale)
+        self.spectra = SpectrumCache(spectrum_cache_mb)
+        self.window_spectra = SpectrumCache(window_cache_mb)
+        self._local = threading.local()  # find_near 실행 중인지 (스레드별)
+
+    def find_near(self, *args, **kwargs) -> Optional[MatchResult]:
+        """TemplateMatcher.find_near와 같고, 창 스펙트럼은 window_spectra에 보관합니다."""
+        self._local.window = True
+        try:
+            return super().find_near(*args, **kwargs)
+        finally:
+            self._local.window = False
+
+    def prepare_frame(self, frame: np.ndarray, templates: Sequence[Template] = ()) -> FFTFrame:
+        image = super().prepare_frame(frame, templates)
+        if image.ndim == 2:
+            image = image[:, :, None]
+
+        height, width = image.shape[:2]
+        fft_shape = (cv2.getOptimalDFTSize(height), cv2.getOptimalDFTSize(width))
+
+        channels = np.moveaxis(image, 2, 0).astype(np.float32)
+        spectra = np.fft.rfft2(channels, s=fft_shape).astype(np.complex64)
+
+        groups: Dict[Tuple[int, int], List[Template]] = {}
+        for template in templates:
+            groups.setdefault((template.height, template.width), []).append(template)
+
+        cache = self.window_spectra if getattr(self._local, "window", False) else self.spectra
+        return FFTFrame(image, spectra, fft_shape, groups, {}, {}, cache)
+
+    def _template_spectrum(
+        self,
+        template: Template,
+        fft_shape: Tuple[int, int],
+        cache: SpectrumCache
+    ) -> Tuple[np.ndarray, float]:
+        """평균을 빼고 노름으로 나눈 템플릿의 켤레 스펙트럼(complex64)과 노름"""
+        key = (template.path, template.mtime, fft_shape)
+        cached = cache.get(key)
+        if cached is not None:
+            stored, norm = cached
+            return stored.astype(np.float32).view(np.complex64)[..., 0], norm
+
+        array = self.template_array(template).astype(np.float32)
+        if array.ndim == 2:
+            array = array[:, :, None]
+        array -= array.mean(axis=(0, 1))
+        norm = float(np.sqrt(np.sum(array * array)))
+        if norm > 0:
+            array /= norm
+        # 정규화한 템플릿의 계수 크기는 sqrt(픽셀 수) 이하라 float16 범위 안 (점수 오차 약 1e-4)
+        spectrum = np.conj(np.fft.rfft2(np.moveaxis(array, 2, 0), s=fft_shape)).astype(np.complex64)
+        cache.put(key, np.stack([spectrum.real, spectrum.imag], axis=-1).astype(np.float16), norm)
+        return spectrum, norm
+
+    def _window_std(self, prepared: FFTFrame, height: int, width: int) -> np.ndarray:
+        """템플릿 크기 창마다 sqrt(Σ(I - 평균)²) (같은 크기 그룹이 공유)"""
+        key = (height, width)
+        std = prepared.window_stats.get(key)
+        if std is None:
+            sums, sqsums = prepared.integral_images()
+
+            def window_sum(table: np.ndarray) -> np.ndarray:
+                return (
+                    table[height:, width:] - table[:-height, width:]
+                    - table[height:, :-width] + table[:-height, :-width]
+                )
+
+            s1 = window_sum(sums)
+            s2 = window_sum(sqsums)
+            variance = np.sum(s2 - s1 * s1 / (height * width), axis=2)
+            std = np.sqrt(np.maximum(variance, 0.0))
+            prepared.window_stats[key] = std
+        return std
+
+    def _match_group(self, prepared: FFTFrame, size: Tuple[int, int]):
+        """같은 크기 템플릿을 한 번에 상관 계산하여 prepared.results에 저장"""
+        height, width = size
+        frame_height, frame_width = prepared.image.shape[:2]
+        members = prepared.groups[size]
+        if height > frame_height or width > frame_width:
+            for template in members:
+                prepared.results[template.path] = (0.0, (0, 0))
+            return
+
+        spectra, norms = zip(*(
+            self._template_spectrum(t, prepared.fft_shape, prepared.spectrum_cache) for t in members
+        ))
+        products = np.einsum("cpq,kcpq->kpq", prepared.spectra, np.stack(spectra))
+        numerators = np.fft.irfft2(products, s=prepared.fft_shape)[
+            :, :frame_height - height + 1, :frame_width - width + 1
+        ]
+        window_std = self._window_std(prepared, height, width)
+
+        # 분산이 거의 없는 창(단색 영역)은 점수 0 (템플릿 스펙트럼은 이미 노름으로 나눔)
+        valid = window_std > 1e-3
+        for template, numerator, norm in zip(members, numerators, norms):
+            scores = np.zeros(window_std.shape, dtype=np.float32)
+            if norm > 0:
+                np.divide(numerator, window_std, out=scores, where=valid, casting="unsafe")
+            _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+            prepared.results[template.path] = (float(min(max_val, 1.0)), max_loc)
+
+    def match_template(self, prepared: FFTFrame, template: Template, confidence: float) -> Tuple[float, Tuple[int, int]]:
+        result = prepared.results.get(template.path)
+        if result is None:
+            size = (template.height, template.width)
+            group = prepared.groups.setdefault(size, [])
+            if template not in group:
+                group.append(template)
+            self._match_group(prepared, size)
+            result = prepared.results[template.path]
+        return result
+
+
+MATCHING_ENGINES = {
+    "spatial": TemplateMatcher,
+    "pyramid": PyramidMatcher,
+    "fft": FFTMatcher,
+}
+
+
+def create_matcher(engine: str = "spatial", fft_cache_mb: Optional[int] = None, **kwargs) -> TemplateMatcher:
+    """
+    이름으로 매칭 엔진을 생성합니다. (spatial / pyramid / fft)
+    fft_cache_mb는 fft 엔진의 템플릿 스펙트럼 보관 한도 (다른 엔진에서는 무시, None이면 기본값)
+    """
+    matcher_class = MATCHING_ENGINES.get((engine or "spatial").lower())
+    if matcher_class is None:
+        raise ValueError(f"알 수 없는 매칭 엔진: {engine}")
+    if matcher_class is FFTMatcher and fft_cache_mb is not None:
+        kwargs["spectrum_cache_mb"] = fft_cache_mb
+    return matcher_class(**kwargs)
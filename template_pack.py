@@ -0,0 +1,129 @@
+"""
+템플릿 팩 (빌드 단계 + 로더)
+- img/ 아래 모든 템플릿을 디코딩된 배열 그대로 파일 하나(img/templates.pack)에 저장
+- 실행 시 파일 하나를 mmap으로 열고 각 템플릿은 복사 없이 뷰로 사용
+- PyInstaller onefile 빌드에서 템플릿마다 파일을 열고 디코딩하는 비용을 없앰
+- 원본 파일 크기와 내용 해시를 함께 저장 (mtime만 바뀐 원본은 다시 디코딩하지 않음)
+
+파일 형식:
+    MAGIC(4) | 헤더 길이(uint32 LE) | 헤더(JSON, UTF-8) | 64바이트 정렬된 배열 데이터...
+
+빌드:
+    python template_pack.py [--root img] [--output img/templates.pack]
+"""
+import argparse
+import json
+import os
+import struct
+from typing import Dict, List
+
+import numpy as np
+
+from template_bank import (
+    TEMPLATE_EXTENSIONS,
+    Template,
+    decode_image,
+    file_digest,
+    make_template,
+    natural_key,
+    normalize_path,
+)
+
+MAGIC = b"TPK1"
+ALIGN = 64
+DEFAULT_PACK_PATH = "img/templates.pack"
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def build_pack(root: str = "img", output: str = DEFAULT_PACK_PATH) -> int:
+    """root 아래 템플릿을 모두 읽어 팩 파일을 만듭니다. 저장한 템플릿 수를 반환합니다."""
+    # 저장소 키는 root 폴더 이름부터 시작 (예: img/gt/gt1.png)
+    root = os.path.abspath(root)
+    key_base = os.path.dirname(root)
+
+    templates: List[Template] = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.lower().endswith(TEMPLATE_EXTENSIONS):
+                continue
+            full_path = os.path.join(dirpath, filename)
+            key = normalize_path(os.path.relpath(full_path, key_base))
+            templates.append(make_template(
+                key, decode_image(full_path), os.path.getmtime(full_path),
+                os.path.getsize(full_path), file_digest(full_path),
+            ))
+    templates.sort(key=lambda template: natural_key(template.path))
+
+    # 헤더 길이를 알아야 데이터 시작 위치를 정할 수 있으므로 상대 오프셋으로 먼저 배치
+    entries = []
+    offset = 0
+    for template in templates:
+        color_offset = _aligned(offset)
+        gray_offset = _aligned(color_offset + template.color.nbytes)
+        offset = gray_offset + template.gray.nbytes
+        entries.append({
+            "path": template.path,
+            "height": template.height,
+            "width": template.width,
+            "mtime": template.mtime,
+            "size": template.size,
+            "digest": template.digest,
+            "color": color_offset,
+            "gray": gray_offset,
+        })
+
+    header = json.dumps({"version": 1, "templates": entries}, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    with open(output, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for template, entry in zip(templates, entries):
+            f.seek(data_start + entry["color"])
+            f.write(template.color.tobytes())
+            f.seek(data_start + entry["gray"])
+            f.write(template.gray.tobytes())
+
+    print(f"템플릿 팩 생성: {output} ({len(templates)}개, {os.path.getsize(output) // 1024}KB)")
+    return len(templates)
+
+
+def load_pack(path: str = DEFAULT_PACK_PATH) -> Dict[str, Template]:
+    """팩 파일을 mmap으로 한 번 열어 템플릿 뷰를 반환합니다."""
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+
+    if bytes(mm[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"템플릿 팩 형식이 아닙니다: {path}")
+    (header_len,) = struct.unpack("<I", bytes(mm[len(MAGIC):len(MAGIC) + 4]))
+    header_start = len(MAGIC) + 4
+    header = json.loads(bytes(mm[header_start:header_start + header_len]).decode("utf-8"))
+    data_start = _aligned(header_start + header_len)
+
+    templates: Dict[str, Template] = {}
+    for entry in header["templates"]:
+        height, width = entry["height"], entry["width"]
+        color_start = data_start + entry["color"]
+        gray_start = data_start + entry["gray"]
+        color = mm[color_start:color_start + height * width * 3].reshape(height, width, 3)
+        gray = mm[gray_start:gray_start + height * width].reshape(height, width)
+        templates[entry["path"]] = Template(
+            entry["path"], color, gray, width, height, entry["mtime"],
+            entry.get("size", 0), entry.get("digest", ""),
+        )
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="템플릿 팩 빌드")
+    parser.add_argument("--root", default="img", help="템플릿 폴더")
+    parser.add_argument("--output", default=DEFAULT_PACK_PATH, help="출력 파일")
+    args = parser.parse_args()
+    build_pack(args.root, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+템플릿 적중 통계
+- 템플릿별로 감쇠 적중 수(반감기)와 마지막 적중 시각을 기록
+- 매 틱 최근에 자주 맞은 템플릿부터 검색하도록 순서를 정함
+- 양성/음성 틱마다 검사한 템플릿 수의 평균을 진단 정보로 제공
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass
+class TemplateHit:
+    """템플릿 한 개의 적중 기록"""
+
+    score: float = 0.0  # 감쇠 적중 수 (last_hit 시점 기준)
+    last_hit: float = 0.0  # time.monotonic() 기준
+    hits: int = 0  # 전체 적중 수
+
+
+class TemplateHitStats:
+    """적중 빈도 기반 템플릿 검색 순서"""
+
+    def __init__(self, half_life: float = 600.0, ema_alpha: float = 0.1):
+        self.half_life = half_life  # 감쇠 반감기 (초)
+        self.ema_alpha = ema_alpha
+
+        self._lock = threading.Lock()
+        self._hits: Dict[str, TemplateHit] = {}
+
+        # 진단 정보
+        self.ticks = 0
+        self.positive_ticks = 0
+        self.evaluated_ema: Optional[float] = None  # 양성 틱당 검사 템플릿 수 (적응 순서)
+        self.baseline_ema: Optional[float] = None  # 같은 틱을 고정 순서로 검사했을 때의 수
+        self.negative_ema: Optional[float] = None  # 음성 틱당 검사 템플릿 수
+
+    def _decayed(self, hit: TemplateHit, now: float) -> float:
+        return hit.score * 0.5 ** ((now - hit.last_hit) / self.half_life)
+
+    def order(self, template_paths: Sequence[str]) -> List[str]:
+        """감쇠 적중 수가 높은 순, 같으면 최근 적중 순, 그 외에는 원래 순서"""
+        now = time.monotonic()
+        with self._lock:
+            keys = {}
+            for index, path in enumerate(template_paths):
+                hit = self._hits.get(path)
+                if hit is None:
+                    keys[path] = (0.0, 0.0, index)
+                else:
+                    keys[path] = (-self._decayed(hit, now), -hit.last_hit, index)
+        return sorted(template_paths, key=keys.__getitem__)
+
+    def record(
+        self,
+        template_paths: Sequence[str],
+        ordered_paths: Sequence[str],
+        matched_path: Optional[str],
+        evaluated: Optional[int] = None
+    ):
+        """
+        한 틱의 결과를 기록합니다.
+        template_paths는 원래 순서, ordered_paths는 이번 틱에 실제로 검색한 순서입니다.
+        evaluated는 실제로 점수를 계산한 템플릿 수 (없으면 검색 순서로 계산)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.ticks += 1
+            if matched_path is None:
+                self.negative_ema = self._ema(
+                    self.negative_ema, len(ordered_paths) if evaluated is None else evaluated
+                )
+                return
+
+            self.positive_ticks += 1
+            hit = self._hits.setdefault(matched_path, TemplateHit())
+            hit.score = self._decayed(hit, now) + 1.0
+            hit.last_hit = now
+            hit.hits += 1
+
+            if evaluated is None:
+                evaluated = ordered_paths.index(matched_path) + 1
+            baseline = list(template_paths).index(matched_path) + 1
+            self.evaluated_ema = self._ema(self.evaluated_ema, evaluated)
+            self.baseline_ema = self._ema(self.baseline_ema, baseline)
+
+    def _ema(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return float(value)
+        return current + self.ema_alpha * (value - current)
+
+    def reset(self):
+        """기록을 모두 지웁니다."""
+        with self._lock:
+            self._hits.clear()
+            self.ticks = 0
+            self.positive_ticks = 0
+            self.evaluated_ema = None
+            self.baseline_ema = None
+            self.negative_ema = None
+
+    def diagnostics(self, top: int = 5) -> Dict[str, object]:
+        """진단 정보 (틱 수, 양성/음성 틱당 검사 템플릿 수, 상위 템플릿)"""
+        now = time.monotonic()
+        with self._lock:
+            ranked = sorted(self._hits.items(), key=lambda item: -self._decayed(item[1], now))
+            return {
+                "ticks": self.ticks,
+                "positive_ticks": self.positive_ticks,
+                "evaluated_per_positive_tick": self.evaluated_ema,
+                "fixed_order_per_positive_tick": self.baseline_ema,
+                "evaluated_per_negative_tick": self.negative_ema,
+                "top_templates": [
+                    {
+                        "path": path,
+                        "score": round(self._decayed(hit, now), 3),
+                        "hits": hit.hits,
+                        "seconds_since_hit": round(now - hit.last_hit, 1),
+                    }
+                    for path, hit in ranked[:top]
+                ],
+            }
@@ -0,0 +1,53 @@
+"""
+리치 자동클릭 시퀀스 단계표 테스트
+- 설정 파일 단계표 변환과 잘못되었거나 빈 단계표의 기본 시퀀스 대체
+- 조건과 대상이 같은 이미지면 조회 한 개로 컴파일
+"""
+import pytest
+
+from click_sequence import DEFAULT_SEQUENCE, SURAK, Lookup, SequenceStep, compile_sequence, parse_sequence
+
+
+def test_parse_sequence_converts_each_step_kind():
+    steps = parse_sequence([
+        {"watch": "img/hunt.png", "until": "gone", "target": "img/malon.png", "action": "double_click"},
+        {"once": "img/filter.png", "delay_ticks": 2, "message": "필터 클릭"},
+        {"wait": 3, "notify": True},
+    ])
+    assert steps == [
+        SequenceStep("until", "img/hunt.png", "gone", "img/malon.png", "double_click"),
+        SequenceStep("once", target="img/filter.png", delay_ticks=2, message="필터 클릭"),
+        SequenceStep("wait", seconds=3, notify=True),
+    ]
+    assert steps[1].done_message() == "필터 클릭"
+    assert steps[2].done_message() == "3초 대기 완료"
+
+
+@pytest.mark.parametrize("items", [
+    None,
+    [],
+    [{"wait": 3}, {"wait": 0}],  # 대기 시간 0
+    [{"once": "img/a.png", "action": "drag"}],  # 알 수 없는 동작
+    [{"watch": "img/a.png", "until": "soon", "target": "img/b.png"}],
+    [{"target": "img/b.png"}],  # until 단계에 watch 없음
+    [{"wait": "세 초"}],
+    ["img/a.png"],  # 사전이 아닌 항목
+])
+def test_parse_sequence_falls_back_to_default(items):
+    assert parse_sequence(items) == list(DEFAULT_SEQUENCE)
+
+
+def test_compile_shares_lookup_when_watch_is_target():
+    def resolve(name):
+        return Lookup(name, (name,), (0, 0, 10, 10))
+
+    compiled = compile_sequence(DEFAULT_SEQUENCE, resolve)
+    assert [step.number for step in compiled] == list(range(1, len(DEFAULT_SEQUENCE) + 1))
+
+    surak = compiled[0]
+    assert surak.watch is surak.target
+    assert surak.watch.key == SURAK
+    assert surak.lookups == (surak.watch,)
+    assert [lookup.key for lookup in compiled[1].lookups] == ["img/hunt.png", "img/malon.png"]
+    # 같은 이름은 단계가 달라도 같은 조회
+    assert compiled[1].target is compiled[4].target
@@ -0,0 +1,80 @@
+"""
+색 규칙 엔진 테스트
+- 룩업 테이블 분류기 결과가 규칙마다 직접 비교한 결과와 같은지 (RGB 범위 / 허용오차 / 0을 넘어가는 HSV 범위)
+- 규칙 이름으로 일부 규칙만 고른 마스크와 규칙별 개수
+"""
+import cv2
+import numpy as np
+import pytest
+
+from color_rules import RED_RULE, ColorClassifier, ColorRule, get_classifier, parse_color_rules
+
+RULES = [
+    RED_RULE,
+    ColorRule.tolerance("gold", (230, 180, 40), 30),
+    ColorRule.hsv_range("hsv_red", (170, 120, 80), (10, 255, 255)),  # H가 0을 넘어가는 범위
+    ColorRule.hsv_range("green", (45, 80, 80), (75, 255, 255)),
+]
+
+
+def reference_mask(frame: np.ndarray, rule: ColorRule) -> np.ndarray:
+    """규칙 한 개를 픽셀마다 직접 비교한 마스크"""
+    values = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV) if rule.space == "hsv" else frame
+    lower = np.array(rule.lower)
+    upper = np.array(rule.upper)
+    inside = (values >= lower) & (values <= upper)
+    if rule.space == "hsv" and rule.lower[0] > rule.upper[0]:
+        inside[:, :, 0] = (values[:, :, 0] >= rule.lower[0]) | (values[:, :, 0] <= rule.upper[0])
+    return inside.all(axis=2)
+
+
+@pytest.fixture
+def frame():
+    """규칙에 맞는 색이 충분히 섞이도록 기준색 주변 값을 섞은 무작위 프레임"""
+    rng = np.random.default_rng(3)
+    frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    palette = np.array([(230, 20, 20), (230, 180, 40), (200, 30, 60), (40, 200, 60)], dtype=np.int16)
+    picks = palette[rng.integers(0, len(palette), (60, 160))] + rng.integers(-40, 41, (60, 160, 3))
+    frame[:60] = np.clip(picks, 0, 255).astype(np.uint8)
+    return frame
+
+
+def test_lut_matches_per_rule_reference(frame):
+    classifier = ColorClassifier(RULES)
+    expected = {rule.name: reference_mask(frame, rule) for rule in RULES}
+    assert all(mask.any() for mask in expected.values())
+
+    out = np.empty(frame.shape[:2], dtype=bool)
+    np.testing.assert_array_equal(classifier.mask(frame, out), np.logical_or.reduce(list(expected.values())))
+    for rule in RULES:
+        np.testing.assert_array_equal(classifier.mask(frame, out, [rule.name]), expected[rule.name], rule.name)
+    assert classifier.counts(frame) == {name: int(mask.sum()) for name, mask in expected.items()}
+
+
+def test_rule_subset_and_shared_classifier(frame):
+    classifier = get_classifier(RULES)
+    assert get_classifier(list(RULES)) is classifier
+
+    out = np.empty(frame.shape[:2], dtype=bool)
+    expected = reference_mask(frame, RULES[1]) | reference_mask(frame, RULES[3])
+    np.testing.assert_array_equal(classifier.mask(frame, out, ["gold", "green"]), expected)
+    assert not classifier.mask(frame, out, ["없는 규칙"]).any()
+
+
+def test_parse_color_rules_skips_invalid_items():
+    rules = parse_color_rules([
+        {"name": "a", "rgb": [[200, 0, 0], [255, 50, 50]]},
+        {"name": "b", "color": [10, 20, 30], "tolerance": 5},
+        {"name": "c", "hsv": [[170, 100, 100], [10, 255, 255]]},
+        {"name": "bad"},
+    ])
+    assert [rule.name for rule in rules] == ["a", "b", "c"]
+    assert rules[1] == ColorRule("b", "rgb", (5, 15, 25), (15, 25, 35))
+    assert rules[2].space == "hsv"
+
+
+def test_classifier_rejects_too_many_rules():
+    with pytest.raises(ValueError):
+        ColorClassifier([])
+    with pytest.raises(ValueError):
+        ColorClassifier([ColorRule.tolerance(f"r{i}", (i, i, i), 1) for i in range(9)])
@@ -0,0 +1,46 @@
+"""
+상태 전환 디바운스 테스트
+- 들어가기 / 나가기 N-of-M 규칙과 min_ms 유지 시간
+- reset(True)로 시작한 필터는 규칙을 바꿔도 발견 상태를 유지
+"""
+from debounce import DEFAULT_ENTER, DEFAULT_EXIT, DebounceRule, HysteresisFilter
+
+
+def run(debounce: HysteresisFilter, observations, step: float = 0.1):
+    """0.1초 간격 관측 결과 목록"""
+    return [debounce.update(observed, index * step) for index, observed in enumerate(observations)]
+
+
+def test_default_rules_enter_immediately_and_exit_after_five_misses():
+    debounce = HysteresisFilter(DEFAULT_ENTER, DEFAULT_EXIT)
+    states = run(debounce, [True, False, False, False, False, True, False, False, False, False, False])
+    assert states == [True, True, True, True, True, True, True, True, True, True, False]
+
+
+def test_n_of_m_ignores_single_flicker():
+    debounce = HysteresisFilter(DebounceRule(hits=2, window=3), DebounceRule(hits=3, window=3))
+    # 한 번 깜빡임은 무시, 최근 3번 중 2번이면 발견
+    assert run(debounce, [True, False, False, True, False, True]) == [False, False, False, False, False, True]
+    # 사라짐은 최근 3번 모두 없어야 함
+    assert [debounce.update(observed) for observed in (False, False, True, False, False, False)] == [
+        True, True, True, True, True, False
+    ]
+
+
+def test_min_ms_requires_continuous_observation():
+    debounce = HysteresisFilter(DebounceRule(hits=1, window=1, min_ms=250), DEFAULT_EXIT)
+    # 0.1초 간격: 0.0, 0.1, 0.2초는 250ms 미만, 중간에 끊기면 다시 처음부터
+    assert run(debounce, [True, True, True, False, True, True, True, True]) == [
+        False, False, False, False, False, False, False, True
+    ]
+
+
+def test_reset_with_state_keeps_found_until_exit_rule():
+    debounce = HysteresisFilter(DEFAULT_ENTER, DebounceRule(hits=3, window=3))
+    debounce.reset(True)
+    assert debounce.state
+    assert [debounce.update(observed) for observed in (True, False, False, False)] == [True, True, True, False]
+
+    debounce.reset()
+    assert not debounce.state
+    assert debounce.update(True)
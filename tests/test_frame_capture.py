@@ -0,0 +1,119 @@
+"""
+공용 화면 캡처 서비스 테스트 (캡처한 구역을 기록하는 가짜 백엔드 사용)
+- 새로 캡처할 때 곧 요청할 구독자의 구역만 합쳐서 캡처
+- 구독자별 max_age 안의 캡처는 다시 캡처하지 않고 재사용
+- 구독자가 빌린 프레임의 버퍼는 반납 전까지 덮어쓰지 않음
+"""
+import time
+
+import numpy as np
+
+from capture_backends import CaptureBackend
+from frame_capture import FrameCaptureService, union_region
+
+
+class CountingBackend(CaptureBackend):
+    """캡처할 때마다 전체를 캡처 번호로 채우는 백엔드"""
+
+    name = "counting"
+    in_place = True
+
+    def __init__(self):
+        self.regions = []
+
+    def grab(self, region):
+        return self.grab_into(region, np.empty((region[3] - region[1], region[2] - region[0], 3), dtype=np.uint8))
+
+    def grab_into(self, region, out):
+        self.regions.append(region)
+        out.fill(len(self.regions))
+        return out
+
+
+SMALL = (0, 0, 40, 30)
+LARGE = (20, 10, 200, 150)
+
+
+def test_new_grab_covers_only_subscribers_due_soon():
+    backend = CountingBackend()
+    service = FrameCaptureService(backend)
+    service.subscribe("small", SMALL, 100, max_age_ms=0)
+    service.subscribe("large", LARGE, 60000, max_age_ms=1000)
+
+    # 아직 요청한 적 없는 large도 곧 요청한다고 보고 함께 캡처
+    small = service.get_frame("small")
+    assert backend.regions == [union_region([SMALL, LARGE])]
+    assert small.region == SMALL and small.image.shape == (30, 40, 3)
+
+    # large는 방금 캡처한 프레임을 재사용
+    large = service.get_frame("large")
+    assert len(backend.regions) == 1
+    assert large.image.shape == (140, 180, 3)
+    assert large.timestamp == small.timestamp
+
+    # large의 다음 요청은 1분 뒤이므로 small 구역만 캡처
+    time.sleep(0.01)
+    service.get_frame("small")
+    assert backend.regions[1:] == [SMALL]
+    assert service.stats()["grabs"] == 2
+    assert service.stats()["requests"] == 3
+
+
+def test_frames_reused_within_max_age():
+    backend = CountingBackend()
+    service = FrameCaptureService(backend)
+    service.subscribe("fresh", SMALL, 100, max_age_ms=0)
+    service.subscribe("lazy", SMALL, 100, max_age_ms=5000)
+
+    first = service.get_frame("lazy")
+    assert service.get_frame("lazy").timestamp == first.timestamp
+    assert len(backend.regions) == 1
+
+    time.sleep(0.01)
+    fresh = service.get_frame("fresh")
+    assert fresh.timestamp > first.timestamp
+    assert len(backend.regions) == 2
+    # 새 캡처가 lazy에게도 충분히 새로우므로 가장 최근 캡처를 받음
+    assert service.get_frame("lazy").timestamp == fresh.timestamp
+
+
+def test_leased_frames_are_not_overwritten():
+    backend = CountingBackend()
+    service = FrameCaptureService(backend, pool_size=2)
+    service.subscribe("a", SMALL, 100, max_age_ms=0)
+    service.subscribe("b", SMALL, 100, max_age_ms=0)
+
+    held = service.get_frame("a")
+    for _ in range(5):
+        time.sleep(0.002)
+        service.get_frame("b")
+    # a가 빌린 프레임은 다른 구독자의 캡처에 쓰이지 않음
+    assert int(held.image[0, 0, 0]) == 1
+
+    # 반납한 버퍼는 다음 캡처에 다시 쓰임 (풀 밖 할당 없이 두 버퍼로 순환)
+    service.release("a", held)
+    buffers = set()
+    for _ in range(6):
+        time.sleep(0.002)
+        frame = service.get_frame("b")
+        buffers.add(id(frame.image.base))
+        service.release("b", frame)
+    assert len(buffers) <= 2
+
+
+def test_release_ignores_stale_frame():
+    service = FrameCaptureService(CountingBackend(), pool_size=1)
+    service.subscribe("a", SMALL, 100, max_age_ms=0)
+
+    old = service.get_frame("a")
+    service.release("a", old)
+    time.sleep(0.002)
+    new = service.get_frame("a")
+    assert new.image.base is old.image.base  # 반납한 버퍼를 재사용
+
+    # 이전 틱이 늦게 다시 반납해도 지금 빌린 프레임은 그대로 보호됨
+    service.release("a", old)
+    time.sleep(0.002)
+    service.subscribe("b", SMALL, 100, max_age_ms=0)
+    service.get_frame("b")
+    assert int(new.image[0, 0, 0]) == 2
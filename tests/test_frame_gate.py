@@ -0,0 +1,100 @@
+"""
+프레임 변화 게이트 테스트
+- 허용 오차 이하의 변화는 무시하지만 누적되면 감지
+- 달라진 타일을 템플릿 크기만큼 넓힌 영역만 다시 매칭
+- 기준 프레임은 달라진 타일만 갱신
+"""
+import numpy as np
+
+from frame_gate import ChangeGate, GateDecision
+from template_matcher import MatchResult
+
+REGION = (100, 200, 260, 328)  # 160 × 128, 32px 타일 5 × 4
+MARGIN = (20, 10)
+
+
+def blank() -> np.ndarray:
+    return np.full((REGION[3] - REGION[1], REGION[2] - REGION[0], 3), 100, dtype=np.uint8)
+
+
+def test_first_frame_and_unchanged_frame():
+    gate = ChangeGate(tile=32, tolerance=8)
+    assert gate.check(blank(), REGION, MARGIN) == GateDecision(True, None)
+    assert gate.check(blank(), REGION, MARGIN) == GateDecision(False, None)
+
+
+def test_small_changes_within_tolerance_accumulate():
+    gate = ChangeGate(tile=32, tolerance=8)
+    gate.check(blank(), REGION, MARGIN)
+
+    frame = blank()
+    frame[5, 5] += 5
+    assert not gate.check(frame, REGION, MARGIN).changed
+    # 기준 프레임이 그대로이므로 같은 픽셀이 조금 더 바뀌면 누적 변화(10)로 감지
+    frame[5, 5] += 5
+    assert gate.check(frame, REGION, MARGIN) == GateDecision(True, (100, 200, 152, 242))
+
+
+def test_dirty_region_covers_changed_tiles_plus_margin():
+    gate = ChangeGate(tile=32, tolerance=8)
+    gate.check(blank(), REGION, MARGIN)
+
+    frame = blank()
+    frame[40, 70] = 255  # 타일 (행 1, 열 2)
+    decision = gate.check(frame, REGION, MARGIN)
+    assert decision == GateDecision(True, (100 + 64 - 20, 200 + 32 - 10, 100 + 96 + 20, 200 + 64 + 10))
+
+    # 양 끝 타일이 바뀌면 전체 구역
+    frame[0, 0] = 0
+    frame[-1, -1] = 0
+    assert gate.check(frame, REGION, MARGIN) == GateDecision(True, None)
+
+
+def test_reference_updates_only_changed_tiles():
+    gate = ChangeGate(tile=32, tolerance=8)
+    gate.check(blank(), REGION, MARGIN)
+
+    frame = blank()
+    frame[40, 70] = 255  # 변화로 감지되는 타일
+    frame[100, 10] = 105  # 허용 오차 이하 (다른 타일)
+    assert gate.check(frame, REGION, MARGIN).changed
+
+    # 감지된 타일은 반영되어 다시 보면 변화 없음, 작은 변화는 기준에 반영되지 않아 계속 누적
+    assert not gate.check(frame, REGION, MARGIN).changed
+    frame[100, 10] = 110
+    assert gate.check(frame, REGION, MARGIN) == GateDecision(True, (100, 200 + 96 - 10, 100 + 32 + 20, 328))
+
+
+def test_search_matches_only_dirty_region_when_nothing_was_found():
+    gate = ChangeGate(tile=32, tolerance=8)
+    calls = []
+
+    def find(frame, region):
+        calls.append((region, frame.shape[:2]))
+        return None
+
+    gate.search(blank(), REGION, MARGIN, find)
+    frame = blank()
+    frame[40, 70] = 255
+    gate.search(frame, REGION, MARGIN, find)
+    assert calls == [(REGION, (128, 160)), ((144, 222, 216, 274), (52, 72))]
+    assert gate.stats()["partial"] == 1
+
+
+def test_search_keeps_previous_match_outside_dirty_region():
+    gate = ChangeGate(tile=32, tolerance=8)
+    match = MatchResult("img/a.png", (110, 210, 120, 220), 0.9)
+    calls = []
+
+    def find(frame, region):
+        calls.append(region)
+        return match
+
+    assert gate.search(blank(), REGION, MARGIN, find) is match
+    frame = blank()
+    frame[120, 150] = 0  # 오른쪽 아래 타일 (이전 매칭과 겹치지 않음)
+    assert gate.search(frame, REGION, MARGIN, find) is match
+    frame[10, 10] = 0  # 이전 매칭과 겹치는 타일 → 전체 구역 다시 매칭
+    assert gate.search(frame, REGION, MARGIN, find) is match
+    assert calls == [REGION, REGION]
+    assert gate.stats()["skipped"] == 1
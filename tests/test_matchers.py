@@ -0,0 +1,131 @@
+"""
+매칭 엔진 결과 일치 테스트
+- spatial / pyramid / fft 엔진과 순차 / 병렬 / 클러스터 검색이 같은 템플릿과 위치를 보고하는지 확인
+- 템플릿은 임시 폴더의 img/에 만든 블록 무늬 이미지 (축소해도 무늬가 남도록 4px 블록)
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from template_bank import TemplateBank
+from template_clusters import TemplateClusterIndex
+from template_matcher import MATCHING_ENGINES, create_matcher
+
+REGION = (100, 50, 500, 350)  # (x1, y1, x2, y2) 화면 좌표
+CONFIDENCE = 0.8
+SIZES = [(40, 24), (56, 32), (64, 40), (48, 48), (72, 28)]  # (너비, 높이)
+
+
+def blocks(rng: np.random.Generator, width: int, height: int, block: int = 4) -> np.ndarray:
+    """block px 단위 무작위 색 블록 이미지 (RGB)"""
+    small = rng.integers(0, 256, (-(-height // block), -(-width // block), 3), dtype=np.uint8)
+    return np.kron(small, np.ones((block, block, 1), dtype=np.uint8))[:height, :width]
+
+
+def write_png(path, image: np.ndarray):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ok, data = cv2.imencode(".png", cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+    assert ok
+    data.tofile(str(path))
+
+
+@pytest.fixture
+def bank(tmp_path, monkeypatch):
+    """임시 폴더의 img/t1~t5 (서로 다른 무늬와 크기) + img/big (img/part를 포함하는 큰 템플릿)"""
+    rng = np.random.default_rng(7)
+    for index, (width, height) in enumerate(SIZES, start=1):
+        write_png(tmp_path / "img" / f"t{index}.png", blocks(rng, width, height))
+
+    big = blocks(rng, 96, 44)
+    write_png(tmp_path / "img" / "big.png", big)
+    write_png(tmp_path / "img" / "part.png", big[4:36, 8:56])
+
+    # resource_path가 현재 폴더 기준이므로 임시 폴더에서 실행
+    monkeypatch.chdir(tmp_path)
+    return TemplateBank()
+
+
+def make_frame(image=None, at=(0, 0)) -> np.ndarray:
+    """REGION 크기의 배경 프레임에 image를 (x, y) 위치에 심음"""
+    x1, y1, x2, y2 = REGION
+    frame = blocks(np.random.default_rng(11), x2 - x1, y2 - y1, block=8)
+    if image is not None:
+        x, y = at
+        frame[y:y + image.shape[0], x:x + image.shape[1]] = image
+    return frame
+
+
+def search_all(bank: TemplateBank, frame: np.ndarray, paths):
+    """모든 엔진 × (순차, 병렬, 클러스터, 클러스터 + 병렬) 결과 {이름: MatchResult}"""
+    clusters = TemplateClusterIndex(bank).ordered(paths)
+    results = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for engine in MATCHING_ENGINES:
+            matcher = create_matcher(engine, bank=bank)
+            results[engine] = matcher.find_first(frame, REGION, paths, CONFIDENCE)
+            results[f"{engine}/parallel"] = matcher.find_first_parallel(frame, REGION, paths, CONFIDENCE, executor)
+            results[f"{engine}/clustered"] = matcher.find_first_clustered(frame, REGION, clusters, CONFIDENCE)
+            results[f"{engine}/clustered+parallel"] = matcher.find_first_clustered(
+                frame, REGION, clusters, CONFIDENCE, executor=executor
+            )
+    return results
+
+
+@pytest.mark.parametrize("index", range(1, len(SIZES) + 1))
+def test_engines_agree_on_planted_template(bank, index):
+    paths = [f"img/t{i}.png" for i in range(1, len(SIZES) + 1)]
+    template = bank.get(f"img/t{index}.png")
+    at = (123, 77)
+    frame = make_frame(template.color, at)
+
+    expected_box = (REGION[0] + at[0], REGION[1] + at[1],
+                    REGION[0] + at[0] + template.width, REGION[1] + at[1] + template.height)
+    for name, result in search_all(bank, frame, paths).items():
+        assert result is not None, name
+        assert result.template_path == template.path, name
+        assert result.box == expected_box, name
+        assert result.score == pytest.approx(1.0, abs=1e-3), name
+
+
+def test_engines_agree_on_empty_frame(bank):
+    paths = [f"img/t{i}.png" for i in range(1, len(SIZES) + 1)]
+    for name, result in search_all(bank, make_frame(), paths).items():
+        assert result is None, name
+
+
+def test_engines_ignore_partial_match_at_region_edge(bank):
+    """구역 밖으로 걸친 템플릿은 어느 엔진도 보고하지 않음"""
+    template = bank.get("img/t3.png")
+    x1, y1, x2, y2 = REGION
+    frame = make_frame()
+    frame[-template.height // 2:, 10:10 + template.width] = template.color[:template.height // 2]
+
+    for name, result in search_all(bank, frame, ["img/t3.png"]).items():
+        assert result is None, name
+
+
+def test_clustered_search_reports_member_on_screen(bank):
+    """대표(part)가 큰 멤버(big)의 일부일 때 화면에 있는 big을 보고"""
+    paths = ["img/part.png", "img/big.png", "img/t1.png"]
+    clusters = TemplateClusterIndex(bank).ordered(paths)
+    assert any(set(cluster.members) == {"img/part.png", "img/big.png"} for cluster in clusters)
+
+    big = bank.get("img/big.png")
+    frame = make_frame(big.color, (200, 150))
+    for name, result in search_all(bank, frame, paths).items():
+        if "clustered" in name:
+            assert result is not None, name
+            assert result.template_path == "img/big.png", name
+            assert result.box == (300, 200, 300 + big.width, 200 + big.height), name
+
+
+def test_clustered_search_reports_representative_alone(bank):
+    """대표만 화면에 있으면 대표를 보고"""
+    paths = ["img/part.png", "img/big.png"]
+    part = bank.get("img/part.png")
+    frame = make_frame(part.color, (40, 60))
+    for name, result in search_all(bank, frame, paths).items():
+        assert result is not None, name
+        assert result.template_path == "img/part.png", name
@@ -0,0 +1,128 @@
+"""
+알림 서비스 테스트 (로컬 Bot API 대역 서버 mock_bot_api 사용)
+- 재시작 후 발송함에 남은 알림을 순서대로 전송
+- 429(RetryAfter)를 받으면 retry_after만큼 기다렸다가 다시 전송
+- 같은 state_key의 대기 중인 메시지 대체 / 반대 상태면 둘 다 취소
+"""
+import socket
+import time
+
+import pytest
+from PIL import Image
+
+from alert_outbox import AlertOutbox
+from notifier import NotificationService
+from notify_backends import TelegramBackend, create_notifier_backend
+
+TOKEN = "123456:TEST"
+CHAT_ID = "42"
+
+
+def wait_until(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def received_lines(server):
+    """대역 서버가 받은 텍스트 (합쳐진 메시지는 줄 단위로 나눔)"""
+    return [line for message in server.received for line in message.text.split("\n")]
+
+
+def outbox_count(path: str) -> int:
+    outbox = AlertOutbox(path)
+    try:
+        return outbox.count()
+    finally:
+        outbox.close()
+
+
+def unused_base_url() -> str:
+    """연결을 거부하는 주소 (오프라인 상태)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/bot"
+
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return str(tmp_path / "alert_outbox.db")
+
+
+@pytest.fixture
+def services():
+    """테스트가 만든 서비스는 끝날 때 모두 종료"""
+    created = []
+    yield created
+    for service in created:
+        service.shutdown(timeout=1.0)
+
+
+def test_outbox_replays_in_order_after_restart(outbox_path, services):
+    offline = NotificationService(
+        TelegramBackend(unused_base_url()), coalesce_window=0, backoff_base=0.05, backoff_max=0.2,
+        outbox_path=outbox_path,
+    )
+    services.append(offline)
+    for text in ("첫째", "둘째", "셋째"):
+        offline.send_message(TOKEN, CHAT_ID, text)
+    assert wait_until(lambda: offline.retried >= 2)
+    offline.shutdown(timeout=0.1)
+
+    assert outbox_count(outbox_path) == 3
+
+    backend = create_notifier_backend("mock")
+    online = NotificationService(backend, coalesce_window=0, outbox_path=outbox_path)
+    services.append(online)
+    online.start()
+
+    assert wait_until(lambda: len(received_lines(backend.server)) == 3)
+    assert received_lines(backend.server) == ["첫째", "둘째", "셋째"]
+    assert online.flush(timeout=5.0)
+    assert wait_until(lambda: outbox_count(outbox_path) == 0)
+
+
+def test_retry_after_waits_before_resending(outbox_path, services):
+    backend = create_notifier_backend("mock", rate_429=1.0, retry_after=1)
+    server = backend.server
+    service = NotificationService(backend, coalesce_window=0, outbox_path=outbox_path)
+    services.append(service)
+
+    service.send_message(TOKEN, CHAT_ID, "제한 확인")
+    assert wait_until(lambda: server.rejected >= 1)
+    rejected_at = time.monotonic()
+    server.rate_429 = 0.0
+
+    assert wait_until(lambda: len(server.received) == 1)
+    assert server.received[0].received - rejected_at >= 0.9  # retry_after(1초)만큼 기다림
+    assert server.rejected == 1
+    assert service.retried == 1
+    assert service.dropped == 0
+
+
+def test_state_key_supersedes_pending_messages(outbox_path, services):
+    backend = create_notifier_backend("mock")
+    server = backend.server
+    # 초당 2개, 연속 1개: 첫 메시지를 보낸 뒤 0.5초 동안 나머지는 대기 중
+    service = NotificationService(backend, coalesce_window=0, rate=2.0, burst=1, outbox_path=outbox_path)
+    services.append(service)
+
+    service.send_message(TOKEN, CHAT_ID, "시작")
+    assert wait_until(lambda: len(server.received) == 1)
+
+    # 같은 상태: 나중 메시지만 남음
+    service.send_message(TOKEN, CHAT_ID, "발견 1", "user:구역1", "found")
+    service.send_message(TOKEN, CHAT_ID, "발견 2", "user:구역1", "found")
+    # 반대 상태: 사진(발견)과 사라짐 둘 다 취소
+    service.send_photo(TOKEN, CHAT_ID, Image.new("RGB", (32, 32)), "거탐 감지", state_key="image:gt", state="found")
+    service.send_message(TOKEN, CHAT_ID, "거탐 사라짐", "image:gt", "gone")
+    service.send_message(TOKEN, CHAT_ID, "끝")
+
+    assert service.flush(timeout=5.0)
+    assert received_lines(server) == ["시작", "발견 2", "끝"]
+    assert all(message.photo_bytes == 0 for message in server.received)
+    assert service.superseded == 3
@@ -0,0 +1,84 @@
+"""
+주기 실행 스레드
+- 감지기의 캡처/매칭 틱을 GUI 스레드(Qt 이벤트 루프) 밖에서 실행
+- 시작하자마자 첫 틱을 실행하고, 이후 틱 시작 시각 기준으로 interval_ms마다 실행 (밀린 틱은 건너뜀)
+- 간격은 실행 중에도 바꿀 수 있음 (다음 대기부터 적용)
+- stop()은 기다리지 않음: 진행 중인 틱이 끝나면 스레드가 종료되고 on_finished를 호출
+- 여러 스레드를 멈출 때는 모두 stop()한 뒤 join_all로 같은 마감 시각까지 함께 기다림
+- 결과는 감지기의 pyqtSignal로 전달 (GUI 스레드의 수신자에게는 대기열 연결로 전달됨)
+"""
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+
+class TickThread:
+    """interval_ms 간격으로 tick을 호출하는 데몬 스레드"""
+
+    def __init__(
+        self,
+        name: str,
+        interval_ms: int,
+        tick: Callable[[], None],
+        on_finished: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.interval_ms = interval_ms
+        self._tick = tick
+        self._on_finished = on_finished
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> "TickThread":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """중지를 요청합니다. (진행 중인 틱은 기다리지 않음)"""
+        self._stop_event.set()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """스레드가 끝날 때까지 기다리고, 끝났는지 반환합니다."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def set_interval(self, interval_ms: int):
+        """틱 간격을 바꿉니다. (다음 대기부터 적용)"""
+        self.interval_ms = interval_ms
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"[{self.name}] 틱 오류: {e}")
+
+            next_time += self.interval_ms / 1000.0
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            self._stop_event.wait(next_time - now)
+
+        if self._on_finished is not None:
+            try:
+                self._on_finished()
+            except Exception as e:
+                print(f"[{self.name}] 종료 처리 오류: {e}")
+
+
+def join_all(threads: Iterable[Optional[TickThread]], timeout: float) -> bool:
+    """
+    이미 중지를 요청한 스레드들을 timeout초 안에서 함께 기다립니다. (None은 건너뜀)
+    스레드마다 timeout을 따로 쓰지 않으므로 전체 대기는 timeout을 넘지 않습니다. 모두 끝났는지 반환합니다.
+    """
+    deadline = time.monotonic() + timeout
+    finished = True
+    for thread in threads:
+        if thread is not None:
+            finished = thread.join(max(0.0, deadline - time.monotonic())) and finished
+    return finished
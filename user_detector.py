@@ -1,12 +1,57 @@
-import asyncio
-import threading
 import time
-from queue import Empty, Queue
-from typing import Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
-from PIL import ImageGrab
+import cv2
+import numpy as np
 from PyQt5.QtCore import QObject, QTimer, pyqtSignal
-from telegram import Bot
+
+from capture_backends import CaptureBackend
+from color_rules import RED_RULE, ColorRule, get_classifier
+from debounce import DEFAULT_ENTER, DEFAULT_EXIT, DebounceRule, HysteresisFilter
+from frame_capture import FrameCaptureService, shared_capture_service, union_region
+from notifier import NotificationService, shared_notifier
+
+
+@dataclass
+class DetectionRegion:
+    """유저 탐지 구역 한 개 (구역마다 기준값, 알림 문구, 상태를 따로 가짐)"""
+
+    name: str
+    region: Tuple[int, int, int, int]  # (x1, y1, x2, y2)
+    threshold: int = 1  # 규칙에 맞는 픽셀이 이 수 이상이면 유저 있음
+    rules: Tuple[str, ...] = ()  # 사용할 색 규칙 이름 (비어 있으면 모든 규칙)
+    found_text: Optional[str] = None  # 없으면 "{닉네임} 유저 발견 ({name}) - N명", {nickname}/{name}/{count} 사용 가능
+    gone_text: Optional[str] = None  # 없으면 "{닉네임} 유저 사라짐 ({name})"
+    enter: Optional[DebounceRule] = None  # 없으면 UserDetector 공통 규칙
+    exit: Optional[DebounceRule] = None
+
+    # 상태
+    present: bool = False  # 디바운스된 상태 (알림 기준)
+    debounce: HysteresisFilter = field(default_factory=HysteresisFilter)
+    last_count: Optional[int] = None
+    dots: int = 0  # 서로 떨어진 빨간 점(유저) 수
+    centroids: Tuple[Tuple[int, int], ...] = ()  # 점 중심 (화면 좌표)
+
+
+def parse_detection_regions(items: List[dict]) -> List[DetectionRegion]:
+    """설정 파일의 detection_regions 목록을 DetectionRegion 목록으로 변환합니다."""
+    regions = []
+    for index, item in enumerate(items):
+        try:
+            regions.append(DetectionRegion(
+                name=str(item.get("name") or f"구역{index + 1}"),
+                region=tuple(int(v) for v in item["region"]),
+                threshold=int(item.get("threshold", 1)),
+                found_text=item.get("found_text"),
+                gone_text=item.get("gone_text"),
+                rules=tuple(item.get("rules", ())),
+                enter=DebounceRule.from_config(item["enter"], DEFAULT_ENTER) if item.get("enter") else None,
+                exit=DebounceRule.from_config(item["exit"], DEFAULT_EXIT) if item.get("exit") else None,
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"탐지 구역 설정 오류 ({index + 1}번째): {e}")
+    return regions
 
 
 class UserDetector(QObject):
@@ -15,7 +60,11 @@ class UserDetector(QObject):
     user_detected = pyqtSignal(str)  # 유저 발견
     user_disappeared = pyqtSignal(str)  # 유저 사라짐
 
-    def __init__(self):
+    def __init__(
+        self,
+        capture_backend: Optional[CaptureBackend] = None,
+        notifier: Optional[NotificationService] = None,
+    ):
         super().__init__()
         self.is_running = False
         self.timer = QTimer()
@@ -24,20 +73,38 @@ class UserDetector(QObject):
         self.check_interval = 200
 
         # 설정값
-        self.region: Optional[Tuple[int, int, int, int]] = None  # (x1, y1, x2, y2)
+        self.region: Optional[Tuple[int, int, int, int]] = None  # (x1, y1, x2, y2) 모든 구역을 감싸는 캡처 영역
+        self.regions: List[DetectionRegion] = []
         self.telegram_token: Optional[str] = None
         self.telegram_chat_id: Optional[str] = None
         self.user_nickname: str = "유저"
         self.red_threshold = 1
+        self.min_dot_area = 1  # 이보다 작은 빨간 덩어리는 점으로 세지 않음
+
+        # 상태 전환 디바운스 (기본: 발견은 즉시, 사라짐은 최근 5번 모두 없을 때)
+        self.debounce_enter = DEFAULT_ENTER
+        self.debounce_exit = DEFAULT_EXIT
+
+        # 픽셀 색 분류 (기본: 빨간색 r >= 200, g <= 50, b <= 50)
+        self.color_rules: List[ColorRule] = [RED_RULE]
+        self.classifier = get_classifier(self.color_rules)
+
+        # 공용 캡처 서비스 (캡처 백엔드를 따로 받으면 전용 서비스 사용)
+        if capture_backend is not None:
+            self.capture_service = FrameCaptureService(capture_backend)
+        else:
+            self.capture_service = shared_capture_service()
+        self.capture_name = "user_detector"
 
         # 상태
         self.user_present = False
         self.last_check_result: Optional[int] = None  # 이전 체크 결과 캐싱
 
-        # 텔레그램 전송 관리
-        self._send_queue: "Queue[str]" = Queue()
-        self._sender_thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        # 색 분류용 버퍼 (구역 크기별로 한 번만 할당)
+        self._masks: Dict[Tuple[int, int], np.ndarray] = {}
+
+        # 텔레그램 전송 (공용 알림 서비스)
+        self.notifier = notifier or shared_notifier()
 
     def set_config(
         self,
@@ -45,33 +112,90 @@ class UserDetector(QObject):
         telegram_token: str,
         telegram_chat_id: str,
         user_nickname: str,
+        regions: Optional[List[DetectionRegion]] = None,
     ):
-        """탐지 설정을 업데이트합니다."""
-        self.region = region
+        """
+        탐지 설정을 업데이트합니다.
+        regions가 없으면 region 한 개를 기존 방식(red_threshold, 기본 알림 문구)으로 사용합니다.
+        """
+        if not regions:
+            regions = [DetectionRegion("", tuple(region), self.red_threshold)]
+        previous, self.regions = self.regions, regions
+        self.region = union_region(r.region for r in regions)
+        self._build_debounce(previous)
         self.telegram_token = telegram_token
         self.telegram_chat_id = telegram_chat_id
         self.user_nickname = user_nickname
+        self._masks.clear()
+
+        if len(regions) > 1:
+            names = ", ".join(r.name for r in regions)
+            print(f"유저 탐지 구역 {len(regions)}개: {names} (캡처 영역 {self.region})")
+
+        if self.is_running:
+            self.capture_service.subscribe(self.capture_name, self.region, self.check_interval)
+
+    def set_debounce(self, enter: DebounceRule, exit: DebounceRule):
+        """상태 전환 규칙을 바꿉니다. (구역에 따로 지정된 규칙이 있으면 그 규칙 우선)"""
+        self.debounce_enter = enter
+        self.debounce_exit = exit
+        self._build_debounce()
+        print(
+            f"유저 탐지 디바운스: 발견 {enter.hits}/{enter.window}회 {enter.min_ms}ms, "
+            f"사라짐 {exit.hits}/{exit.window}회 {exit.min_ms}ms"
+        )
+
+    def _build_debounce(self, previous: Optional[List[DetectionRegion]] = None):
+        """
+        구역별 디바운스 필터를 새 규칙으로 다시 만듭니다.
+        같은 이름의 구역이 이미 발견 상태였으면 그 상태에서 시작해, 다음 프레임에 발견 알림을 다시 보내지 않습니다.
+        """
+        present = {detection.name: detection.present for detection in (previous if previous is not None else self.regions)}
+        for detection in self.regions:
+            detection.present = present.get(detection.name, False)
+            detection.debounce = HysteresisFilter(
+                detection.enter or self.debounce_enter,
+                detection.exit or self.debounce_exit,
+            )
+            detection.debounce.reset(detection.present)
+
+    def set_color_rules(self, rules: List[ColorRule]):
+        """픽셀 분류에 쓸 색 규칙을 바꿉니다. (비어 있으면 기본 빨간색 규칙)"""
+        rules = list(rules) or [RED_RULE]
+        try:
+            self.classifier = get_classifier(rules)
+            self.color_rules = rules
+            print(f"유저 탐지 색 규칙: {', '.join(rule.name for rule in rules)}")
+        except ValueError as e:
+            print(f"색 규칙 설정 실패: {e}")
 
     def start(self):
         """유저 탐색을 시작합니다."""
         if self.is_running or not self.region:
             return
 
-        # shutdown()으로 중지된 뒤 다시 시작될 때를 대비해 전송 워커 상태를 초기화
-        self._stop_event.clear()
-        self._ensure_sender_thread()
+        self.capture_service.subscribe(self.capture_name, self.region, self.check_interval)
 
         self.is_running = True
         self.user_present = False
         self.last_check_result = None
+        self._reset_region_states()
         self._check_region()
 
     def stop(self):
         """유저 탐색을 중지합니다."""
         self.is_running = False
         self.timer.stop()
+        self.capture_service.unsubscribe(self.capture_name)
         self.last_check_result = None
         self.user_present = False
+        self._reset_region_states()
+
+    def _reset_region_states(self):
+        for detection in self.regions:
+            detection.present = False
+            detection.last_count = None
+            detection.debounce.reset()
 
     def _check_region(self):
         """특정 구역에서 빨간색을 감지합니다."""
@@ -79,37 +203,39 @@ class UserDetector(QObject):
             return
 
         try:
-            # 화면 캡처
-            x1, y1, x2, y2 = self.region
-            screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
+            # 화면 캡처 (모든 구역을 감싸는 영역을 한 번만 받음)
+            captured = self.capture_service.get_frame(self.capture_name)
 
-            # 빨간색 픽셀 카운트
-            red_pixels = self._count_red_pixels_optimized(screenshot)
+            # 구역별 빨간색 픽셀 카운트 (다 센 뒤 프레임 버퍼를 캡처 서비스에 반납)
+            counts = self._count_regions(captured.image)
+            self.capture_service.release(self.capture_name, captured)
 
             # --- 중요 변경 ---
-            # 이전 결과와 같더라도 상태(user_present)가 다를 수 있으므로 단순히 return 하지 않음
-            state_changed = False
-
-            if red_pixels >= self.red_threshold:
-                if not self.user_present:
-                    self.user_present = True
-                    message = f"{self.user_nickname} 유저 발견"
-                    self.user_detected.emit(message)
-                    self._send_telegram_message(message)
-                    state_changed = True
-            else:
-                if self.user_present:
-                    self.user_present = False
-                    message = f"{self.user_nickname} 유저 사라짐"
-                    self.user_disappeared.emit(message)
-                    self._send_telegram_message(message)
-                    state_changed = True
-
-            # 이전 결과 갱신
-            self.last_check_result = red_pixels
+            # 이전 결과와 같더라도 상태(present)가 다를 수 있으므로 단순히 return 하지 않음
+            # 깜빡이는 픽셀로 알림이 반복되지 않도록 디바운스된 상태로 전환을 판단
+            now = time.monotonic()
+            for detection, red_pixels in zip(self.regions, counts):
+                if detection.debounce.update(red_pixels >= detection.threshold, now):
+                    if not detection.present:
+                        detection.present = True
+                        message = self._region_message(detection, found=True)
+                        self.user_detected.emit(message)
+                        self._send_telegram_message(message, f"user:{detection.name}", "found")
+                else:
+                    if detection.present:
+                        detection.present = False
+                        message = self._region_message(detection, found=False)
+                        self.user_disappeared.emit(message)
+                        self._send_telegram_message(message, f"user:{detection.name}", "gone")
+
+                # 이전 결과 갱신
+                detection.last_count = red_pixels
+
+            self.user_present = any(detection.present for detection in self.regions)
+            self.last_check_result = sum(counts)
 
             # 디버깅 로그
-            # print(f"[DEBUG] red_pixels={red_pixels}, user_present={self.user_present}, state_changed={state_changed}")
+            # print(f"[DEBUG] counts={counts}, user_present={self.user_present}")
 
         except Exception as e:
             print(f"구역 체크 중 오류: {e}")
@@ -119,118 +245,67 @@ class UserDetector(QObject):
             if self.is_running:
                 self.timer.start(self.check_interval)
 
-    def _count_red_pixels_optimized(self, image) -> int:
-        try:
-            import numpy as np
-
-            img_array = np.array(image)
-
-            # RGB 채널 분리
-            r = img_array[:, :, 0]
-            g = img_array[:, :, 1]
-            b = img_array[:, :, 2]
-
-            # 정확히 빨간색 (255, 0, 0)인 픽셀 찾기
-            red_mask = (r >= 200) & (g <= 50) & (b <= 50)
-            red_count = int(np.sum(red_mask))
-
-            return red_count
-        except ImportError:
-            return self._count_red_pixels(image)
+    def _region_message(self, detection: DetectionRegion, found: bool) -> str:
+        """구역 상태 변화 알림 문구 (이름 없는 단일 구역은 기존 문구)"""
+        text = detection.found_text if found else detection.gone_text
+        if text:
+            return text.format(nickname=self.user_nickname, name=detection.name, count=detection.dots)
+        message = f"{self.user_nickname} 유저 {'발견' if found else '사라짐'}"
+        if detection.name:
+            message += f" ({detection.name})"
+        if found and detection.dots:
+            message += f" - {detection.dots}명"
+        return message
+
+    def _count_regions(self, frame: np.ndarray) -> List[int]:
+        """
+        캡처 영역 프레임에서 구역별 색 규칙에 맞는 픽셀 수 (구역은 프레임의 뷰로 잘라냄)
+        맞는 픽셀이 있는 구역은 점 수와 중심도 갱신합니다.
+        """
+        x0, y0 = self.region[0], self.region[1]
+        counts = []
+        for detection in self.regions:
+            x1, y1, x2, y2 = detection.region
+            count = self._count_red_pixels_optimized(frame[y1 - y0:y2 - y0, x1 - x0:x2 - x0], detection.rules)
+            if count:
+                detection.dots, detection.centroids = self._find_dots(self._masks[(y2 - y1, x2 - x1)], (x1, y1))
+            else:
+                detection.dots, detection.centroids = 0, ()
+            counts.append(count)
+        return counts
+
+    def _find_dots(self, mask: np.ndarray, origin: Tuple[int, int]) -> Tuple[int, Tuple[Tuple[int, int], ...]]:
+        """빨간 마스크를 연결 요소로 나누어 점 수와 중심(화면 좌표)을 반환합니다. (OpenCV 한 번)"""
+        # bool 마스크를 복사 없이 0/1 uint8로 사용
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(mask.view(np.uint8), connectivity=8)
+        keep = stats[1:, cv2.CC_STAT_AREA] >= self.min_dot_area  # 0번은 배경
+        points = np.rint(centroids[1:][keep]).astype(int) + origin
+        return int(keep.sum()), tuple((int(x), int(y)) for x, y in points)
+
+    def _count_red_pixels_optimized(self, frame: np.ndarray, rules: Tuple[str, ...] = ()) -> int:
+        """RGB 프레임에서 색 규칙에 맞는 픽셀 수 (룩업 테이블 분류, 구역 크기별 마스크 버퍼 재사용)"""
+        shape = frame.shape[:2]
+        mask = self._masks.get(shape)
+        if mask is None:
+            mask = np.empty(shape, dtype=bool)
+            self._masks[shape] = mask
+
+        self.classifier.mask(frame, mask, rules or None)
+        return int(np.count_nonzero(mask))
 
     def _count_red_pixels(self, image) -> int:
-        pixels = image.load()
-        width, height = image.size
-        red_count = 0
-
-        for x in range(width):
-            for y in range(height):
-                r, g, b = pixels[x, y][:3]
-                # 정확히 빨간색 (255, 0, 0)만 감지
-                if r >= 200 and g <= 50 and b <= 50:
-                    red_count += 1
-
-        return red_count
-
-    def _send_telegram_message(self, message: str):
-        """텔레그램으로 메시지를 전송합니다."""
+        """PIL 이미지에서 색 규칙에 맞는 픽셀 수 (배열로 바꿔 같은 분류기 사용)"""
+        return self._count_red_pixels_optimized(np.asarray(image.convert("RGB")))
+
+    def _send_telegram_message(self, message: str, state_key: Optional[str] = None, state: Optional[str] = None):
+        """
+        텔레그램으로 메시지를 전송합니다. (공용 알림 서비스 큐에 넣고 바로 반환)
+        구역 상태 메시지는 state_key로 보내, 전송 전에 반대 상태가 오면 둘 다 취소됩니다.
+        """
         if not self.telegram_token or not self.telegram_chat_id:
             return
-
-        if self._stop_event.is_set():
-            return
-
-        self._ensure_sender_thread()
-        self._send_queue.put(message)
-
-    def _ensure_sender_thread(self):
-        """전송용 백그라운드 스레드가 실행 중인지 확인합니다."""
-        if self._sender_thread and self._sender_thread.is_alive():
-            return
-
-        self._stop_event.clear()
-        self._sender_thread = threading.Thread(
-            target=self._sender_worker,
-            name="TelegramSender",
-            daemon=True,
-        )
-        self._sender_thread.start()
-
-    def _sender_worker(self):
-        """텔레그램 메시지를 순차적으로 전송하는 워커."""
-        while True:
-            try:
-                message = self._send_queue.get(timeout=0.2)
-            except Empty:
-                if self._stop_event.is_set():
-                    break
-                continue
-
-            self._send_with_retry(message)
-            self._send_queue.task_done()
-
-        # 남은 항목 정리
-        while True:
-            try:
-                self._send_queue.get_nowait()
-                self._send_queue.task_done()
-            except Empty:
-                break
-
-    def _send_with_retry(self, message: str, retries: int = 3):
-        """전송 실패 시 재시도합니다."""
-        for attempt in range(1, retries + 1):
-            try:
-                asyncio.run(self._async_send_message(message))
-                return
-            except Exception as exc:
-                print(f"텔레그램 메시지 전송 실패({attempt}/{retries}): {exc}")
-                if attempt < retries:
-                    time.sleep(0.5)
-        else:
-            print("텔레그램 메시지 전송이 반복 실패하여 포기합니다.")
+        self.notifier.send_message(self.telegram_token, self.telegram_chat_id, message, state_key, state)
 
     def shutdown(self):
-        """전송 스레드를 정리합니다."""
-        self._stop_event.set()
-
-        if self._sender_thread and self._sender_thread.is_alive():
-            # 대기 중인 메시지를 모두 처리하도록 기다립니다.
-            self._send_queue.join()
-            self._sender_thread.join(timeout=1.0)
-
-        self._sender_thread = None
-
-    async def _async_send_message(self, message: str):
-        """비동기로 텔레그램 메시지를 전송합니다."""
-        bot: Optional[Bot] = None
-        try:
-            bot = Bot(token=self.telegram_token)
-            await bot.send_message(chat_id=self.telegram_chat_id, text=message)
-        except Exception as e:
-            print(f"비동기 메시지 전송 실패: {e}")
-        finally:
-            if bot is not None:
-                session = getattr(bot, "session", None)
-                if session is not None and not session.closed:
-                    await session.close()
+        """대기 중인 알림 전송을 요청합니다. (기다리지 않음, 남은 알림은 발송함에서 다음 실행 때 전송)"""
+        self.notifier.flush_async(timeout=1.0)